@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+from logging.config import fileConfig
+from pathlib import Path
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import async_engine_from_config
+
+# Модели лежат в src/ (как PYTHONPATH=/app/src в контейнере)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# DATABASE_URL из окружения важнее адреса в alembic.ini
+database_url = os.getenv("DATABASE_URL") or config.get_main_option("sqlalchemy.url")
+database_url = database_url.replace("postgresql+psycopg2", "postgresql+asyncpg")
+config.set_main_option("sqlalchemy.url", database_url)
+os.environ.setdefault("DATABASE_URL", database_url)
+
+from storage.database import Base  # noqa: E402
+from storage.partitions import is_partition_name  # noqa: E402
+
+target_metadata = Base.metadata
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Секции сезонов создаются приложением (storage/partitions.py), а не моделями"""
+    return not (type_ == "table" and is_partition_name(name))
+
+
+def run_migrations_offline() -> None:
+    """Генерация SQL без подключения к БД (alembic upgrade --sql)"""
+    context.configure(
+        url=database_url,
+        target_metadata=target_metadata,
+        include_name=include_name,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = async_engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+
+    await connectable.dispose()
+
+
+def run_migrations_online() -> None:
+    asyncio.run(run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,246 @@
+"""Исходная схема (таблицы как их создавал Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 23:40:00
+
+БД, созданные раньше через create_all без уникальных ключей сбора: alembic stamp 0001.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('leagues',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('type', sa.String(length=50), nullable=True),
+        sa.Column('logo', sa.String(length=255), nullable=True),
+        sa.Column('country_id', sa.Integer(), nullable=True),
+        sa.Column('country_name', sa.String(length=100), nullable=True),
+        sa.Column('country_code', sa.String(length=10), nullable=True),
+        sa.Column('country_flag', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('players',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('firstname', sa.String(length=50), nullable=True),
+        sa.Column('lastname', sa.String(length=50), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('birth_date', sa.DateTime(), nullable=True),
+        sa.Column('country', sa.String(length=100), nullable=True),
+        sa.Column('height', sa.String(length=20), nullable=True),
+        sa.Column('weight', sa.String(length=20), nullable=True),
+        sa.Column('college', sa.String(length=100), nullable=True),
+        sa.Column('position', sa.String(length=50), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('teams',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('code', sa.String(length=10), nullable=True),
+        sa.Column('country', sa.String(length=100), nullable=True),
+        sa.Column('founded', sa.Integer(), nullable=True),
+        sa.Column('logo', sa.String(length=255), nullable=True),
+        sa.Column('national', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('league_mappings',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('betcity_league_id', sa.Integer(), nullable=False),
+        sa.Column('betcity_league_name', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('seasons',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('season', sa.String(length=20), nullable=False),
+        sa.Column('start_date', sa.DateTime(), nullable=True),
+        sa.Column('end_date', sa.DateTime(), nullable=True),
+        sa.Column('has_teams_stats', sa.Boolean(), nullable=True),
+        sa.Column('has_players_stats', sa.Boolean(), nullable=True),
+        sa.Column('has_standings', sa.Boolean(), nullable=True),
+        sa.Column('has_odds', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('team_aliases',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('betcity_name', sa.String(length=200), nullable=False),
+        sa.Column('source_api', sa.String(length=50), nullable=True),
+        sa.Column('confidence', sa.Float(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('games',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('season_id', sa.Integer(), nullable=False),
+        sa.Column('home_team_id', sa.Integer(), nullable=False),
+        sa.Column('away_team_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('timestamp', sa.Integer(), nullable=True),
+        sa.Column('timezone', sa.String(length=50), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('stage', sa.String(length=50), nullable=True),
+        sa.Column('week', sa.String(length=20), nullable=True),
+        sa.Column('venue', sa.String(length=100), nullable=True),
+        sa.Column('home_score_total', sa.Integer(), nullable=True),
+        sa.Column('away_score_total', sa.Integer(), nullable=True),
+        sa.Column('home_score_q1', sa.Integer(), nullable=True),
+        sa.Column('home_score_q2', sa.Integer(), nullable=True),
+        sa.Column('home_score_q3', sa.Integer(), nullable=True),
+        sa.Column('home_score_q4', sa.Integer(), nullable=True),
+        sa.Column('home_score_ot', sa.Integer(), nullable=True),
+        sa.Column('away_score_q1', sa.Integer(), nullable=True),
+        sa.Column('away_score_q2', sa.Integer(), nullable=True),
+        sa.Column('away_score_q3', sa.Integer(), nullable=True),
+        sa.Column('away_score_q4', sa.Integer(), nullable=True),
+        sa.Column('away_score_ot', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['away_team_id'], ['teams.id'], ),
+        sa.ForeignKeyConstraint(['home_team_id'], ['teams.id'], ),
+        sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ),
+        sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('team_season_stats',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('season_id', sa.Integer(), nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('games_played', sa.Integer(), nullable=True),
+        sa.Column('games_played_home', sa.Integer(), nullable=True),
+        sa.Column('games_played_away', sa.Integer(), nullable=True),
+        sa.Column('wins_total', sa.Integer(), nullable=True),
+        sa.Column('wins_home', sa.Integer(), nullable=True),
+        sa.Column('wins_away', sa.Integer(), nullable=True),
+        sa.Column('losses_total', sa.Integer(), nullable=True),
+        sa.Column('losses_home', sa.Integer(), nullable=True),
+        sa.Column('losses_away', sa.Integer(), nullable=True),
+        sa.Column('win_percentage_total', sa.Float(), nullable=True),
+        sa.Column('win_percentage_home', sa.Float(), nullable=True),
+        sa.Column('win_percentage_away', sa.Float(), nullable=True),
+        sa.Column('points_for_total', sa.Integer(), nullable=True),
+        sa.Column('points_against_total', sa.Integer(), nullable=True),
+        sa.Column('points_for_avg', sa.Float(), nullable=True),
+        sa.Column('points_against_avg', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ),
+        sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ),
+        sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('odds',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('bookmaker', sa.String(length=50), nullable=False),
+        sa.Column('odds_home', sa.Float(), nullable=True),
+        sa.Column('odds_away', sa.Float(), nullable=True),
+        sa.Column('odds_draw', sa.Float(), nullable=True),
+        sa.Column('total_over', sa.Float(), nullable=True),
+        sa.Column('total_under', sa.Float(), nullable=True),
+        sa.Column('total_points', sa.Float(), nullable=True),
+        sa.Column('handicap_home', sa.Float(), nullable=True),
+        sa.Column('handicap_away', sa.Float(), nullable=True),
+        sa.Column('handicap_value', sa.Float(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('player_game_stats',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('player_id', sa.Integer(), nullable=False),
+        sa.Column('player_type', sa.String(length=20), nullable=True),
+        sa.Column('minutes_played', sa.String(length=10), nullable=True),
+        sa.Column('field_goals_made', sa.Integer(), nullable=True),
+        sa.Column('field_goals_attempted', sa.Integer(), nullable=True),
+        sa.Column('field_goals_percentage', sa.Float(), nullable=True),
+        sa.Column('three_point_made', sa.Integer(), nullable=True),
+        sa.Column('three_point_attempted', sa.Integer(), nullable=True),
+        sa.Column('three_point_percentage', sa.Float(), nullable=True),
+        sa.Column('free_throws_made', sa.Integer(), nullable=True),
+        sa.Column('free_throws_attempted', sa.Integer(), nullable=True),
+        sa.Column('free_throws_percentage', sa.Float(), nullable=True),
+        sa.Column('rebounds_total', sa.Integer(), nullable=True),
+        sa.Column('assists', sa.Integer(), nullable=True),
+        sa.Column('steals', sa.Integer(), nullable=True),
+        sa.Column('blocks', sa.Integer(), nullable=True),
+        sa.Column('turnovers', sa.Integer(), nullable=True),
+        sa.Column('personal_fouls', sa.Integer(), nullable=True),
+        sa.Column('points', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ),
+        sa.ForeignKeyConstraint(['player_id'], ['players.id'], ),
+        sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table('team_game_stats',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('field_goals_made', sa.Integer(), nullable=True),
+        sa.Column('field_goals_attempted', sa.Integer(), nullable=True),
+        sa.Column('field_goals_percentage', sa.Float(), nullable=True),
+        sa.Column('three_point_made', sa.Integer(), nullable=True),
+        sa.Column('three_point_attempted', sa.Integer(), nullable=True),
+        sa.Column('three_point_percentage', sa.Float(), nullable=True),
+        sa.Column('free_throws_made', sa.Integer(), nullable=True),
+        sa.Column('free_throws_attempted', sa.Integer(), nullable=True),
+        sa.Column('free_throws_percentage', sa.Float(), nullable=True),
+        sa.Column('rebounds_total', sa.Integer(), nullable=True),
+        sa.Column('rebounds_offensive', sa.Integer(), nullable=True),
+        sa.Column('rebounds_defensive', sa.Integer(), nullable=True),
+        sa.Column('assists', sa.Integer(), nullable=True),
+        sa.Column('steals', sa.Integer(), nullable=True),
+        sa.Column('blocks', sa.Integer(), nullable=True),
+        sa.Column('turnovers', sa.Integer(), nullable=True),
+        sa.Column('personal_fouls', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ),
+        sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('team_game_stats')
+    op.drop_table('player_game_stats')
+    op.drop_table('odds')
+    op.drop_table('team_season_stats')
+    op.drop_table('games')
+    op.drop_table('team_aliases')
+    op.drop_table('seasons')
+    op.drop_table('league_mappings')
+    op.drop_table('teams')
+    op.drop_table('players')
+    op.drop_table('leagues')
@@ -0,0 +1,98 @@
+"""Уникальные ключи сбора, хеш содержимого игр, водяные знаки и dead letters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 23:41:00
+
+БД, созданные через create_all после появления этих таблиц: alembic stamp 0002.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Дубликаты, накопленные до уникальных ключей: игры и статистика команд
+# переводятся на первый сезон, у статистики за игру остается последняя запись
+# (по одному оператору - asyncpg не выполняет несколько команд в одном запросе)
+DEDUPLICATE_STATEMENTS = (
+    """
+    CREATE TEMPORARY TABLE season_duplicates ON COMMIT DROP AS
+    SELECT id, keep_id FROM (
+        SELECT id, min(id) OVER (PARTITION BY league_id, season) AS keep_id FROM seasons
+    ) ranked
+    WHERE id <> keep_id
+    """,
+    "UPDATE games SET season_id = d.keep_id FROM season_duplicates d WHERE games.season_id = d.id",
+    "UPDATE team_season_stats SET season_id = d.keep_id FROM season_duplicates d WHERE team_season_stats.season_id = d.id",
+    "DELETE FROM seasons USING season_duplicates d WHERE seasons.id = d.id",
+    """
+    DELETE FROM team_game_stats a USING team_game_stats b
+    WHERE a.game_id = b.game_id AND a.team_id = b.team_id AND a.id < b.id
+    """,
+    """
+    DELETE FROM player_game_stats a USING player_game_stats b
+    WHERE a.game_id = b.game_id AND a.player_id = b.player_id AND a.id < b.id
+    """,
+)
+
+
+def upgrade() -> None:
+    op.create_table('collection_watermarks',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('season', sa.String(length=20), nullable=False),
+        sa.Column('resource', sa.String(length=30), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('watermark', sa.DateTime(), nullable=True),
+        sa.Column('last_item_id', sa.Integer(), nullable=True),
+        sa.Column('items_collected', sa.Integer(), nullable=True),
+        sa.Column('items_expected', sa.Integer(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('league_id', 'season', 'resource', name='uq_collection_watermarks_scope')
+    )
+
+    op.create_table('dead_letters',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('stage', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('error_type', sa.String(length=100), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('first_failed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('last_failed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('replayed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('kind', 'item_id', name='uq_dead_letters_kind_item')
+    )
+
+    op.add_column('games', sa.Column('content_hash', sa.String(length=40), nullable=True))
+
+    for statement in DEDUPLICATE_STATEMENTS:
+        op.execute(statement)
+    op.create_unique_constraint('uq_seasons_league_season', 'seasons', ['league_id', 'season'])
+    op.create_unique_constraint('uq_team_game_stats_game_team', 'team_game_stats', ['game_id', 'team_id'])
+    op.create_unique_constraint('uq_player_game_stats_game_player', 'player_game_stats', ['game_id', 'player_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_player_game_stats_game_player', 'player_game_stats', type_='unique')
+    op.drop_constraint('uq_team_game_stats_game_team', 'team_game_stats', type_='unique')
+    op.drop_constraint('uq_seasons_league_season', 'seasons', type_='unique')
+    op.drop_column('games', 'content_hash')
+    op.drop_table('dead_letters')
+    op.drop_table('collection_watermarks')
@@ -0,0 +1,49 @@
+"""Индексы под запросы репозиториев (очные встречи, игры команды, лайв, статистика игроков, коэффициенты)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 23:42:00
+
+Индексы создаются CONCURRENTLY (вне транзакции миграции), чтобы не блокировать
+запись сборщика на больших таблицах.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE_STATUSES_PREDICATE = "status IN ('Q1', 'Q2', 'Q3', 'Q4', 'OT', 'BT', 'HT')"
+
+# (имя, таблица, колонки, доп. параметры)
+INDEXES = (
+    ('ix_games_home_away_date', 'games', ['home_team_id', 'away_team_id', 'date'], {}),
+    ('ix_games_away_date', 'games', ['away_team_id', 'date'], {}),
+    ('ix_games_season_date', 'games', ['season_id', 'date'], {}),
+    ('ix_games_date', 'games', ['date'], {}),
+    ('ix_games_live_status', 'games', ['status'], {'postgresql_where': sa.text(LIVE_STATUSES_PREDICATE)}),
+    ('ix_player_game_stats_player_game', 'player_game_stats', ['player_id', 'game_id'], {}),
+    ('ix_player_game_stats_team', 'player_game_stats', ['team_id'], {}),
+    ('ix_odds_game_bookmaker_timestamp', 'odds', ['game_id', 'bookmaker', 'timestamp'], {}),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **options)
+    # Свежая статистика планировщика для новых индексов
+    for table in sorted({table for _, table, _, _ in INDEXES}):
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,130 @@
+"""Секционирование player_game_stats, team_game_stats и odds по сезонам (RANGE по дате игры)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 01:10:00
+
+Таблицы пересоздаются секционированными с колонкой game_date (дата игры из games),
+строки переносятся. Секции - по сезонам с 1 июля (storage/partitions.py), плюс
+секция DEFAULT. Первичные и уникальные ключи включают game_date.
+Миграция переписывает таблицы целиком - запускать в окно обслуживания.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEASON_START_MONTH = 7
+
+# (таблица, уникальный ключ (имя, колонки) или None, индексы, внешние ключи (колонка, таблица))
+TABLES = (
+    (
+        'player_game_stats',
+        ('uq_player_game_stats_game_player', ['game_id', 'player_id']),
+        [('ix_player_game_stats_player_game', ['player_id', 'game_id']), ('ix_player_game_stats_team', ['team_id'])],
+        [('game_id', 'games'), ('team_id', 'teams'), ('player_id', 'players')],
+    ),
+    (
+        'team_game_stats',
+        ('uq_team_game_stats_game_team', ['game_id', 'team_id']),
+        [],
+        [('game_id', 'games'), ('team_id', 'teams')],
+    ),
+    (
+        'odds',
+        None,
+        [('ix_odds_game_bookmaker_timestamp', ['game_id', 'bookmaker', 'timestamp'])],
+        [('game_id', 'games')],
+    ),
+)
+
+
+def _columns(table: str) -> list:
+    rows = op.get_bind().execute(sa.text(
+        "SELECT attname FROM pg_attribute WHERE attrelid = CAST(:table AS regclass) AND attnum > 0 "
+        "AND NOT attisdropped ORDER BY attnum"
+    ), {"table": table})
+    return [row[0] for row in rows]
+
+
+def _season_years() -> list:
+    """Сезоны игр в БД, текущий и следующий"""
+    years = {
+        int(row[0]) for row in op.get_bind().execute(sa.text(
+            "SELECT DISTINCT CASE WHEN extract(month FROM date) >= :month THEN extract(year FROM date) "
+            "ELSE extract(year FROM date) - 1 END FROM games"
+        ), {"month": SEASON_START_MONTH})
+    }
+    now = datetime.utcnow()
+    current = now.year if now.month >= SEASON_START_MONTH else now.year - 1
+    return sorted(years | {current, current + 1})
+
+
+def _rename_to_old(table: str, unique, indexes):
+    op.rename_table(table, f'{table}_unpartitioned')
+    op.execute(f'ALTER INDEX {table}_pkey RENAME TO {table}_unpartitioned_pkey')
+    for name in ([unique[0]] if unique else []) + [name for name, _ in indexes]:
+        op.execute(f'ALTER INDEX {name} RENAME TO {name}_unpartitioned')
+
+
+def _add_keys(table: str, unique, indexes, foreign_keys, partition_key: list):
+    op.create_primary_key(f'{table}_pkey', table, ['id'] + partition_key)
+    if unique:
+        op.create_unique_constraint(unique[0], table, unique[1] + partition_key)
+    for column, referent in foreign_keys:
+        op.create_foreign_key(f'{table}_{column}_fkey', table, referent, [column], ['id'])
+    for name, columns in indexes:
+        op.create_index(name, table, columns)
+
+
+def upgrade() -> None:
+    years = _season_years()
+    for table, unique, indexes, foreign_keys in TABLES:
+        _rename_to_old(table, unique, indexes)
+        old = f'{table}_unpartitioned'
+        columns = _columns(old)
+
+        # Значение по умолчанию id (последовательность) переходит в новую таблицу
+        op.execute(
+            f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS, game_date timestamp without time zone NOT NULL) '
+            f'PARTITION BY RANGE (game_date)'
+        )
+        _add_keys(table, unique, indexes, foreign_keys, ['game_date'])
+        for year in years:
+            op.execute(
+                f"CREATE TABLE {table}_{year}_{year + 1} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{year}-{SEASON_START_MONTH:02d}-01') TO ('{year + 1}-{SEASON_START_MONTH:02d}-01')"
+            )
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+        column_list = ', '.join(columns)
+        source_list = ', '.join(f'o.{column}' for column in columns)
+        op.execute(
+            f'INSERT INTO {table} ({column_list}, game_date) '
+            f'SELECT {source_list}, g.date FROM {old} o JOIN games g ON g.id = o.game_id'
+        )
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        op.drop_table(old)
+        op.execute(f'ANALYZE {table}')
+
+
+def downgrade() -> None:
+    for table, unique, indexes, foreign_keys in reversed(TABLES):
+        old = f'{table}_unpartitioned'
+        op.execute(f'CREATE TABLE {old} (LIKE {table} INCLUDING DEFAULTS)')
+        op.drop_column(old, 'game_date')
+        column_list = ', '.join(_columns(old))
+        op.execute(f'INSERT INTO {old} ({column_list}) SELECT {column_list} FROM {table}')
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {old}.id')
+        # Вместе с секциями (отключенные в архив сезоны не возвращаются)
+        op.drop_table(table)
+        op.rename_table(old, table)
+        _add_keys(table, unique, indexes, foreign_keys, [])
@@ -0,0 +1,52 @@
+"""Уникальный ключ team_season_stats (команда, сезон) и учтенные версии игр (team_season_stats_games)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 02:20:00
+
+Агрегатор сезонной статистики (services/standings.py) прибавляет вклад игр
+через ON CONFLICT (team_id, season_id) и хранит учтенную версию каждой игры.
+После миграции таблицу заполняет полный пересчет: python standings_tool.py rebuild
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Дубликаты (команда, сезон) - остается последняя запись, пересчет все равно перезапишет строки
+    op.execute("""
+        DELETE FROM team_season_stats a USING team_season_stats b
+        WHERE a.team_id = b.team_id AND a.season_id = b.season_id AND a.id < b.id
+    """)
+    op.create_unique_constraint('uq_team_season_stats_team_season', 'team_season_stats', ['team_id', 'season_id'])
+    op.create_table('team_season_stats_games',
+        sa.Column('game_id', sa.Integer(), nullable=False),
+        sa.Column('season_id', sa.Integer(), nullable=False),
+        sa.Column('league_id', sa.Integer(), nullable=False),
+        sa.Column('home_team_id', sa.Integer(), nullable=False),
+        sa.Column('away_team_id', sa.Integer(), nullable=False),
+        sa.Column('home_score', sa.Integer(), nullable=False),
+        sa.Column('away_score', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['game_id'], ['games.id'], ),
+        sa.ForeignKeyConstraint(['season_id'], ['seasons.id'], ),
+        sa.ForeignKeyConstraint(['league_id'], ['leagues.id'], ),
+        sa.ForeignKeyConstraint(['home_team_id'], ['teams.id'], ),
+        sa.ForeignKeyConstraint(['away_team_id'], ['teams.id'], ),
+        sa.PrimaryKeyConstraint('game_id')
+    )
+    op.create_index('ix_team_season_stats_games_season', 'team_season_stats_games', ['season_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_team_season_stats_games_season', table_name='team_season_stats_games')
+    op.drop_table('team_season_stats_games')
+    op.drop_constraint('uq_team_season_stats_team_season', 'team_season_stats', type_='unique')
@@ -1,23 +1,222 @@
-from typing import Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
 import httpx
 import asyncio
 from structlog import get_logger
+from api.cache import ResponseCache, make_cache_key
+from api.cassette import CassetteTransport
+from api.decoding import DecodeMode, decode_response, json_loads
+from api.rate_limiter import QuotaExhaustedError, RateLimiter
+from api.resilience import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError, RetryPolicy, is_upstream_failure
+from api.single_flight import SingleFlight
 from models.basketball_models import CountriesResponse, GamesResponse, LeaguesResponse, PlayersResponse, PlayersStatisticsResponse, SeasonsResponse, StatisticsResponse, TeamsResponse, TeamsStatisticsResponse
 
 logger = get_logger()
 
+ResponseType = TypeVar("ResponseType")
+
+# Ограничение api-sports на параметр ids в /games/statistics/*
+MAX_GAME_IDS_PER_REQUEST = 20
+DEFAULT_BATCH_CONCURRENCY = 4
+
+def chunk_game_ids(game_ids: Sequence[int], size: int = MAX_GAME_IDS_PER_REQUEST) -> List[List[int]]:
+    """Разбиение списка ID игр на чанки (дубликаты убираются, порядок сохраняется)"""
+    unique_ids = list(dict.fromkeys(int(game_id) for game_id in game_ids))
+    return [unique_ids[i:i + size] for i in range(0, len(unique_ids), size)]
+
+def _retry_after(headers) -> Optional[float]:
+    """Разбор заголовка Retry-After (секунды)"""
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
 class BasketballAPI:
-    def __init__(self, api_key: str, base_url: str = "https://v1.basketball.api-sports.io"):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://v1.basketball.api-sports.io",
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+        decode_mode: str = DecodeMode.VALIDATE,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         self.api_key = api_key
         self.base_url = base_url
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breakers = circuit_breakers
+        self.decode_mode = decode_mode
+        self.retry_count = 0
+        self.single_flight = SingleFlight()
+        # transport позволяет подменить сеть (CassetteTransport, mock-сервер через ASGITransport)
+        self.transport = transport
         self.client = httpx.AsyncClient(
             timeout=30.0,
+            transport=transport,
             headers={
                 "X-RapidAPI-Key": api_key,
                 "Content-Type": "application/json"
             }
         )
-    
+
+    async def _request(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        refresh: bool = False
+    ) -> Tuple[Dict[str, Any], Optional[bytes]]:
+        """GET-запрос к API: кеш, автомат по эндпоинту, повторы с backoff
+
+        Возвращает разобранный ответ и исходные байты (None, если ответ из кеша).
+        refresh - запрос к upstream мимо кеша (ответ сохраняется в кеш, устаревший
+        кеш по-прежнему отдается при отказе).
+        """
+        cache_key = make_cache_key(path, params)
+        if self.cache and not refresh:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached, None
+
+        breaker = self.circuit_breakers.get(path) if self.circuit_breakers else None
+        if breaker and not breaker.allow_request():
+            stale = await self._get_stale(cache_key)
+            if stale is not None:
+                logger.warning("Circuit open, serving stale cache", path=path)
+                return stale, None
+            raise CircuitOpenError(path, breaker.retry_in())
+
+        max_attempts = self.retry_policy.max_attempts if self.retry_policy else 1
+        attempt = 1
+        # Пробный запрос half_open освобождает слот при любом выходе без исхода (отмена, квота)
+        probe = breaker.current_probe() if breaker else None
+        try:
+            while True:
+                try:
+                    data, raw = await self._send(path, params)
+                except QuotaExhaustedError:
+                    # До сброса квоты запрос не уйдет - без повторов, устаревший кеш или ошибка сразу
+                    stale = await self._get_stale(cache_key)
+                    if stale is not None:
+                        logger.warning("Daily quota exhausted, serving stale cache", path=path)
+                        return stale, None
+                    raise
+                except Exception as e:
+                    if breaker:
+                        if is_upstream_failure(e):
+                            breaker.record_failure()
+                        else:
+                            breaker.record_success()
+
+                    can_retry = (
+                        self.retry_policy
+                        and attempt < max_attempts
+                        and self.retry_policy.is_retryable(e)
+                        and (not breaker or breaker.state == CircuitBreaker.CLOSED)
+                    )
+                    if not can_retry:
+                        stale = await self._get_stale(cache_key) if is_upstream_failure(e) else None
+                        if stale is not None:
+                            logger.warning("Upstream failed, serving stale cache", path=path, error=str(e))
+                            return stale, None
+                        raise
+
+                    retry_after = _retry_after(e.response.headers) if isinstance(e, httpx.HTTPStatusError) else None
+                    delay = self.retry_policy.get_delay(attempt, retry_after)
+                    self.retry_count += 1
+                    logger.warning("Retrying API request", path=path, attempt=attempt,
+                                   delay=round(delay, 2), error=str(e))
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+
+                if breaker:
+                    breaker.record_success()
+                break
+        finally:
+            if probe is not None:
+                breaker.release_probe(probe)
+
+        if self.cache:
+            await self.cache.set(cache_key, path, data, params)
+        return data, raw
+
+    async def _send(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], bytes]:
+        """Один HTTP-запрос с учетом лимитов"""
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
+
+        response = await self.client.get(f"{self.base_url}{path}", params=params)
+
+        if self.rate_limiter:
+            self.rate_limiter.update_from_headers(response.headers)
+            if response.status_code == 429:
+                self.rate_limiter.on_throttled(_retry_after(response.headers))
+
+        response.raise_for_status()
+        raw = response.content
+        data = json_loads(raw)
+
+        # api-sports сообщает о превышении лимита в errors при статусе 200
+        errors = data.get("errors")
+        if self.rate_limiter and isinstance(errors, dict) and "rateLimit" in errors:
+            self.rate_limiter.on_throttled()
+
+        return data, raw
+
+    async def _get_stale(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        if not self.cache:
+            return None
+        return await self.cache.get_stale(cache_key)
+
+    async def _fetch(
+        self,
+        path: str,
+        response_model: Type[ResponseType],
+        params: Optional[Dict[str, Any]] = None,
+        decode_mode: Optional[str] = None,
+        refresh: bool = False
+    ) -> ResponseType:
+        """Запрос и разбор ответа; одинаковые одновременные вызовы разделяют один запрос
+
+        Возвращаемая модель может быть общей для нескольких вызывающих - не изменяйте ее.
+        """
+        mode = decode_mode or self.decode_mode
+
+        async def fetch_and_parse():
+            data, raw = await self._request(path, params, refresh=refresh)
+            return decode_response(response_model, data, raw, mode)
+
+        # Запрос мимо кеша не присоединяется к обычному (тот может вернуть ответ из кеша)
+        key = f"{response_model.__name__}:{mode}:{'refresh:' if refresh else ''}{make_cache_key(path, params)}"
+        return await self.single_flight.do(key, fetch_and_parse)
+
+    async def fetch_raw(self, path: str, params: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Optional[bytes]]:
+        """Ответ без разбора в модель: (dict, исходные байты или None для ответа из кеша)
+
+        Для конвейеров, где загрузка и разбор (decode_response) - отдельные стадии.
+        Кеш, лимиты, повторы и автоматы применяются как обычно; ошибки пробрасываются.
+        """
+        return await self._request(path, params)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики клиента: кеш, лимиты, объединение запросов"""
+        return {
+            "cache": self.cache.stats() if self.cache else None,
+            "rate_limit": self.rate_limiter.stats() if self.rate_limiter else None,
+            "single_flight": self.single_flight.stats(),
+            "retries": self.retry_count,
+            "circuit_breakers": self.circuit_breakers.stats() if self.circuit_breakers else None,
+            "cassette": self.transport.stats() if isinstance(self.transport, CassetteTransport) else None
+        }
+
     async def test_connection(self):
         """Проверка подключения к API"""
         try:
@@ -33,10 +232,7 @@ class BasketballAPI:
     async def get_seasons(self) -> Optional[SeasonsResponse]:
         """Получение списка всех доступных сезонов"""
         try:
-            response = await self.client.get(f"{self.base_url}/seasons")
-            response.raise_for_status()
-            data = response.json()
-            return SeasonsResponse(**data)
+            return await self._fetch("/seasons", SeasonsResponse)
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch seasons", error=str(e))
             return None
@@ -60,13 +256,7 @@ class BasketballAPI:
             if search:
                 params["search"] = search
                 
-            response = await self.client.get(
-                f"{self.base_url}/countries",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return CountriesResponse(**data)
+            return await self._fetch("/countries", CountriesResponse, params)
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch countries", params=params, error=str(e))
             return None
@@ -103,14 +293,7 @@ class BasketballAPI:
             if code:
                 params["code"] = code
                 
-            response = await self.client.get(
-                f"{self.base_url}/leagues",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            leagues_response = LeaguesResponse(**data)
+            leagues_response = await self._fetch("/leagues", LeaguesResponse, params)
             
             # Фильтрация по coverage статистики
             if filter_by_stats_coverage and leagues_response.response:
@@ -129,11 +312,13 @@ class BasketballAPI:
                     
                     # Если есть сезоны с полной статистикой, оставляем лигу
                     if valid_seasons:
-                        league.seasons = valid_seasons
-                        filtered_leagues.append(league)
+                        filtered_leagues.append(league.model_copy(update={"seasons": valid_seasons}))
                 
-                leagues_response.response = filtered_leagues
-                leagues_response.results = len(filtered_leagues)
+                # Ответ может быть общим для нескольких вызовов - не изменяем его на месте
+                leagues_response = leagues_response.model_copy(update={
+                    "response": filtered_leagues,
+                    "results": len(filtered_leagues)
+                })
             
             return leagues_response
             
@@ -174,13 +359,7 @@ class BasketballAPI:
                 logger.warning("Teams endpoint requires at least one parameter")
                 return None
                 
-            response = await self.client.get(
-                f"{self.base_url}/teams",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return TeamsResponse(**data)
+            return await self._fetch("/teams", TeamsResponse, params)
             
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch teams", params=params, error=str(e))
@@ -203,17 +382,12 @@ class BasketballAPI:
             if date:
                 params["date"] = date
                 
-            response = await self.client.get(
-                f"{self.base_url}/statistics",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
+            statistics = await self._fetch("/statistics", StatisticsResponse, params)
             
             # Логируем ответ для отладки
-            logger.info("Statistics API response", results=data.get('results'), has_errors=bool(data.get('errors')))
+            logger.info("Statistics API response", results=statistics.results, has_errors=bool(statistics.errors))
             
-            return StatisticsResponse(**data)
+            return statistics
             
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch team statistics", params=params, error=str(e))
@@ -243,13 +417,7 @@ class BasketballAPI:
                 logger.warning("Players endpoint requires at least one parameter")
                 return None
                 
-            response = await self.client.get(
-                f"{self.base_url}/players",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return PlayersResponse(**data)
+            return await self._fetch("/players", PlayersResponse, params)
             
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch players", params=params, error=str(e))
@@ -262,9 +430,15 @@ class BasketballAPI:
         league: Optional[int] = None,
         season: Optional[str] = None,
         team: Optional[int] = None,
-        timezone: Optional[str] = None
+        timezone: Optional[str] = None,
+        decode_mode: Optional[str] = None,
+        refresh: bool = False
     ) -> Optional[GamesResponse]:
-        """Получение данных о матчах с фильтрацией"""
+        """Получение данных о матчах с фильтрацией
+
+        refresh - мимо кеша: опросы планировщика должны видеть исправления счета и статуса
+        у завершенных игр, ответ с которыми кешируется бессрочно.
+        """
         try:
             params = {}
             if game_id:
@@ -289,13 +463,7 @@ class BasketballAPI:
                 logger.warning("Games endpoint requires at least one parameter")
                 return None
                 
-            response = await self.client.get(
-                f"{self.base_url}/games",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return GamesResponse(**data)
+            return await self._fetch("/games", GamesResponse, params, decode_mode, refresh=refresh)
             
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch games", params=params, error=str(e))
@@ -304,7 +472,8 @@ class BasketballAPI:
     async def get_teams_statistics(
         self,
         game_id: Optional[str] = None,
-        game_ids: Optional[str] = None
+        game_ids: Optional[str] = None,
+        decode_mode: Optional[str] = None
     ) -> Optional[TeamsStatisticsResponse]:
         """Получение статистики команд по играм"""
         try:
@@ -326,13 +495,7 @@ class BasketballAPI:
                     logger.error(f"Maximum 20 game ids allowed, got {ids_count}")
                     return None
                 
-            response = await self.client.get(
-                f"{self.base_url}/games/statistics/teams",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return TeamsStatisticsResponse(**data)
+            return await self._fetch("/games/statistics/teams", TeamsStatisticsResponse, params, decode_mode)
             
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch teams statistics", params=params, error=str(e))
@@ -343,7 +506,8 @@ class BasketballAPI:
         game_id: Optional[str] = None,
         game_ids: Optional[str] = None,
         player: Optional[int] = None,
-        season: Optional[str] = None
+        season: Optional[str] = None,
+        decode_mode: Optional[str] = None
     ) -> Optional[PlayersStatisticsResponse]:
         """Получение статистики игроков по играм"""
         try:
@@ -374,18 +538,131 @@ class BasketballAPI:
                 logger.error("Season parameter is required when using player filter")
                 return None
                 
-            response = await self.client.get(
-                f"{self.base_url}/games/statistics/players",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return PlayersStatisticsResponse(**data)
+            return await self._fetch("/games/statistics/players", PlayersStatisticsResponse, params, decode_mode)
             
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch players statistics", params=params, error=str(e))
             return None
 
+    async def _iter_statistics_chunks(
+        self,
+        fetch_chunk: Callable[..., Awaitable[Optional[ResponseType]]],
+        game_ids: Sequence[int],
+        max_concurrency: int,
+        decode_mode: Optional[str] = None
+    ) -> AsyncIterator[Tuple[int, List[int], Optional[ResponseType]]]:
+        """Конкурентная загрузка чанков по 20 игр; отдает (индекс, чанк, ответ) по мере готовности"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(index: int, chunk: List[int]):
+            async with semaphore:
+                response = await fetch_chunk(
+                    game_ids="-".join(str(game_id) for game_id in chunk),
+                    decode_mode=decode_mode
+                )
+                return index, chunk, response
+
+        tasks = [
+            asyncio.ensure_future(fetch(index, chunk))
+            for index, chunk in enumerate(chunk_game_ids(game_ids))
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Если потребитель прервал итерацию - отменяем оставшиеся запросы
+            for task in tasks:
+                task.cancel()
+
+    async def _get_statistics_batch(
+        self,
+        path: str,
+        response_model: Type[ResponseType],
+        fetch_chunk: Callable[..., Awaitable[Optional[ResponseType]]],
+        game_ids: Sequence[int],
+        max_concurrency: int,
+        decode_mode: Optional[str] = None
+    ) -> Optional[ResponseType]:
+        """Загрузка всех чанков и объединение в один типизированный ответ"""
+        if not game_ids:
+            logger.warning("Batch statistics request requires at least one game id")
+            return None
+
+        responses = {}
+        errors: List[str] = []
+        async for index, chunk, response in self._iter_statistics_chunks(fetch_chunk, game_ids, max_concurrency, decode_mode):
+            if response is None:
+                errors.append(f"Failed to fetch statistics for games {'-'.join(map(str, chunk))}")
+                continue
+            responses[index] = response
+            if isinstance(response.errors, dict):
+                errors.extend(f"{key}: {value}" for key, value in response.errors.items())
+            else:
+                errors.extend(str(error) for error in response.errors)
+
+        if not responses:
+            logger.error("All statistics chunks failed", path=path, games=len(game_ids))
+            return None
+
+        items = [item for index in sorted(responses) for item in responses[index].response]
+        return response_model(
+            get=path.lstrip("/"),
+            parameters={"ids": "-".join(str(game_id) for game_id in dict.fromkeys(game_ids))},
+            errors=errors,
+            results=len(items),
+            response=items
+        )
+
+    async def get_teams_statistics_batch(
+        self,
+        game_ids: Sequence[int],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        decode_mode: Optional[str] = None
+    ) -> Optional[TeamsStatisticsResponse]:
+        """Статистика команд по любому числу игр (автоматическое разбиение на чанки по 20)"""
+        return await self._get_statistics_batch(
+            "/games/statistics/teams", TeamsStatisticsResponse,
+            self.get_teams_statistics, game_ids, max_concurrency, decode_mode
+        )
+
+    async def iter_teams_statistics_batches(
+        self,
+        game_ids: Sequence[int],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        decode_mode: Optional[str] = None
+    ) -> AsyncIterator[TeamsStatisticsResponse]:
+        """Потоковый вариант: ответы по чанкам в порядке готовности"""
+        async for _, chunk, response in self._iter_statistics_chunks(self.get_teams_statistics, game_ids, max_concurrency, decode_mode):
+            if response is None:
+                logger.warning("Skipping failed teams statistics chunk", game_ids=chunk)
+                continue
+            yield response
+
+    async def get_players_statistics_batch(
+        self,
+        game_ids: Sequence[int],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        decode_mode: Optional[str] = None
+    ) -> Optional[PlayersStatisticsResponse]:
+        """Статистика игроков по любому числу игр (автоматическое разбиение на чанки по 20)"""
+        return await self._get_statistics_batch(
+            "/games/statistics/players", PlayersStatisticsResponse,
+            self.get_players_statistics, game_ids, max_concurrency, decode_mode
+        )
+
+    async def iter_players_statistics_batches(
+        self,
+        game_ids: Sequence[int],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        decode_mode: Optional[str] = None
+    ) -> AsyncIterator[PlayersStatisticsResponse]:
+        """Потоковый вариант: ответы по чанкам в порядке готовности"""
+        async for _, chunk, response in self._iter_statistics_chunks(self.get_players_statistics, game_ids, max_concurrency, decode_mode):
+            if response is None:
+                logger.warning("Skipping failed players statistics chunk", game_ids=chunk)
+                continue
+            yield response
+
     async def get_head_to_head(
         self,
         team1_id: int,
@@ -393,7 +670,8 @@ class BasketballAPI:
         date: Optional[str] = None,
         league: Optional[int] = None,
         season: Optional[str] = None,
-        timezone: Optional[str] = None
+        timezone: Optional[str] = None,
+        decode_mode: Optional[str] = None
     ) -> Optional[GamesResponse]:
         """Получение истории встреч между двумя командами"""
         try:
@@ -410,13 +688,7 @@ class BasketballAPI:
             if timezone:
                 params["timezone"] = timezone
                 
-            response = await self.client.get(
-                f"{self.base_url}/games",
-                params=params
-            )
-            response.raise_for_status()
-            data = response.json()
-            return GamesResponse(**data)
+            return await self._fetch("/games", GamesResponse, params, decode_mode)
             
         except (httpx.HTTPError, Exception) as e:
             logger.error("Failed to fetch head-to-head statistics", params=params, error=str(e))
@@ -0,0 +1,253 @@
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+from structlog import get_logger
+
+logger = get_logger()
+
+# Статусы игр (см. utils/game_utils.py)
+LIVE_STATUSES = {"Q1", "Q2", "Q3", "Q4", "OT", "BT", "HT"}
+FINISHED_STATUSES = {"FT", "AOT", "AWD"}
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# TTL по эндпоинтам (секунды). None - хранить бессрочно, 0 - не кешировать
+ENDPOINT_TTLS: Dict[str, Optional[float]] = {
+    "/seasons": 3 * DAY,
+    "/countries": 3 * DAY,
+    "/leagues": 12 * HOUR,
+    "/teams": 12 * HOUR,
+    "/players": 6 * HOUR,
+    "/statistics": 1 * HOUR,
+    "/games/statistics/teams": 1 * MINUTE,
+    "/games/statistics/players": 1 * MINUTE,
+}
+
+# TTL для /games в зависимости от статусов игр в ответе
+GAMES_LIVE_TTL = 15
+GAMES_SCHEDULED_TTL = 5 * MINUTE
+# Бессрочно - только запросы, к ответу которых не добавятся игры (см. _games_query_closed);
+# завершенные игры открытых запросов (h2h, текущий сезон) кешируются как расписание
+GAMES_FINISHED_TTL = None
+# Игры, которые вот-вот начнутся (или уже должны были), кешируем как лайв
+GAMES_TIP_OFF_WINDOW = 30 * MINUTE
+
+# Сколько хранить просроченные ответы для отдачи при недоступности upstream
+STALE_TTL = 1 * DAY
+
+
+def make_cache_key(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Ключ кеша: эндпоинт + нормализованные параметры"""
+    normalized = sorted(
+        (str(k), str(v)) for k, v in (params or {}).items() if v is not None
+    )
+    return f"{path}?{urlencode(normalized)}" if normalized else path
+
+
+def _games_query_closed(params: Optional[Dict[str, Any]]) -> bool:
+    """Запрос /games, к ответу которого не добавятся игры: игра по id, прошедший день, завершенный сезон"""
+    if not params:
+        return False
+    if params.get("id") is not None:
+        return True
+
+    today = datetime.now(timezone.utc).date()
+    date = params.get("date")
+    if date:
+        try:
+            # День запаса на параметр timezone
+            if datetime.strptime(str(date), "%Y-%m-%d").date() < today - timedelta(days=1):
+                return True
+        except ValueError:
+            pass
+
+    # Сезон "2023-2024" или "2023" завершен, если его последний год уже прошел
+    years = re.findall(r"\d{4}", str(params.get("season") or ""))
+    return bool(years) and int(years[-1]) < today.year
+
+
+def resolve_ttl(path: str, data: Dict[str, Any], params: Optional[Dict[str, Any]] = None) -> Optional[float]:
+    """Определение TTL для ответа API (params - параметры запроса)"""
+    # Ответы с ошибками (лимиты, неверные параметры) не кешируем
+    if data.get("errors"):
+        return 0
+
+    if path == "/games":
+        games = [game for game in data.get("response") or [] if isinstance(game, dict)]
+        statuses = {game.get("status", {}).get("short") for game in games}
+        if statuses & LIVE_STATUSES:
+            return GAMES_LIVE_TTL
+        tip_off_soon = time.time() + GAMES_TIP_OFF_WINDOW
+        if any(
+            game.get("status", {}).get("short") == "NS" and game.get("timestamp") is not None
+            and game["timestamp"] <= tip_off_soon
+            for game in games
+        ):
+            return GAMES_LIVE_TTL
+        if statuses and statuses <= FINISHED_STATUSES and _games_query_closed(params):
+            return GAMES_FINISHED_TTL
+        return GAMES_SCHEDULED_TTL
+
+    return ENDPOINT_TTLS.get(path, 0)
+
+
+class MemoryCacheBackend:
+    """In-process LRU кеш с ограничением размера"""
+
+    def __init__(self, max_size: int = 1024, stale_ttl: float = STALE_TTL):
+        self.max_size = max_size
+        self.stale_ttl = stale_ttl
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+
+    async def get(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            # Просроченная запись живет еще stale_ttl на случай отказа upstream
+            if expires_at + self.stale_ttl <= time.monotonic():
+                del self._entries[key]
+                return None
+            if not allow_stale:
+                return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Кеш в Redis (подходит любой async-клиент с get/set, например fakeredis)"""
+
+    def __init__(self, client, prefix: str = "basketball_api:", stale_ttl: float = STALE_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.stale_ttl = stale_ttl
+        # Вытеснением в Redis управляет сам сервер (maxmemory-policy)
+        self.evictions = 0
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "basketball_api:") -> "RedisCacheBackend":
+        """Создание бэкенда по REDIS_URL"""
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("redis package is required for the Redis cache backend") from e
+
+        return cls(aioredis.from_url(url), prefix=prefix)
+
+    async def get(self, key: str, allow_stale: bool = False) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+
+        entry = json.loads(raw)
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and expires_at <= time.time() and not allow_stale:
+            return None
+        return entry.get("data")
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]):
+        # Ключ живет дольше TTL, чтобы просроченный ответ можно было отдать при отказе upstream
+        expires_at = time.time() + ttl if ttl is not None else None
+        ex = int(ttl + self.stale_ttl) if ttl is not None else None
+        payload = json.dumps({"expires_at": expires_at, "data": value})
+        await self.client.set(self.prefix + key, payload, ex=ex)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            await self.client.delete(key)
+
+    def __len__(self) -> int:
+        return 0
+
+
+class ResponseCache:
+    """Кеш ответов API с TTL по эндпоинтам и счетчиками"""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.stale_hits = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Получение ответа из кеша"""
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning("Cache read failed", key=key, error=str(e))
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    async def get_stale(self, key: str) -> Optional[Dict[str, Any]]:
+        """Получение ответа даже с истекшим TTL (для деградации при отказе upstream)"""
+        try:
+            value = await self.backend.get(key, allow_stale=True)
+        except Exception as e:
+            logger.warning("Cache read failed", key=key, error=str(e))
+            return None
+
+        if value is not None:
+            self.stale_hits += 1
+        return value
+
+    async def set(self, key: str, path: str, data: Dict[str, Any], params: Optional[Dict[str, Any]] = None):
+        """Сохранение ответа в кеш согласно политике эндпоинта"""
+        ttl = resolve_ttl(path, data, params)
+        if ttl == 0:
+            return
+
+        try:
+            await self.backend.set(key, data, ttl)
+            self.stores += 1
+        except Exception as e:
+            logger.warning("Cache write failed", key=key, error=str(e))
+
+    async def clear(self):
+        """Очистка кеша"""
+        await self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики кеша"""
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "stale_hits": self.stale_hits,
+            "evictions": self.backend.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,116 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+import httpx
+from structlog import get_logger
+
+logger = get_logger()
+
+# Заголовки, которые имеет смысл сохранять (лимиты влияют на RateLimiter)
+RECORDED_HEADERS = (
+    "content-type",
+    "retry-after",
+    "x-ratelimit-limit",
+    "x-ratelimit-remaining",
+    "x-ratelimit-requests-limit",
+    "x-ratelimit-requests-remaining",
+)
+
+
+class CassetteMissError(Exception):
+    """В кассете нет записи для запроса (режим replay)"""
+
+
+def cassette_key(request: httpx.Request) -> str:
+    """Ключ записи: путь + отсортированные параметры запроса (без хоста и ключа API)"""
+    params = sorted(request.url.params.multi_items())
+    query = "&".join(f"{k}={v}" for k, v in params)
+    return f"{request.url.path}?{query}" if query else request.url.path
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx-транспорт с записью запросов/ответов на диск и их воспроизведением
+
+    record - запросы уходят в api-sports, ответы сохраняются в directory;
+    replay - ответы отдаются из directory, сеть не используется.
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, directory: str, mode: str = REPLAY, inner: Optional[httpx.AsyncBaseTransport] = None):
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self.recorded = 0
+        self.replayed = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path_for(self, key: str) -> Path:
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return self.directory / f"{digest}.json"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = cassette_key(request)
+        path = self._path_for(key)
+
+        if self.mode == self.REPLAY:
+            if not path.exists():
+                raise CassetteMissError(f"No recorded response for {key}")
+            entry = json.loads(path.read_text())
+            self.replayed += 1
+            return httpx.Response(
+                status_code=entry["status"],
+                headers=entry.get("headers", {}),
+                content=json.dumps(entry["body"]).encode(),
+                request=request,
+            )
+
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        await response.aclose()
+
+        try:
+            body = json.loads(content)
+        except ValueError:
+            body = None
+
+        if body is not None:
+            entry: Dict[str, Any] = {
+                "request": {"path": request.url.path, "params": dict(request.url.params)},
+                "status": response.status_code,
+                "headers": {
+                    name: response.headers[name]
+                    for name in RECORDED_HEADERS if name in response.headers
+                },
+                "body": body,
+            }
+            path.write_text(json.dumps(entry, ensure_ascii=False))
+            self.recorded += 1
+            logger.debug("📼 Recorded API response", key=key, file=path.name)
+
+        # Тело уже распаковано - убираем заголовки кодирования исходного ответа
+        headers = [
+            (name, value) for name, value in response.headers.multi_items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=headers,
+            content=content,
+            request=request,
+        )
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "directory": str(self.directory),
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+        }
@@ -0,0 +1,126 @@
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar, Union, get_args, get_origin
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson опционален, без него используется stdlib json
+    orjson = None
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+
+
+class DecodeMode:
+    """Режимы разбора ответов API"""
+    # Разбор JSON в dict + валидация Pydantic (поведение по умолчанию)
+    VALIDATE = "validate"
+    # Валидация закешированным TypeAdapter: из уже разобранного dict ответа,
+    # из байтов - только если dict нет
+    FAST = "fast"
+    # Сборка моделей через model_construct без валидации (вложенные модели тоже
+    # собираются) - для объемной загрузки доверенных ответов, например backfill
+    CONSTRUCT = "construct"
+
+    ALL = (VALIDATE, FAST, CONSTRUCT)
+
+
+def json_loads(raw: Union[bytes, str]) -> Any:
+    """Разбор JSON (orjson, если установлен)"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(model: Type[Any]) -> TypeAdapter:
+    """TypeAdapter создается один раз на тип"""
+    return TypeAdapter(model)
+
+
+def _field_builder(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Сборщик значения поля: вложенная модель, список моделей или None (значение как есть)"""
+    for candidate in (annotation, *get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            model = candidate
+            return lambda value: construct_model(model, value) if isinstance(value, dict) else value
+        if get_origin(candidate) is list:
+            item_builder = _field_builder((get_args(candidate) or (Any,))[0])
+            if item_builder is None:
+                return None
+            return lambda value: [item_builder(v) for v in value] if isinstance(value, list) else value
+    return None
+
+
+@lru_cache(maxsize=None)
+def _construct_plan(model: Type[BaseModel]) -> Tuple[List[Tuple[str, str, Any]], Dict[str, Any], bool]:
+    """План сборки модели, вычисляется один раз на модель
+
+    (поля: имя, ключ в ответе, сборщик значения), значения по умолчанию
+    необязательных полей и признак простой модели - без post_init, extra="allow",
+    RootModel и изменяемых значений по умолчанию: ее экземпляр можно собрать
+    напрямую как в model_construct, разделяя значения по умолчанию.
+    """
+    fields = [(name, field.alias or name, _field_builder(field.annotation)) for name, field in model.model_fields.items()]
+    defaults = {
+        name: field.get_default(call_default_factory=False)
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+    simple = (
+        not model.__pydantic_post_init__
+        and not model.__pydantic_root_model__
+        and model.model_config.get("extra") != "allow"
+        and len(defaults) == sum(not field.is_required() for field in model.model_fields.values())
+        and all(default is None or isinstance(default, (str, int, float, bool)) for default in defaults.values())
+    )
+    return fields, defaults, simple
+
+
+def construct_model(model: Type[ModelType], data: Dict[str, Any]) -> ModelType:
+    """model_construct с рекурсивной сборкой вложенных моделей и списков моделей
+
+    Ни типы, ни валидаторы полей не применяются: значения берутся как есть.
+    """
+    fields, defaults, simple = _construct_plan(model)
+    values = {}
+    for name, key, builder in fields:
+        if key not in data:
+            key = name
+            if key not in data:
+                continue
+        value = data[key]
+        values[name] = value if builder is None else builder(value)
+    if not simple:
+        return model.model_construct(**values)
+
+    # То же, что model_construct, без повторного разбора полей модели
+    instance = model.__new__(model)
+    fields_set = set(values)
+    if len(fields_set) < len(fields):
+        values = {**defaults, **values}
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+def decode_response(
+    model: Type[ModelType],
+    data: Optional[Dict[str, Any]],
+    raw: Optional[bytes] = None,
+    mode: str = DecodeMode.VALIDATE
+) -> ModelType:
+    """Преобразование ответа API в модель в выбранном режиме"""
+    if mode == DecodeMode.FAST:
+        adapter = get_type_adapter(model)
+        # Клиент уже разобрал ответ в dict - повторный разбор байтов не нужен
+        if data is not None:
+            return adapter.validate_python(data)
+        return adapter.validate_json(raw)
+    if mode == DecodeMode.CONSTRUCT:
+        return construct_model(model, data if data is not None else json_loads(raw))
+    if mode != DecodeMode.VALIDATE:
+        raise ValueError(f"Unknown decode mode: {mode}")
+    return model(**(data if data is not None else json_loads(raw)))
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Mapping, Optional
+from structlog import get_logger
+
+logger = get_logger()
+
+
+def _seconds_until_utc_midnight() -> float:
+    """Секунды до сброса дневной квоты (api-sports сбрасывает в 00:00 UTC)"""
+    now = datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+class QuotaExhaustedError(Exception):
+    """Дневная квота api-sports исчерпана (ожидание сброса не блокирует вызывающих)"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Daily API quota exhausted, resets in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class RateLimiter:
+    """Token bucket на запросы в минуту + учет дневной квоты api-sports
+
+    Вызывающие стоят в очереди на asyncio.Lock (FIFO), поэтому запросы
+    обслуживаются в порядке поступления, а не отклоняются. Исключение -
+    исчерпанная дневная квота: до сброса в полночь UTC acquire() сразу
+    бросает QuotaExhaustedError, а не держит очередь.
+
+    Лимиты задаются на аккаунт; процессу достается quota_share от них, в том
+    числе после обновления лимитов из заголовков ответа.
+    """
+
+    def __init__(self, requests_per_minute: int = 10, daily_quota: int = 100, quota_share: float = 1.0):
+        self.account_requests_per_minute = requests_per_minute
+        self.account_daily_quota = daily_quota
+        self.quota_share = quota_share
+        self._apply_share()
+        self.daily_used = 0
+        self.tokens = float(self.requests_per_minute)
+        self.throttled_count = 0
+        self.quota_rejected_count = 0
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+        self._day = datetime.now(timezone.utc).date()
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def refill_rate(self) -> float:
+        """Токенов в секунду"""
+        return self.requests_per_minute / 60.0
+
+    @property
+    def daily_remaining(self) -> int:
+        return max(self.daily_quota - self.daily_used, 0)
+
+    def _apply_share(self):
+        self.requests_per_minute = max(1, int(self.account_requests_per_minute * self.quota_share))
+        self.daily_quota = max(1, int(self.account_daily_quota * self.quota_share))
+
+    def set_quota_share(self, quota_share: float):
+        """Новая доля лимитов аккаунта (например, при смене лидера между процессами)"""
+        if quota_share == self.quota_share:
+            return
+        self.quota_share = quota_share
+        self._apply_share()
+        self.tokens = min(self.tokens, float(self.requests_per_minute))
+        logger.info("⚖️ API quota share changed", quota_share=round(quota_share, 3),
+                    requests_per_minute=self.requests_per_minute, daily_quota=self.daily_quota)
+
+    def seconds_until_reset(self) -> float:
+        """Секунды до сброса дневной квоты"""
+        return _seconds_until_utc_midnight()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self.tokens = min(float(self.requests_per_minute), self.tokens + elapsed * self.refill_rate)
+
+        today = datetime.now(timezone.utc).date()
+        if today != self._day:
+            self._day = today
+            self.daily_used = 0
+
+    def _delay(self) -> float:
+        """Сколько ждать до следующего разрешенного запроса (0 - можно сейчас)"""
+        blocked = self._blocked_until - time.monotonic()
+        if blocked > 0:
+            return blocked
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.refill_rate
+        return 0.0
+
+    async def acquire(self):
+        """Ожидание разрешения на запрос к API (QuotaExhaustedError - дневная квота исчерпана)"""
+        self.waiting += 1
+        started = time.monotonic()
+        try:
+            async with self._lock:
+                while True:
+                    self._refill()
+                    if self.daily_remaining <= 0:
+                        self.quota_rejected_count += 1
+                        reset_in = _seconds_until_utc_midnight()
+                        logger.warning("⏳ Daily API quota exhausted, rejecting request",
+                                       reset_in=round(reset_in))
+                        raise QuotaExhaustedError(reset_in)
+
+                    delay = self._delay()
+                    if delay <= 0:
+                        self.tokens -= 1
+                        self.daily_used += 1
+                        return
+                    await asyncio.sleep(delay)
+        finally:
+            self.waiting -= 1
+            self.total_wait_seconds += time.monotonic() - started
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Синхронизация с сервером по заголовкам x-ratelimit-*
+
+        Заголовки сообщают лимиты и остатки всего аккаунта: лимиты процесса -
+        его доля от них, а остаток аккаунта лишь ограничивает остаток процесса.
+        """
+        minute_limit = _int_header(headers, "x-ratelimit-limit")
+        minute_remaining = _int_header(headers, "x-ratelimit-remaining")
+        daily_limit = _int_header(headers, "x-ratelimit-requests-limit")
+        daily_remaining = _int_header(headers, "x-ratelimit-requests-remaining")
+
+        if minute_limit:
+            self.account_requests_per_minute = minute_limit
+        if daily_limit:
+            self.account_daily_quota = daily_limit
+        if minute_limit or daily_limit:
+            self._apply_share()
+            self.tokens = min(self.tokens, float(self.requests_per_minute))
+        if minute_remaining is not None:
+            self.tokens = min(self.tokens, float(minute_remaining))
+        if daily_remaining is not None:
+            if self.quota_share >= 1:
+                self.daily_used = max(self.daily_quota - daily_remaining, 0)
+            else:
+                # Остаток аккаунта тратят и другие процессы - свой расход не уменьшаем
+                self.daily_used = max(self.daily_used, self.daily_quota - daily_remaining)
+
+    def on_throttled(self, retry_after: Optional[float] = None):
+        """Сервер ответил превышением лимита - обнуляем бакет"""
+        self.throttled_count += 1
+        self.tokens = 0.0
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        logger.warning("🚦 API rate limit hit", retry_after=retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        """Оставшийся бюджет запросов"""
+        self._refill()
+        return {
+            "quota_share": round(self.quota_share, 3),
+            "requests_per_minute": self.requests_per_minute,
+            "minute_tokens": round(self.tokens, 2),
+            "daily_quota": self.daily_quota,
+            "daily_used": self.daily_used,
+            "daily_remaining": self.daily_remaining,
+            "waiting": self.waiting,
+            "throttled_count": self.throttled_count,
+            "quota_rejected_count": self.quota_rejected_count,
+            "total_wait_seconds": round(self.total_wait_seconds, 2),
+        }
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,167 @@
+import random
+import time
+from typing import Any, Dict, Optional, Set
+import httpx
+from structlog import get_logger
+
+logger = get_logger()
+
+
+class CircuitOpenError(Exception):
+    """Эндпоинт временно отключен автоматом (upstream нездоров)"""
+
+    def __init__(self, path: str, retry_in: float):
+        super().__init__(f"Circuit breaker is open for {path}, retry in {retry_in:.1f}s")
+        self.path = path
+        self.retry_in = retry_in
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Ошибка говорит о нездоровье upstream (таймаут, обрыв, 5xx)"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return False
+
+
+class RetryPolicy:
+    """Повторы идемпотентных GET с экспоненциальной задержкой и full jitter"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        max_retry_after: float = 60.0,
+        retry_statuses: Optional[Set[int]] = None
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = retry_statuses or {429, 500, 502, 503, 504}
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, httpx.TransportError):
+            return True
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in self.retry_statuses
+        return False
+
+    def get_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Задержка перед повтором (attempt начинается с 1)"""
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Автомат для одного эндпоинта: closed -> open -> half_open -> closed"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, path: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_count = 0
+        self.rejected_count = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+
+    def retry_in(self) -> float:
+        return max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """Можно ли отправить запрос (в half_open пропускается один пробный)
+
+        Пробный запрос без исхода дольше recovery_timeout считается потерянным -
+        пропускается следующий, автомат не застревает в half_open.
+        """
+        if self.state == self.OPEN and self.retry_in() <= 0:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and self._probe_in_flight:
+            if time.monotonic() - self._probe_started_at >= self.recovery_timeout:
+                logger.warning("⌛ Circuit breaker probe timed out", path=self.path)
+                self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            self._probe_started_at = time.monotonic()
+            return True
+
+        self.rejected_count += 1
+        return False
+
+    def current_probe(self) -> Optional[float]:
+        """Метка пробного запроса в полете (время старта) или None"""
+        if self.state == self.HALF_OPEN and self._probe_in_flight:
+            return self._probe_started_at
+        return None
+
+    def release_probe(self, probe: float):
+        """Пробный запрос завершился без исхода (отмена, исчерпанная квота) - слот свободен
+
+        Слот следующего пробного запроса (после таймаута этого) не трогаем.
+        """
+        if self.current_probe() == probe:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info("✅ Circuit breaker closed", path=self.path)
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_count += 1
+                logger.warning("🔌 Circuit breaker opened", path=self.path,
+                               failures=self.consecutive_failures)
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_count": self.opened_count,
+            "rejected_count": self.rejected_count,
+            "retry_in": round(self.retry_in(), 1) if self.state == self.OPEN else 0.0,
+        }
+
+
+class CircuitBreakerRegistry:
+    """Автоматы по эндпоинтам (создаются при первом обращении)"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, path: str) -> CircuitBreaker:
+        breaker = self._breakers.get(path)
+        if breaker is None:
+            breaker = CircuitBreaker(path, self.failure_threshold, self.recovery_timeout)
+            self._breakers[path] = breaker
+        return breaker
+
+    def any_open(self) -> bool:
+        return any(breaker.state == CircuitBreaker.OPEN for breaker in self._breakers.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {path: breaker.stats() for path, breaker in self._breakers.items()}
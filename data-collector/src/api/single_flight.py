@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+from structlog import get_logger
+
+logger = get_logger()
+
+
+class SingleFlight:
+    """Объединение одинаковых одновременных запросов в один
+
+    Первый вызов с ключом запускает задачу, остальные ждут ее результат.
+    Задача защищена shield, поэтому отмена одного из ожидающих
+    (например, разрыв соединения клиента) не отменяет запрос для остальных.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполнение fn() или ожидание уже выполняющегося запроса с тем же ключом"""
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        else:
+            self.coalesced += 1
+            logger.debug("Coalesced in-flight request", key=key)
+
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Помечаем исключение как полученное, если все ожидающие были отменены
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики объединения запросов"""
+        total = self.calls + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,86 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.decoding import DecodeMode, decode_response, json_loads
+from benchmarks.payloads import games_payload, players_statistics_payload, teams_statistics_payload
+from models.basketball_models import GamesResponse, PlayersStatisticsResponse, TeamsStatisticsResponse
+
+# Модель ответа по полю "get" в сохраненном payload
+MODELS_BY_ENDPOINT = {
+    "games": GamesResponse,
+    "games/statistics/teams": TeamsStatisticsResponse,
+    "games/statistics/players": PlayersStatisticsResponse,
+}
+
+
+def synthetic_payloads() -> List[Tuple[str, type, bytes]]:
+    game_ids = list(range(100000, 100020))
+    return [
+        ("games (1230, league-season)", GamesResponse, json.dumps(games_payload()).encode()),
+        ("statistics/teams (20 games)", TeamsStatisticsResponse, json.dumps(teams_statistics_payload(game_ids)).encode()),
+        ("statistics/players (20 games)", PlayersStatisticsResponse, json.dumps(players_statistics_payload(game_ids)).encode()),
+    ]
+
+
+def captured_payloads(paths: List[str]) -> List[Tuple[str, type, bytes]]:
+    """Сохраненные ответы API (JSON-файлы или записи кассет с полем body)"""
+    payloads = []
+    for path in paths:
+        raw = Path(path).read_bytes()
+        data = json.loads(raw)
+        if "body" in data:
+            data = data["body"]
+            raw = json.dumps(data).encode()
+        model = MODELS_BY_ENDPOINT.get(data.get("get"))
+        if model is None:
+            print(f"⚠️ Skipping {path}: unsupported endpoint {data.get('get')}")
+            continue
+        payloads.append((Path(path).name, model, raw))
+    return payloads
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """Лучшее время из repeat запусков (мс)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def run(payloads: List[Tuple[str, type, bytes]], repeat: int):
+    strategies: Dict[str, Callable[[type, bytes], object]] = {
+        "json.loads + Model(**data) (before)": lambda model, raw: model(**json.loads(raw)),
+        "validate (orjson + Model(**data))": lambda model, raw: decode_response(model, json_loads(raw), None, DecodeMode.VALIDATE),
+        "fast (TypeAdapter.validate_json)": lambda model, raw: decode_response(model, None, raw, DecodeMode.FAST),
+        # Путь клиента: _send уже разобрал ответ в dict, валидируется dict
+        "fast (orjson + validate_python)": lambda model, raw: decode_response(model, json_loads(raw), raw, DecodeMode.FAST),
+        "construct (orjson + model_construct, deep)": lambda model, raw: decode_response(model, json_loads(raw), raw, DecodeMode.CONSTRUCT),
+        # Для сравнения: без валидации вложенные объекты остаются dict, поэтому режимом клиента это не является
+        "orjson + model_construct (shallow)": lambda model, raw: model.model_construct(**json_loads(raw)),
+    }
+
+    for name, model, raw in payloads:
+        print(f"\n📦 {name}: {len(raw) / 1024:.0f} KiB")
+        baseline = None
+        for label, strategy in strategies.items():
+            elapsed = measure(lambda: strategy(model, raw), repeat)
+            baseline = baseline or elapsed
+            print(f"   {label:<40} {elapsed:8.2f} ms   x{baseline / elapsed:5.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение режимов разбора ответов API")
+    parser.add_argument("payloads", nargs="*", help="Сохраненные ответы API (по умолчанию - синтетические)")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    run(captured_payloads(args.payloads) if args.payloads else synthetic_payloads(), args.repeat)
@@ -0,0 +1,174 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+from benchmarks import payloads
+
+# Локальный mock api-sports: отдает записанные кассеты или синтетические ответы
+# для всех эндпоинтов, которые использует BasketballAPI.
+# Запуск: python benchmarks/mock_api_server.py --latency-ms 200 --error-rate 0.05
+# и BASKETBALL_API_URL=http://localhost:8100 для data-collector.
+
+
+class MockSettings:
+    """Настройки mock-сервера (можно менять на лету через /__mock/settings)"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        throttle_rate: float = 0.0,
+        season_games: int = 1230,
+        cassette_dir: Optional[str] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.throttle_rate = throttle_rate
+        self.season_games = season_games
+        self.cassette_dir = cassette_dir
+
+
+def _request_key(path: str, params: Dict[str, Any]) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return f"{path}?{query}" if query else path
+
+
+def load_cassettes(directory: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """Индекс записанных ответов по ключу запроса"""
+    if not directory or not Path(directory).exists():
+        return {}
+
+    recorded = {}
+    for path in Path(directory).glob("*.json"):
+        entry = json.loads(path.read_text())
+        request = entry.get("request", {})
+        recorded[_request_key(request.get("path", ""), request.get("params", {}))] = entry
+    return recorded
+
+
+def _ids(value: Optional[str]) -> list:
+    return [int(game_id) for game_id in (value or "").split("-") if game_id]
+
+
+def synthetic_response(path: str, params: Dict[str, str], settings: MockSettings) -> Optional[Dict[str, Any]]:
+    """Синтетический ответ по пути и параметрам"""
+    if path == "/status":
+        return payloads.envelope("status", [], {"account": {}, "requests": {"current": 0, "limit_day": 100}})
+    if path == "/seasons":
+        return payloads.seasons_payload()
+    if path == "/countries":
+        return payloads.countries_payload()
+    if path == "/leagues":
+        return payloads.leagues_payload()
+    if path == "/teams":
+        return payloads.teams_payload(int(params.get("league", 12)))
+    if path == "/players":
+        return payloads.players_payload(int(params.get("team", 130)))
+    if path == "/statistics":
+        return payloads.team_statistics_payload(int(params.get("league", 12)), params.get("season", "2023-2024"), int(params.get("team", 130)))
+    if path == "/games":
+        if "id" in params:
+            return payloads.envelope("games", params, [payloads.make_game(int(params["id"]))])
+        if "h2h" in params:
+            home_id, away_id = _ids(params["h2h"])[:2]
+            games = [payloads.make_game(200000 + i) for i in range(10)]
+            for game in games:
+                game["teams"]["home"]["id"], game["teams"]["away"]["id"] = home_id, away_id
+            return payloads.envelope("games", params, games)
+        count = settings.season_games if "league" in params else 15
+        return payloads.games_payload(count, int(params.get("league", 12)), params.get("season", "2023-2024"))
+    if path == "/games/statistics/teams":
+        return payloads.teams_statistics_payload(_ids(params.get("ids") or params.get("id")))
+    if path == "/games/statistics/players":
+        return payloads.players_statistics_payload(_ids(params.get("ids") or params.get("id")))
+    return None
+
+
+def create_app(settings: Optional[MockSettings] = None) -> FastAPI:
+    settings = settings or MockSettings()
+    app = FastAPI(title="Mock api-sports basketball")
+    app.state.settings = settings
+    app.state.cassettes = load_cassettes(settings.cassette_dir)
+    app.state.requests = 0
+
+    @app.get("/__mock/settings")
+    async def get_settings():
+        return vars(app.state.settings)
+
+    @app.post("/__mock/settings")
+    async def update_settings(request: Request):
+        for key, value in (await request.json()).items():
+            if hasattr(app.state.settings, key):
+                setattr(app.state.settings, key, value)
+        return vars(app.state.settings)
+
+    @app.get("/{path:path}")
+    async def serve(path: str, request: Request):
+        current = app.state.settings
+        app.state.requests += 1
+        path = "/" + path
+        params = dict(request.query_params)
+
+        delay_ms = current.latency_ms + random.uniform(0, current.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+        headers = {
+            "x-ratelimit-requests-limit": "100000",
+            "x-ratelimit-requests-remaining": str(max(100000 - app.state.requests, 0)),
+        }
+        if random.random() < current.throttle_rate:
+            return JSONResponse({"message": "Too many requests"}, status_code=429, headers={**headers, "retry-after": "1"})
+        if random.random() < current.error_rate:
+            return JSONResponse({"message": "Injected error"}, status_code=current.error_status, headers=headers)
+
+        recorded = app.state.cassettes.get(_request_key(path, params))
+        if recorded is not None:
+            return JSONResponse(recorded["body"], status_code=recorded.get("status", 200), headers=headers)
+
+        body = synthetic_response(path, params, current)
+        if body is None:
+            return JSONResponse({"message": f"Unknown endpoint {path}"}, status_code=404)
+        return JSONResponse(body, headers=headers)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальный mock api-sports")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--season-games", type=int, default=1230)
+    parser.add_argument("--cassettes", help="Каталог с записанными ответами (API_CASSETTE_DIR)")
+    args = parser.parse_args()
+
+    mock_settings = MockSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        throttle_rate=args.throttle_rate,
+        season_games=args.season_games,
+        cassette_dir=args.cassettes,
+    )
+    uvicorn.run(create_app(mock_settings), host=args.host, port=args.port)
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Tuple
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from models.odds_models import PRICE_FIELDS, OddsSnapshot
+from services.odds_sources import HtmlFileOddsSource, JsonFileOddsSource
+
+# Прием коэффициентов: разбор фикстур линии и нагрузочный прогон
+# OddsIngestionService (сопоставление, отбор изменившихся цен, COPY) на локальной БД.
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "odds"
+BOOKMAKER = "benchmark"
+LEAGUE_OFFSET = 900000
+
+
+async def show_fixtures():
+    """Снимки из HTML/JSON фикстур (проверка парсеров без БД)"""
+    for source in (JsonFileOddsSource(FIXTURES_DIR / "betcity_line.json"), HtmlFileOddsSource(FIXTURES_DIR / "betcity_line.html")):
+        snapshots = await source.fetch()
+        print(f"\n📄 {source.path.name}: {len(snapshots)} snapshots")
+        for snapshot in snapshots:
+            prices = " ".join(f"{price:g}" if price is not None else "-" for price in snapshot.prices())
+            print(f"   [{snapshot.league_external_id}] {snapshot.home_team} - {snapshot.away_team} "
+                  f"{snapshot.start_time:%Y-%m-%d %H:%M}  {prices}")
+
+
+async def seed(games_count: int) -> List[Tuple[int, int, int, int, datetime]]:
+    """Игры из БД и маппинги/алиасы для них (лиги 900000+id, команды "bench team <id>")"""
+    from sqlalchemy import select
+    from storage.database import Game, LeagueMapping, TeamAlias, db_manager
+
+    async with db_manager.get_async_session() as session:
+        games = (await session.execute(
+            select(Game.id, Game.league_id, Game.home_team_id, Game.away_team_id, Game.date)
+            .order_by(Game.id).limit(games_count)
+        )).all()
+        leagues = {game.league_id for game in games}
+        teams = {team_id for game in games for team_id in (game.home_team_id, game.away_team_id)}
+        session.add_all([
+            LeagueMapping(league_id=league_id, betcity_league_id=LEAGUE_OFFSET + league_id, betcity_league_name=f"bench {league_id}")
+            for league_id in leagues
+        ])
+        session.add_all([TeamAlias(team_id=team_id, betcity_name=f"bench team {team_id}", source_api=BOOKMAKER) for team_id in teams])
+        await session.commit()
+    return [tuple(game) for game in games]
+
+
+async def cleanup():
+    from sqlalchemy import delete
+    from storage.database import LeagueMapping, Odds, TeamAlias, db_manager
+
+    async with db_manager.get_async_session() as session:
+        await session.execute(delete(Odds).where(Odds.bookmaker == BOOKMAKER))
+        await session.execute(delete(TeamAlias).where(TeamAlias.source_api == BOOKMAKER))
+        await session.execute(delete(LeagueMapping).where(LeagueMapping.betcity_league_id >= LEAGUE_OFFSET))
+        await session.commit()
+
+
+def make_updates(games, updates: int, change_rate: float, rng: random.Random) -> List[OddsSnapshot]:
+    """Поток обновлений линии: по кругу по играм, цена меняется с вероятностью change_rate"""
+    prices = {game[0]: [round(rng.uniform(1.2, 3.5), 2) for _ in PRICE_FIELDS] for game in games}
+    started = datetime.utcnow()
+    snapshots = []
+    for n in range(updates):
+        game_id, league_id, home_id, away_id, date = games[n % len(games)]
+        if rng.random() < change_rate:
+            index = rng.randrange(len(PRICE_FIELDS))
+            prices[game_id][index] = round(max(1.01, prices[game_id][index] + rng.choice((-0.05, 0.05))), 2)
+        snapshots.append(OddsSnapshot(
+            bookmaker=BOOKMAKER,
+            league_external_id=LEAGUE_OFFSET + league_id,
+            home_team=f"bench team {home_id}",
+            away_team=f"bench team {away_id}",
+            start_time=date,
+            captured_at=started + timedelta(milliseconds=n),
+            **dict(zip(PRICE_FIELDS, prices[game_id]))
+        ))
+    return snapshots
+
+
+async def benchmark_ingestion(games_count: int, updates: int, change_rate: float, chunk: int, compare_insert: bool):
+    from storage.database import db_manager
+    from services.odds_ingestion import OddsIngestionService
+
+    await db_manager.create_tables()
+    await cleanup()
+    games = await seed(games_count)
+    if not games:
+        print("⚠️ No games in DB - run the historical backfill first")
+        return
+
+    snapshots = make_updates(games, updates, change_rate, random.Random(42))
+    service = OddsIngestionService(batch_size=5000)
+    print(f"\n🎲 OddsIngestionService: {updates} updates over {len(games)} games, change rate {change_rate:.0%}")
+    try:
+        started = time.perf_counter()
+        for start in range(0, len(snapshots), chunk):
+            await service.ingest(snapshots[start:start + chunk])
+        await service.flush()
+        elapsed = time.perf_counter() - started
+
+        stats = service.stats()
+        print(f"   ingest + COPY            {updates / elapsed:10.0f} updates/s   {elapsed:6.2f} s")
+        print(f"   written {stats['written']}, unchanged {stats['unchanged']}, unresolved {stats['unresolved']}, "
+              f"COPY {stats['copy_rows_per_second']:.0f} rows/s")
+
+        if compare_insert:
+            await benchmark_insert(snapshots, games)
+    finally:
+        await cleanup()
+
+
+async def benchmark_insert(snapshots: List[OddsSnapshot], games):
+    """Для сравнения: те же строки через INSERT executemany"""
+    from sqlalchemy import insert
+    from storage.database import Odds, db_manager
+
+    game_by_teams = {(f"bench team {home_id}", f"bench team {away_id}"): (game_id, date) for game_id, _, home_id, away_id, date in games}
+    rows = [
+        {"game_id": game_by_teams[(s.home_team, s.away_team)][0], "game_date": game_by_teams[(s.home_team, s.away_team)][1],
+         "bookmaker": BOOKMAKER, "timestamp": s.captured_at, **{field: getattr(s, field) for field in PRICE_FIELDS}}
+        for s in snapshots
+    ]
+    started = time.perf_counter()
+    async with db_manager.get_async_session() as session:
+        for start in range(0, len(rows), 5000):
+            await session.execute(insert(Odds), rows[start:start + 5000])
+        await session.commit()
+    elapsed = time.perf_counter() - started
+    print(f"   INSERT executemany (all) {len(rows) / elapsed:10.0f} rows/s      {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Прием коэффициентов: фикстуры и нагрузочный прогон")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=50000)
+    parser.add_argument("--change-rate", type=float, default=0.3)
+    parser.add_argument("--chunk", type=int, default=1000, help="Снимков в одном ответе источника")
+    parser.add_argument("--fixtures-only", action="store_true", help="Только разбор фикстур (без БД)")
+    parser.add_argument("--compare-insert", action="store_true", help="Также замерить INSERT executemany")
+    args = parser.parse_args()
+
+    asyncio.run(show_fixtures())
+    if not args.fixtures_only:
+        asyncio.run(benchmark_ingestion(args.games, args.updates, args.change_rate, args.chunk, args.compare_insert))
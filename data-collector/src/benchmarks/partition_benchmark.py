@@ -0,0 +1,146 @@
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from benchmarks.query_benchmark import SCHEMA, seed, use_benchmark_schema
+from storage.database import Base, db_manager
+from storage.partitions import PARTITIONED_TABLES, season_bounds, season_start_year
+
+# Секционирование по сезонам на синтетических данных (схема query_benchmark):
+# сезонные агрегаты по секционированным таблицам и по их несекционированным копиям,
+# удаление старого сезона - DELETE строк против DETACH + DROP секций.
+
+# Имя -> (псевдоним секционированной таблицы, запрос)
+SEASON_QUERIES = {
+    "season top scorers": ("pgs",
+        "SELECT pgs.player_id, sum(pgs.points) AS points FROM {player_game_stats} pgs "
+        "JOIN games g ON g.id = pgs.game_id WHERE g.season_id = :season_id {bounds} "
+        "GROUP BY pgs.player_id ORDER BY points DESC LIMIT 10"
+    ),
+    "season team assists": ("tgs",
+        "SELECT tgs.team_id, avg(tgs.assists) FROM {team_game_stats} tgs "
+        "JOIN games g ON g.id = tgs.game_id WHERE g.season_id = :season_id {bounds} GROUP BY tgs.team_id"
+    ),
+    "season odds snapshots": ("o",
+        "SELECT o.bookmaker, count(*) FROM {odds} o "
+        "JOIN games g ON g.id = o.game_id WHERE g.season_id = :season_id {bounds} GROUP BY o.bookmaker"
+    ),
+}
+
+
+async def create_flat_copies():
+    """Несекционированные копии таблиц с теми же индексами"""
+    started = time.perf_counter()
+    async with db_manager.engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            await conn.execute(text(f"CREATE TABLE {table}_flat (LIKE {table} INCLUDING DEFAULTS)"))
+            await conn.execute(text(f"INSERT INTO {table}_flat SELECT * FROM {table}"))
+            for index in Base.metadata.tables[table].indexes:
+                columns = ", ".join(column.name for column in index.columns)
+                await conn.execute(text(f"CREATE INDEX {index.name}_flat ON {table}_flat ({columns})"))
+            await conn.execute(text(f"ALTER TABLE {table}_flat ADD PRIMARY KEY (id)"))
+            await conn.execute(text(f"ANALYZE {table}_flat"))
+            await conn.execute(text(f"ANALYZE {table}"))
+    print(f"📋 Flat copies created in {time.perf_counter() - started:.2f} s")
+
+
+async def season_ranges(season_ids: List[int]) -> Dict[int, Tuple]:
+    async with db_manager.engine.connect() as conn:
+        rows = (await conn.execute(text(
+            "SELECT season_id, min(date), max(date) FROM games WHERE season_id = ANY(:ids) GROUP BY season_id"
+        ), {"ids": season_ids})).all()
+    return {season_id: (start, end) for season_id, start, end in rows}
+
+
+async def measure(sql: str, season_ids: List[int], ranges: Dict[int, Tuple], repeat: int, rng: random.Random) -> float:
+    """p50 (мс) запроса по случайным сезонам"""
+    latencies = []
+    async with db_manager.engine.connect() as conn:
+        for n in range(repeat + 1):
+            season_id = rng.choice(season_ids)
+            start, end = ranges[season_id]
+            started = time.perf_counter()
+            await conn.execute(text(sql), {"season_id": season_id, "start": start, "end": end})
+            if n:  # первый прогон - прогрев
+                latencies.append(1000 * (time.perf_counter() - started))
+    return statistics.median(latencies)
+
+
+async def benchmark_queries(season_ids: List[int], repeat: int):
+    ranges = await season_ranges(season_ids)
+    flat = {table: f"{table}_flat" for table in PARTITIONED_TABLES}
+    partitioned = {table: table for table in PARTITIONED_TABLES}
+    print(f"\n📊 Season queries, {repeat} runs each (p50, ms)")
+    print(f"   {'query':<26} {'flat table':>12} {'partitioned':>12} {'speedup':>9}")
+    for name, (alias, template) in SEASON_QUERIES.items():
+        # Границы сезона на ключе секционирования - отсечение секций при планировании
+        bounds = f"AND {alias}.game_date BETWEEN :start AND :end"
+        flat_ms = await measure(template.format(**flat, bounds=""), season_ids, ranges, repeat, random.Random(1))
+        partitioned_ms = await measure(template.format(**partitioned, bounds=bounds), season_ids, ranges, repeat, random.Random(1))
+        print(f"   {name:<26} {flat_ms:12.2f} {partitioned_ms:12.2f} {flat_ms / partitioned_ms if partitioned_ms else 0:8.1f}x")
+
+
+async def benchmark_season_removal(year: int):
+    """Удаление сезона: DELETE из несекционированных копий и отключение секций"""
+    start, end = season_bounds(year)
+    started = time.perf_counter()
+    deleted = 0
+    async with db_manager.engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            result = await conn.execute(
+                text(f"DELETE FROM {table}_flat WHERE game_date >= :start AND game_date < :end"), {"start": start, "end": end}
+            )
+            deleted += result.rowcount
+    delete_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await db_manager.partitions.detach_season(year, drop=True)
+    detach_s = time.perf_counter() - started
+
+    print(f"\n🗑️ Season {year}-{year + 1} removal ({deleted} rows)")
+    print(f"   DELETE rows               {1000 * delete_s:10.1f} ms")
+    print(f"   DETACH + DROP partitions  {1000 * detach_s:10.1f} ms")
+
+
+async def benchmark(leagues: int, seasons: int, games_per_season: int, repeat: int, keep: bool):
+    use_benchmark_schema()
+    async with db_manager.engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        data = await seed(leagues, seasons, games_per_season, random.Random(7))
+        await create_flat_copies()
+        await benchmark_queries(data["seasons"], repeat)
+
+        async with db_manager.engine.connect() as conn:
+            oldest = await conn.scalar(text("SELECT min(date) FROM games"))
+        await benchmark_season_removal(season_start_year(oldest))
+    finally:
+        if not keep:
+            async with db_manager.engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await db_manager.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Секционирование по сезонам: запросы сезона и удаление сезона")
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--games-per-season", type=int, default=1200)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--keep", action="store_true", help="Не удалять схему query_benchmark после прогона")
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.leagues, args.seasons, args.games_per_season, args.repeat, args.keep))
@@ -0,0 +1,206 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+# Синтетические ответы api-sports по формату реального API (для бенчмарков и mock-сервера)
+
+STATUSES = [("Game Finished", "FT"), ("Not Started", "NS"), ("Quarter 3", "Q3"), ("After Over Time", "AOT")]
+
+
+def envelope(endpoint: str, parameters: Dict[str, Any], items: Any) -> Dict[str, Any]:
+    return {
+        "get": endpoint,
+        "parameters": parameters,
+        "errors": [],
+        "results": len(items) if isinstance(items, list) else 1,
+        "response": items,
+    }
+
+
+def make_game(game_id: int, league_id: int = 12, season: str = "2023-2024", rng: random.Random = random) -> Dict[str, Any]:
+    status_long, status_short = rng.choice(STATUSES)
+    tip_off = datetime(2023, 10, 24) + timedelta(hours=game_id % 4000)
+    home_id, away_id = rng.sample(range(130, 160), 2)
+
+    def quarters():
+        q = [rng.randint(15, 40) for _ in range(4)]
+        return {
+            "quarter_1": q[0], "quarter_2": q[1], "quarter_3": q[2], "quarter_4": q[3],
+            "over_time": None, "total": sum(q),
+        }
+
+    return {
+        "id": game_id,
+        "date": tip_off.isoformat() + "+00:00",
+        "time": tip_off.strftime("%H:%M"),
+        "timestamp": int(tip_off.timestamp()),
+        "timezone": "UTC",
+        "stage": None,
+        "week": None,
+        "venue": f"Arena {home_id}",
+        "status": {"long": status_long, "short": status_short, "timer": None},
+        "league": {"id": league_id, "name": "NBA", "type": "League", "season": season, "logo": "https://media.api-sports.io/basketball/leagues/12.png"},
+        "country": {"id": 5, "name": "USA", "code": "US", "flag": "https://media.api-sports.io/flags/us.svg"},
+        "teams": {
+            "home": {"id": home_id, "name": f"Team {home_id}", "logo": f"https://media.api-sports.io/basketball/teams/{home_id}.png"},
+            "away": {"id": away_id, "name": f"Team {away_id}", "logo": f"https://media.api-sports.io/basketball/teams/{away_id}.png"},
+        },
+        "scores": {"home": quarters(), "away": quarters()},
+    }
+
+
+def _shooting(rng: random.Random, attempts_max: int) -> Dict[str, Any]:
+    attempts = rng.randint(0, attempts_max)
+    made = rng.randint(0, attempts)
+    return {"total": made, "attempts": attempts, "percentage": round(made * 100 / attempts) if attempts else None}
+
+
+def make_team_game_stats(game_id: int, team_id: int, rng: random.Random = random) -> Dict[str, Any]:
+    return {
+        "game": {"id": game_id},
+        "team": {"id": team_id},
+        "field_goals": _shooting(rng, 95),
+        "threepoint_goals": _shooting(rng, 45),
+        "freethrows_goals": _shooting(rng, 35),
+        "rebounds": {"total": rng.randint(30, 60), "offence": rng.randint(5, 15), "defense": rng.randint(25, 45)},
+        "assists": rng.randint(15, 35),
+        "steals": rng.randint(3, 12),
+        "blocks": rng.randint(1, 10),
+        "turnovers": rng.randint(8, 20),
+        "personal_fouls": rng.randint(12, 28),
+    }
+
+
+def make_player_game_stats(game_id: int, team_id: int, player_id: int, rng: random.Random = random) -> Dict[str, Any]:
+    minutes = rng.randint(0, 42)
+    return {
+        "game": {"id": game_id},
+        "team": {"id": team_id},
+        "player": {"id": player_id, "name": f"Player {player_id}"},
+        "type": "starters" if player_id % 12 < 5 else "bench",
+        "minutes": f"{minutes}:{rng.randint(0, 59):02d}",
+        "field_goals": _shooting(rng, 25),
+        "threepoint_goals": _shooting(rng, 12),
+        "freethrows_goals": _shooting(rng, 12),
+        "rebounds": {"total": rng.randint(0, 15)},
+        "assists": rng.randint(0, 12),
+        "points": rng.randint(0, 40),
+    }
+
+
+def games_payload(count: int = 1230, league_id: int = 12, season: str = "2023-2024", seed: int = 42) -> Dict[str, Any]:
+    """Ответ /games за сезон лиги"""
+    rng = random.Random(seed)
+    games = [make_game(100000 + i, league_id, season, rng) for i in range(count)]
+    return envelope("games", {"league": str(league_id), "season": season}, games)
+
+
+def teams_statistics_payload(game_ids: List[int], seed: int = 42) -> Dict[str, Any]:
+    """Ответ /games/statistics/teams"""
+    rng = random.Random(seed)
+    items = [make_team_game_stats(game_id, team_id, rng) for game_id in game_ids for team_id in (130 + game_id % 15, 145 + game_id % 15)]
+    return envelope("games/statistics/teams", {"ids": "-".join(map(str, game_ids))}, items)
+
+
+def players_statistics_payload(game_ids: List[int], players_per_team: int = 12, seed: int = 42) -> Dict[str, Any]:
+    """Ответ /games/statistics/players (~25 строк на игру)"""
+    rng = random.Random(seed)
+    items = [
+        make_player_game_stats(game_id, team_id, team_id * 100 + n, rng)
+        for game_id in game_ids
+        for team_id in (130 + game_id % 15, 145 + game_id % 15)
+        for n in range(players_per_team)
+    ]
+    return envelope("games/statistics/players", {"ids": "-".join(map(str, game_ids))}, items)
+
+
+def seasons_payload() -> Dict[str, Any]:
+    """Ответ /seasons"""
+    seasons = list(range(2008, 2025)) + [f"{year}-{year + 1}" for year in range(2008, 2025)]
+    return envelope("seasons", [], seasons)
+
+
+def countries_payload(count: int = 50) -> Dict[str, Any]:
+    """Ответ /countries"""
+    countries = [
+        {"id": i, "name": f"Country {i}", "code": f"C{i:02d}"[:2], "flag": f"https://media.api-sports.io/flags/{i}.svg"}
+        for i in range(1, count + 1)
+    ]
+    return envelope("countries", [], countries)
+
+
+def leagues_payload(count: int = 40, seed: int = 42) -> Dict[str, Any]:
+    """Ответ /leagues (у части сезонов нет coverage статистики)"""
+    rng = random.Random(seed)
+    leagues = []
+    for league_id in range(1, count + 1):
+        seasons = []
+        for year in range(2019, 2025):
+            with_stats = rng.random() < 0.7
+            seasons.append({
+                "season": f"{year}-{year + 1}",
+                "start": f"{year}-10-01",
+                "end": f"{year + 1}-06-30",
+                "coverage": {
+                    "games": {"statistics": {"teams": with_stats, "players": with_stats}},
+                    "standings": True,
+                    "players": True,
+                    "odds": rng.random() < 0.5,
+                },
+            })
+        leagues.append({
+            "id": league_id,
+            "name": f"League {league_id}",
+            "type": "League",
+            "logo": f"https://media.api-sports.io/basketball/leagues/{league_id}.png",
+            "country": {"id": league_id % 50 + 1, "name": f"Country {league_id % 50 + 1}", "code": None, "flag": None},
+            "seasons": seasons,
+        })
+    return envelope("leagues", {}, leagues)
+
+
+def teams_payload(league_id: int = 12, count: int = 30) -> Dict[str, Any]:
+    """Ответ /teams"""
+    teams = [
+        {
+            "id": 130 + i,
+            "name": f"Team {130 + i}",
+            "nationnal": False,
+            "logo": f"https://media.api-sports.io/basketball/teams/{130 + i}.png",
+            "country": {"id": 5, "name": "USA", "code": "US", "flag": "https://media.api-sports.io/flags/us.svg"},
+        }
+        for i in range(count)
+    ]
+    return envelope("teams", {"league": str(league_id)}, teams)
+
+
+def players_payload(team_id: int = 130, count: int = 15) -> Dict[str, Any]:
+    """Ответ /players"""
+    players = [
+        {"id": team_id * 100 + i, "name": f"Player {team_id * 100 + i}", "number": str(i), "country": "USA", "position": "G", "age": 20 + i}
+        for i in range(count)
+    ]
+    return envelope("players", {"team": str(team_id)}, players)
+
+
+def team_statistics_payload(league_id: int = 12, season: str = "2023-2024", team_id: int = 130) -> Dict[str, Any]:
+    """Ответ /statistics"""
+    def wdl(total: int, played: int) -> Dict[str, Any]:
+        return {"total": total, "percentage": f"{total / played:.3f}" if played else "0.000"}
+
+    stats = {
+        "league": {"id": league_id, "name": "NBA", "type": "League", "season": season, "logo": ""},
+        "country": {"id": 5, "name": "USA", "code": "US", "flag": ""},
+        "team": {"id": team_id, "name": f"Team {team_id}", "logo": ""},
+        "games": {
+            "played": {"home": 41, "away": 41, "all": 82},
+            "wins": {"home": wdl(28, 41), "away": wdl(20, 41), "all": wdl(48, 82)},
+            "draws": {"home": wdl(0, 41), "away": wdl(0, 41), "all": wdl(0, 82)},
+            "loses": {"home": wdl(13, 41), "away": wdl(21, 41), "all": wdl(34, 82)},
+        },
+        "points": {
+            "for": {"total": {"home": 4700, "away": 4500, "all": 9200}, "average": {"home": "114.6", "away": "109.8", "all": "112.2"}},
+            "against": {"total": {"home": 4500, "away": 4600, "all": 9100}, "average": {"home": "109.8", "away": "112.2", "all": "111.0"}},
+        },
+    }
+    return envelope("statistics", {"league": str(league_id), "season": season, "team": str(team_id)}, stats)
@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from storage.database import Base, db_manager
+from storage.instrumentation import InstrumentedQueuePool
+from storage.partitions import season_start_year
+from storage.repositories import repositories
+
+# Задержки запросов репозиториев без вторичных индексов и с индексами миграции 0003
+# на синтетических данных нескольких сезонов. Данные - в отдельной схеме
+# query_benchmark той же БД (основные таблицы не затрагиваются).
+
+SCHEMA = "query_benchmark"
+LIVE_STATUSES = ["Q1", "Q2", "Q3", "Q4", "OT", "BT", "HT"]
+
+
+def use_benchmark_schema():
+    """Репозитории работают через db_manager - переключаем его движок на схему бенчмарка"""
+    db_manager.engine = create_async_engine(
+        db_manager.engine.url,
+        poolclass=InstrumentedQueuePool,
+        connect_args={"server_settings": {"search_path": SCHEMA}}
+    )
+    db_manager.async_session_maker = async_sessionmaker(db_manager.engine, class_=AsyncSession, expire_on_commit=False)
+    # Схема бенчмарка есть только в основной БД - чтения репозиториев тоже туда
+    db_manager.read_engine = db_manager.engine
+    db_manager.read_session_maker = db_manager.async_session_maker
+
+
+def secondary_indexes():
+    """Индексы моделей (уникальные ключи - часть схемы и остаются)"""
+    return [index for table in Base.metadata.sorted_tables for index in table.indexes]
+
+
+async def seed(leagues: int, seasons: int, games_per_season: int, rng: random.Random) -> Dict[str, list]:
+    """Синтетические лиги/сезоны/команды/игроки/игры/статистика/коэффициенты через COPY"""
+    now = datetime.utcnow().replace(microsecond=0)
+    league_rows, season_rows, team_rows, player_rows = [], [], [], []
+    game_rows, team_stats_rows, player_stats_rows, odds_rows = [], [], [], []
+    teams_by_league: Dict[int, List[int]] = {}
+    players_by_team: Dict[int, List[int]] = {}
+
+    for league_id in range(1, leagues + 1):
+        league_rows.append((league_id, f"League {league_id}"))
+        teams_by_league[league_id] = []
+        for n in range(30):
+            team_id = league_id * 100 + n
+            team_rows.append((team_id, f"Team {team_id}"))
+            teams_by_league[league_id].append(team_id)
+            players_by_team[team_id] = [team_id * 100 + k for k in range(12)]
+            player_rows.extend((player_id, f"Player {player_id}") for player_id in players_by_team[team_id])
+
+    season_id = 0
+    game_id = 0
+    # Сезоны с октября по май, как в большинстве лиг (сезон целиком в одной секции);
+    # последний - текущий: часть игр идет сейчас или еще впереди
+    current_year = season_start_year(now)
+    for league_id in range(1, leagues + 1):
+        for s in range(seasons):
+            season_id += 1
+            season_start = datetime(current_year - (seasons - s - 1), 10, 1)
+            season_rows.append((season_id, league_id, f"{season_start.year}-{season_start.year + 1}"))
+            for _ in range(games_per_season):
+                game_id += 1
+                home_id, away_id = rng.sample(teams_by_league[league_id], 2)
+                date = season_start + timedelta(minutes=rng.randrange(240 * 24 * 60))
+                if date > now + timedelta(hours=3):
+                    status = "NS"
+                elif date > now - timedelta(hours=3):
+                    status = rng.choice(LIVE_STATUSES)
+                else:
+                    status = "FT"
+                game_rows.append((game_id, league_id, season_id, home_id, away_id, date, status))
+                if status != "FT":
+                    continue
+                for team_id in (home_id, away_id):
+                    team_stats_rows.append((game_id, date, team_id, rng.randrange(15, 35)))
+                    for player_id in rng.sample(players_by_team[team_id], 10):
+                        player_stats_rows.append((game_id, date, team_id, player_id, rng.randrange(0, 35)))
+                for k in range(3):
+                    odds_rows.append((game_id, date, "benchmark", round(rng.uniform(1.2, 3.5), 2), round(rng.uniform(1.2, 3.5), 2),
+                                      date - timedelta(hours=3 - k)))
+
+    # Секции сезонов для статистики и коэффициентов
+    await db_manager.partitions.ensure_upcoming()
+    await db_manager.partitions.ensure_dates(row[5] for row in game_rows)
+
+    async with db_manager.engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        asyncpg_conn = raw.driver_connection
+        for table, columns, rows in (
+            ("leagues", ["id", "name"], league_rows),
+            ("seasons", ["id", "league_id", "season"], season_rows),
+            ("teams", ["id", "name"], team_rows),
+            ("players", ["id", "name"], player_rows),
+            ("games", ["id", "league_id", "season_id", "home_team_id", "away_team_id", "date", "status"], game_rows),
+            ("team_game_stats", ["game_id", "game_date", "team_id", "assists"], team_stats_rows),
+            ("player_game_stats", ["game_id", "game_date", "team_id", "player_id", "points"], player_stats_rows),
+            ("odds", ["game_id", "game_date", "bookmaker", "odds_home", "odds_away", "timestamp"], odds_rows),
+        ):
+            await asyncpg_conn.copy_records_to_table(table, records=rows, columns=columns, schema_name=SCHEMA)
+
+    print(f"🌱 Seeded {len(season_rows)} seasons, {len(game_rows)} games, "
+          f"{len(player_stats_rows)} player stats rows, {len(odds_rows)} odds rows")
+    return {
+        "seasons": [row[0] for row in season_rows],
+        "teams_by_league": teams_by_league,
+        "games": game_rows,
+        "players": [row[0] for row in player_rows],
+    }
+
+
+def build_queries(data: Dict[str, list], rng: random.Random) -> List[Tuple[str, Callable[[], Awaitable[object]]]]:
+    leagues = list(data["teams_by_league"])
+    games = data["games"]
+
+    def team_pair():
+        return tuple(rng.sample(data["teams_by_league"][rng.choice(leagues)], 2))
+
+    def game_window():
+        game = rng.choice(games)
+        return [(game[3], game[4])], game[5] - timedelta(hours=12), game[5] + timedelta(hours=12)
+
+    return [
+        ("games.get_head_to_head", lambda: repositories.games.get_head_to_head(*team_pair())),
+        ("games.get_games_by_team(season)", lambda: repositories.games.get_games_by_team(
+            rng.choice(team_pair()), season_id=rng.choice(data["seasons"]))),
+        ("games.get_live_games", lambda: repositories.games.get_live_games()),
+        ("games.get_upcoming_games", lambda: repositories.games.get_upcoming_games(hours=24)),
+        ("games.find_games_by_teams", lambda: repositories.games.find_games_by_teams(*game_window())),
+        ("player_stats.get_player_season_stats", lambda: repositories.player_stats.get_player_season_stats(
+            rng.choice(data["players"]), rng.choice(data["seasons"]))),
+        ("player_stats.get_top_scorers", lambda: repositories.player_stats.get_top_scorers(rng.choice(data["seasons"]))),
+        ("odds.get_latest_prices", lambda: repositories.odds.get_latest_prices(
+            [game[0] for game in rng.sample(games, 20)])),
+        ("odds.get_game_odds", lambda: repositories.odds.get_game_odds(rng.choice(games)[0])),
+    ]
+
+
+async def measure(queries, repeat: int) -> Dict[str, Tuple[float, float]]:
+    """p50 и среднее (мс) по каждому запросу"""
+    results = {}
+    for name, query in queries:
+        await query()  # прогрев (кеш планов и страниц)
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await query()
+            latencies.append(1000 * (time.perf_counter() - started))
+        results[name] = (statistics.median(latencies), statistics.mean(latencies))
+    return results
+
+
+async def analyze():
+    async with db_manager.engine.begin() as conn:
+        for table in ("games", "player_game_stats", "team_game_stats", "odds"):
+            await conn.execute(text(f"ANALYZE {table}"))
+
+
+async def benchmark(leagues: int, seasons: int, games_per_season: int, repeat: int, keep: bool):
+    use_benchmark_schema()
+    async with db_manager.engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.run_sync(Base.metadata.create_all)
+        # Состояние до миграции 0003: без вторичных индексов
+        for index in secondary_indexes():
+            await conn.run_sync(index.drop)
+
+    try:
+        rng = random.Random(7)
+        data = await seed(leagues, seasons, games_per_season, rng)
+        await analyze()
+
+        before = await measure(build_queries(data, random.Random(1)), repeat)
+
+        started = time.perf_counter()
+        async with db_manager.engine.begin() as conn:
+            for index in secondary_indexes():
+                await conn.run_sync(index.create)
+        await analyze()
+        print(f"🔧 Created {len(secondary_indexes())} indexes in {time.perf_counter() - started:.2f} s")
+
+        after = await measure(build_queries(data, random.Random(1)), repeat)
+
+        print(f"\n📊 Repository query latency, {repeat} runs each (p50 / avg, ms)")
+        print(f"   {'query':<40} {'without indexes':>20} {'with indexes':>20} {'speedup':>9}")
+        for name, (p50_before, avg_before) in before.items():
+            p50_after, avg_after = after[name]
+            print(f"   {name:<40} {p50_before:9.2f} / {avg_before:8.2f} {p50_after:9.2f} / {avg_after:8.2f} "
+                  f"{p50_before / p50_after if p50_after else 0:8.1f}x")
+    finally:
+        if not keep:
+            async with db_manager.engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await db_manager.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Задержки запросов репозиториев до и после индексов")
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--games-per-season", type=int, default=1200)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--keep", action="store_true", help="Не удалять схему query_benchmark после прогона")
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.leagues, args.seasons, args.games_per_season, args.repeat, args.keep))
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text
+
+from benchmarks.query_benchmark import SCHEMA, seed, use_benchmark_schema
+from storage.database import Base, db_manager
+from storage.repositories import repositories
+
+# Загрузка статистики игр (player_game_stats, team_game_stats) пакетами, как при
+# историческом сборе: bulk_upsert (INSERT ... VALUES с параметрами) против
+# copy_upsert (COPY во временную таблицу и слияние ON CONFLICT). Прогоны: пустые
+# таблицы, повторная загрузка без изменений (skip_unchanged) и с исправленными строками.
+
+METHODS = ("bulk_upsert", "copy_upsert")
+
+
+def box_score_rows(games: List[tuple], players_per_team: int, rng: random.Random) -> Dict[str, List[Dict[str, Any]]]:
+    """Строки статистики завершенных игр в формате DataOrchestrator._*_game_stats_row"""
+    team_rows, player_rows = [], []
+    for game_id, _, _, home_id, away_id, date, status in games:
+        if status != "FT":
+            continue
+        for team_id in (home_id, away_id):
+            team_rows.append({
+                'game_id': game_id, 'game_date': date, 'team_id': team_id,
+                'field_goals_made': rng.randrange(25, 50), 'field_goals_attempted': rng.randrange(60, 95),
+                'field_goals_percentage': round(rng.uniform(0.35, 0.6), 3),
+                'three_point_made': rng.randrange(5, 20), 'three_point_attempted': rng.randrange(20, 45),
+                'three_point_percentage': round(rng.uniform(0.25, 0.45), 3),
+                'free_throws_made': rng.randrange(10, 25), 'free_throws_attempted': rng.randrange(15, 30),
+                'free_throws_percentage': round(rng.uniform(0.6, 0.9), 3),
+                'rebounds_total': rng.randrange(30, 55), 'rebounds_offensive': rng.randrange(5, 15),
+                'rebounds_defensive': rng.randrange(20, 40), 'assists': rng.randrange(15, 35),
+                'steals': rng.randrange(3, 12), 'blocks': rng.randrange(1, 8),
+                'turnovers': rng.randrange(8, 20), 'personal_fouls': rng.randrange(15, 28),
+            })
+            for n in range(players_per_team):
+                player_rows.append({
+                    'game_id': game_id, 'game_date': date, 'team_id': team_id, 'player_id': team_id * 100 + n,
+                    'player_type': "starters" if n < 5 else "bench", 'minutes_played': f"{rng.randrange(0, 40)}:{rng.randrange(60):02d}",
+                    'field_goals_made': rng.randrange(0, 12), 'field_goals_attempted': rng.randrange(0, 20),
+                    'field_goals_percentage': round(rng.uniform(0, 0.7), 3),
+                    'three_point_made': rng.randrange(0, 5), 'three_point_attempted': rng.randrange(0, 10),
+                    'three_point_percentage': round(rng.uniform(0, 0.5), 3),
+                    'free_throws_made': rng.randrange(0, 8), 'free_throws_attempted': rng.randrange(0, 10),
+                    'free_throws_percentage': round(rng.uniform(0, 1), 3),
+                    'rebounds_total': rng.randrange(0, 12), 'assists': rng.randrange(0, 10), 'points': rng.randrange(0, 35),
+                })
+    return {"team_game_stats": team_rows, "player_stats": player_rows}
+
+
+def corrected(rows: List[Dict[str, Any]], share: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """Доля строк с исправленными значениями (остальные без изменений)"""
+    return [{**row, 'assists': row['assists'] + 1} if rng.random() < share else row for row in rows]
+
+
+async def load(method: str, rows_by_repository: Dict[str, List[Dict[str, Any]]], batch_rows: int) -> Dict[str, float]:
+    """Запись пакетами по batch_rows строк, пакет - unit of work (как стадия persist конвейера)"""
+    written = total = 0
+    started = time.perf_counter()
+    for name, rows in rows_by_repository.items():
+        repository = getattr(repositories, name)
+        for start in range(0, len(rows), batch_rows):
+            batch = rows[start:start + batch_rows]
+            async with db_manager.unit_of_work():
+                written += await getattr(repository, method)(batch, skip_unchanged=True)
+            total += len(batch)
+    duration = time.perf_counter() - started
+    return {"rows": total, "written": written, "seconds": duration, "rows_per_second": total / duration}
+
+
+async def truncate():
+    async with db_manager.engine.begin() as conn:
+        await conn.execute(text("TRUNCATE player_game_stats, team_game_stats"))
+
+
+async def benchmark(leagues: int, seasons: int, games_per_season: int, batch_games: int, keep: bool):
+    use_benchmark_schema()
+    async with db_manager.engine.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    try:
+        data = await seed(leagues, seasons, games_per_season, random.Random(7))
+        rows = box_score_rows(data["games"], 12, random.Random(11))
+        changed = {name: corrected(batch, 0.1, random.Random(13)) for name, batch in rows.items()}
+        # Пакет - статистика batch_games игр (запрос ids= отдает до 20 игр)
+        batch_rows = batch_games * 2 * 12
+
+        results = {}
+        for method in METHODS:
+            await truncate()
+            results[(method, "insert")] = await load(method, rows, batch_rows)
+            results[(method, "reload unchanged")] = await load(method, rows, batch_rows)
+            results[(method, "reload 10% changed")] = await load(method, changed, batch_rows)
+
+        print(f"\n📊 Box score load, {batch_games} games ({batch_rows} player rows) per transaction")
+        print(f"   {'phase':<20} {'method':<12} {'rows':>9} {'written':>9} {'seconds':>9} {'rows/s':>10}")
+        for (method, phase), result in results.items():
+            print(f"   {phase:<20} {method:<12} {result['rows']:9d} {result['written']:9d} "
+                  f"{result['seconds']:9.2f} {result['rows_per_second']:10.0f}")
+        for phase in ("insert", "reload unchanged", "reload 10% changed"):
+            base, copy = results[("bulk_upsert", phase)], results[("copy_upsert", phase)]
+            print(f"   {phase:<20} copy_upsert speedup {copy['rows_per_second'] / base['rows_per_second']:.1f}x")
+    finally:
+        if not keep:
+            async with db_manager.engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        await db_manager.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка статистики игр: bulk_upsert против COPY через временную таблицу")
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--seasons", type=int, default=2)
+    parser.add_argument("--games-per-season", type=int, default=600)
+    parser.add_argument("--batch-games", type=int, default=20, help="Игр в одной транзакции записи")
+    parser.add_argument("--keep", action="store_true", help="Не удалять схему query_benchmark после прогона")
+    args = parser.parse_args()
+
+    asyncio.run(benchmark(args.leagues, args.seasons, args.games_per_season, args.batch_games, args.keep))
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, List
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from api.basketball_api import BasketballAPI
+from benchmarks.mock_api_server import MockSettings, create_app
+
+# Пропускная способность BasketballAPI (и при наличии БД - DataOrchestrator)
+# против локального mock api-sports, без сети и без расхода квоты.
+
+
+def create_mock_client(settings: MockSettings) -> BasketballAPI:
+    """Клиент, подключенный к mock-серверу напрямую через ASGI"""
+    transport = httpx.ASGITransport(app=create_app(settings))
+    return BasketballAPI("benchmark", base_url="http://mock-api", transport=transport)
+
+
+async def run_load(name: str, call: Callable[[int], Awaitable[object]], total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one(i: int):
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            result = await call(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if result is None:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    print(f"   {name:<34} {total / elapsed:8.1f} req/s   p50 {statistics.median(latencies):7.1f} ms"
+          f"   p95 {p95:7.1f} ms   failed {failures}")
+
+
+async def benchmark_client(settings: MockSettings, total: int, concurrency: int):
+    api = create_mock_client(settings)
+    print(f"\n🏀 BasketballAPI vs mock (latency {settings.latency_ms} ms, errors {settings.error_rate:.0%}), "
+          f"{total} calls, concurrency {concurrency}")
+    try:
+        await run_load("get_games(date)", lambda i: api.get_games(date=f"2024-01-{i % 28 + 1:02d}"), total, concurrency)
+        await run_load("get_games(league, season)", lambda i: api.get_games(league=12, season=f"{2000 + i % 24}-{2001 + i % 24}"), max(total // 10, 1), concurrency)
+        await run_load("get_players_statistics(20 ids)", lambda i: api.get_players_statistics(game_ids="-".join(str(i * 20 + n) for n in range(20))), total, concurrency)
+        await run_load("get_teams(league)", lambda i: api.get_teams(league=i % 40 + 1, season="2023-2024"), total, concurrency)
+    finally:
+        await api.close()
+
+
+async def benchmark_orchestrator(settings: MockSettings):
+    """Полный исторический проход оркестратора (нужен DATABASE_URL)"""
+    from services.data_orchestrator import DataOrchestrator
+
+    api = create_mock_client(settings)
+    orchestrator = DataOrchestrator(api)
+    print("\n📚 DataOrchestrator.collect_historical_data vs mock")
+    try:
+        started = time.perf_counter()
+        await orchestrator.collect_historical_data()
+        print(f"   completed in {time.perf_counter() - started:.2f} s")
+    finally:
+        await api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест клиента api-sports на mock-сервере")
+    parser.add_argument("--total", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cassettes", help="Каталог с записанными ответами")
+    parser.add_argument("--orchestrator", action="store_true", help="Также прогнать DataOrchestrator (нужна БД)")
+    args = parser.parse_args()
+
+    mock_settings = MockSettings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        cassette_dir=args.cassettes,
+    )
+    asyncio.run(benchmark_client(mock_settings, args.total, args.concurrency))
+    if args.orchestrator:
+        asyncio.run(benchmark_orchestrator(mock_settings))
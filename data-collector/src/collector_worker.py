@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from dotenv import load_dotenv
+
+# Переменные окружения нужны до импорта storage (DATABASE_URL читается при импорте)
+load_dotenv('config/.env')
+
+from structlog import get_logger
+
+logger = get_logger()
+
+# Отдельный процесс(ы) сбора данных без FastAPI:
+#   python collector_worker.py --processes 4      - супервизор, запускает и перезапускает 4 воркера
+#   python collector_worker.py --worker-index 2   - один воркер (например, по контейнеру на воркер)
+# Лиги делятся по шардам консистентным хешированием, владелец шарда определяется
+# advisory-блокировкой PostgreSQL; при падении воркера его шарды забирают остальные.
+
+
+async def run_worker(worker_index: Optional[int], processes: int):
+    """Цикл сбора одного воркера до SIGTERM/SIGINT"""
+    from services.collector_factory import create_basketball_api, create_data_orchestrator, create_shard_coordinator, worker_quota_shares
+
+    # Квота api-sports общая на аккаунт - делим ее между процессами; лидер (лайв-опрос) получает большую долю
+    quota_shares = worker_quota_shares(processes)
+    basketball_api = create_basketball_api(quota_share=quota_shares[1])
+    orchestrator = create_data_orchestrator(
+        basketball_api, coordinator=create_shard_coordinator(worker_index), quota_shares=quota_shares
+    )
+
+    collection = asyncio.ensure_future(orchestrator.start_collection())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, collection.cancel)
+
+    logger.info("🚀 Collector worker started", worker_index=worker_index, pid=os.getpid(),
+                shards=orchestrator.coordinator.shards)
+    try:
+        await collection
+    except asyncio.CancelledError:
+        logger.info("🛑 Collector worker stopping", worker_index=worker_index)
+    finally:
+        if orchestrator.event_bus:
+            await orchestrator.event_bus.close()
+        await basketball_api.close()
+
+
+def _worker_process(worker_index: int, processes: int):
+    try:
+        asyncio.run(run_worker(worker_index, processes))
+    except KeyboardInterrupt:
+        pass
+
+
+def supervise(processes: int, restart_delay: float = 5.0):
+    """Запуск N воркеров и перезапуск упавших (их шарды тем временем забирают живые)"""
+    context = multiprocessing.get_context("spawn")
+    workers: Dict[int, multiprocessing.Process] = {}
+    stopping = False
+
+    def start(worker_index: int):
+        process = context.Process(target=_worker_process, args=(worker_index, processes),
+                                  name=f"collector-worker-{worker_index}")
+        process.start()
+        workers[worker_index] = process
+        logger.info("▶️ Worker process started", worker_index=worker_index, pid=process.pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for worker_index in range(processes):
+        start(worker_index)
+
+    while not stopping:
+        time.sleep(restart_delay)
+        for worker_index, process in list(workers.items()):
+            if not process.is_alive() and not stopping:
+                logger.warning("⚠️ Worker process died, restarting", worker_index=worker_index,
+                               exitcode=process.exitcode)
+                start(worker_index)
+
+    for process in workers.values():
+        if process.is_alive():
+            process.terminate()
+    for process in workers.values():
+        process.join(timeout=30)
+    logger.info("🛑 Collector workers stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Шардированный сборщик данных api-sports")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("COLLECTOR_WORKER_PROCESSES", "2")),
+                        help="Число процессов-воркеров (и делитель квоты API)")
+    parser.add_argument("--worker-index", type=int, help="Запустить один воркер с этим номером")
+    args = parser.parse_args()
+
+    if args.worker_index is not None:
+        _worker_process(args.worker_index, args.processes)
+    else:
+        supervise(args.processes)
@@ -1,19 +1,23 @@
 import asyncio
 from typing import Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 import uvicorn
 from dotenv import load_dotenv
 from sqlalchemy import text 
-import os
 from storage.database import db_manager
+from storage.instrumentation import UNMATCHED_ROUTE
 from storage.repositories import repositories
 
-from api.basketball_api import BasketballAPI
+from api.basketball_api import MAX_GAME_IDS_PER_REQUEST
+from services.collector_factory import create_basketball_api, create_data_orchestrator, create_odds_service, create_shard_coordinator
 from services.data_orchestrator import DataOrchestrator
+from services.odds_ingestion import ODDS_DEAD_LETTER_KIND, OddsIngestionService
+from services.standings import season_stats_aggregator
 
 # Загружаем переменные окружения
 load_dotenv('config/.env')
 data_orchestrator: Optional[DataOrchestrator] = None
+odds_service: Optional[OddsIngestionService] = None
 
 app = FastAPI(
     title="Basketball Data Collector",
@@ -24,17 +28,43 @@ app = FastAPI(
 # Глобальный клиент API
 basketball_api = None
 
+@app.middleware("http")
+async def count_database_queries(request: Request, call_next):
+    """Число запросов к БД на HTTP-запрос (метрики по маршрутам, предупреждение о N+1)"""
+    with db_manager.instrumentation.track_request(UNMATCHED_ROUTE, path=request.url.path) as queries:
+        response = await call_next(request)
+        # Шаблон маршрута вместо пути, чтобы /games/1 и /games/2 считались вместе
+        # (не найденные пути - одной меткой UNMATCHED_ROUTE)
+        route = request.scope.get("route")
+        if route is not None:
+            queries.route = f"{request.method} {route.path}"
+    response.headers["X-DB-Queries"] = str(queries.queries)
+    return response
+
+def parse_game_ids(game_ids: Optional[str]) -> list[int]:
+    """Разбор параметра game_ids формата "1-2-3" """
+    if not game_ids:
+        return []
+    try:
+        return [int(game_id) for game_id in game_ids.split('-') if game_id]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="game_ids must be integers separated by '-'")
+
 @app.on_event("startup")
 async def startup_event():
     """Инициализация при запуске"""
-    global basketball_api, data_orchestrator
+    global basketball_api, data_orchestrator, odds_service
     
-    api_key = os.getenv("BASKETBALL_API_KEY")
-    if not api_key:
-        raise Exception("BASKETBALL_API_KEY not found in environment variables")
+    basketball_api = create_basketball_api()
+    # Несколько воркеров uvicorn/реплик делят лиги через advisory-блокировки
+    data_orchestrator = create_data_orchestrator(basketball_api, coordinator=create_shard_coordinator())
+    odds_service = create_odds_service()
     
-    basketball_api = BasketballAPI(api_key)
-    data_orchestrator = DataOrchestrator(basketball_api)
+    # Секции текущего и следующего сезона (остальные создаются при записи)
+    try:
+        await db_manager.partitions.ensure_upcoming()
+    except Exception as e:
+        print(f"⚠️ Failed to prepare season partitions: {e}")
     
     print("🚀 Basketball Data Collector started!")
 
@@ -45,8 +75,18 @@ async def shutdown_event():
     if data_orchestrator and data_orchestrator.is_running:
         await data_orchestrator.stop_collection()
     
+    if data_orchestrator and data_orchestrator.event_bus:
+        await data_orchestrator.event_bus.close()
+    
+    if odds_service:
+        await odds_service.stop()
+        await odds_service.flush()
+        await odds_service.close()
+    
     if basketball_api:
         await basketball_api.close()
+    
+    await db_manager.dispose()
 
 @app.post("/collection/start")
 async def start_collection():
@@ -80,18 +120,163 @@ async def get_collection_status():
     
     return {
         "status": "running" if data_orchestrator.is_running else "stopped",
-        "is_running": data_orchestrator.is_running
+        "is_running": data_orchestrator.is_running,
+        "metrics": data_orchestrator.get_metrics(),
+        "backfill": await data_orchestrator.get_backfill_progress(),
+        "sharding": data_orchestrator.get_sharding_status(),
+        "rate_limit": basketball_api.rate_limiter.stats() if basketball_api and basketball_api.rate_limiter else None
     }
 
+@app.get("/collection/pipelines")
+async def get_pipeline_metrics():
+    """Метрики стадий конвейеров сбора (глубина очередей, пропускная способность, задержки)"""
+    if not data_orchestrator:
+        raise HTTPException(status_code=500, detail="Data orchestrator not initialized")
+    
+    return {name: pipeline.stats() for name, pipeline in data_orchestrator.pipelines.items()}
+
+@app.get("/collection/poll-plan")
+async def get_poll_plan(limit: int = 50):
+    """План ближайших опросов лайв-игр"""
+    if not data_orchestrator:
+        raise HTTPException(status_code=500, detail="Data orchestrator not initialized")
+    
+    await data_orchestrator.live_scheduler.refresh()
+    return data_orchestrator.live_scheduler.get_plan(limit=limit)
+
 @app.post("/collection/historical")
-async def collect_historical_data():
-    """Ручной запуск сбора исторических данных"""
+async def collect_historical_data(force: bool = False):
+    """Ручной запуск сбора исторических данных (force - без пропуска завершенных ресурсов)"""
+    if not data_orchestrator:
+        raise HTTPException(status_code=500, detail="Data orchestrator not initialized")
+    
+    if data_orchestrator.backfill.is_running:
+        raise HTTPException(status_code=400, detail="Historical data collection is already running")
+    
+    totals = await data_orchestrator.collect_historical_data(force=force)
+    
+    return {"status": "completed", "message": "Historical data collection completed", "totals": totals}
+
+@app.get("/collection/dead-letters")
+async def get_dead_letters(kind: Optional[str] = None, status: Optional[str] = "pending", limit: int = 100):
+    """Элементы, которые не удалось записать (kind: league, team, game, odds)"""
+    if not data_orchestrator:
+        raise HTTPException(status_code=500, detail="Data orchestrator not initialized")
+    
+    return await data_orchestrator.get_dead_letters(kind=kind, status=status, limit=limit)
+
+@app.post("/collection/dead-letters/replay")
+async def replay_dead_letters(kind: Optional[str] = None, limit: int = 1000):
+    """Повторная запись элементов из dead-letter очереди"""
     if not data_orchestrator:
         raise HTTPException(status_code=500, detail="Data orchestrator not initialized")
     
-    await data_orchestrator.collect_historical_data()
+    totals = await data_orchestrator.replay_dead_letters(kind=kind, limit=limit)
+    if odds_service and kind in (None, ODDS_DEAD_LETTER_KIND):
+        totals["odds"] = await odds_service.replay_dead_letters(limit=limit)
+    
+    return {"status": "completed", "totals": totals}
+
+@app.delete("/collection/dead-letters")
+async def purge_dead_letters():
+    """Удаление успешно повторенных элементов"""
+    deleted = await repositories.dead_letters.purge_replayed()
+    
+    return {"status": "completed", "deleted": deleted}
+
+@app.get("/events/games")
+async def get_game_events(cursor: Optional[str] = None, consumer: Optional[str] = None, count: int = 100):
+    """События переходов статуса и счета игр после курсора (или сохраненного курсора consumer)"""
+    if not data_orchestrator:
+        raise HTTPException(status_code=500, detail="Data orchestrator not initialized")
+    
+    return await data_orchestrator.read_game_events(cursor=cursor, consumer=consumer, count=count)
+
+@app.post("/events/games/cursors/{consumer}")
+async def commit_game_events_cursor(consumer: str, cursor: str):
+    """Фиксация курсора потребителя после обработки событий"""
+    if not data_orchestrator or not data_orchestrator.event_bus:
+        raise HTTPException(status_code=500, detail="Event bus not initialized")
+    
+    await data_orchestrator.event_bus.commit(consumer, cursor)
+    
+    return {"consumer": consumer, "cursor": cursor}
+
+@app.post("/odds/collect")
+async def collect_odds():
+    """Один проход по источникам коэффициентов"""
+    if not odds_service:
+        raise HTTPException(status_code=500, detail="Odds service not initialized")
+    
+    return await odds_service.collect_once()
+
+@app.post("/odds/start")
+async def start_odds_ingestion():
+    """Запуск периодического приема коэффициентов"""
+    if not odds_service:
+        raise HTTPException(status_code=500, detail="Odds service not initialized")
+    
+    if odds_service.is_running:
+        raise HTTPException(status_code=400, detail="Odds ingestion is already running")
+    
+    if not odds_service.sources:
+        raise HTTPException(status_code=400, detail="No odds sources configured (ODDS_SOURCES)")
+    
+    asyncio.create_task(odds_service.start())
     
-    return {"status": "completed", "message": "Historical data collection completed"}
+    return {"status": "started", "sources": [source.name for source in odds_service.sources]}
+
+@app.post("/odds/stop")
+async def stop_odds_ingestion():
+    """Остановка приема коэффициентов"""
+    if not odds_service:
+        raise HTTPException(status_code=500, detail="Odds service not initialized")
+    
+    await odds_service.stop()
+    
+    return {"status": "stopped"}
+
+@app.get("/odds/stats")
+async def get_odds_stats():
+    """Счетчики приема коэффициентов"""
+    if not odds_service:
+        raise HTTPException(status_code=500, detail="Odds service not initialized")
+    
+    return odds_service.stats()
+
+@app.get("/odds/unresolved")
+async def get_unresolved_odds(limit: int = 50):
+    """Не сопоставленные лиги, команды и игры букмекера"""
+    if not odds_service:
+        raise HTTPException(status_code=500, detail="Odds service not initialized")
+    
+    return odds_service.get_unresolved(limit=limit)
+
+@app.get("/odds/games/{game_id}")
+async def get_game_odds(game_id: int, bookmaker: Optional[str] = None, limit: int = 500):
+    """История коэффициентов игры"""
+    odds = await repositories.odds.get_game_odds(game_id, bookmaker=bookmaker, limit=limit)
+    
+    return {
+        "game_id": game_id,
+        "count": len(odds),
+        "odds": [
+            {
+                "bookmaker": row.bookmaker,
+                "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+                "odds_home": row.odds_home,
+                "odds_away": row.odds_away,
+                "odds_draw": row.odds_draw,
+                "total_over": row.total_over,
+                "total_under": row.total_under,
+                "total_points": row.total_points,
+                "handicap_home": row.handicap_home,
+                "handicap_away": row.handicap_away,
+                "handicap_value": row.handicap_value,
+            }
+            for row in odds
+        ]
+    }
 
 @app.get("/")
 async def root():
@@ -106,18 +291,83 @@ async def health_check():
     """Проверка здоровья сервиса"""
     if basketball_api:
         connection_ok = await basketball_api.test_connection()
+        breakers = basketball_api.circuit_breakers
+        status = "healthy" if connection_ok else "unhealthy"
+        if connection_ok and breakers and breakers.any_open():
+            status = "degraded"
         return {
-            "status": "healthy" if connection_ok else "unhealthy",
-            "api_connection": connection_ok
+            "status": status,
+            "api_connection": connection_ok,
+            "circuit_breakers": breakers.stats() if breakers else {}
         }
     return {"status": "unhealthy", "api_connection": False}
 
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Счетчики кеша ответов API"""
+    if not basketball_api or not basketball_api.cache:
+        return {"enabled": False}
+    
+    return {"enabled": True, **basketball_api.cache.stats()}
+
+@app.get("/api/stats")
+async def get_api_client_stats():
+    """Метрики клиента api-sports (кеш, лимиты, объединение запросов)"""
+    if not basketball_api:
+        raise HTTPException(status_code=500, detail="API client not initialized")
+    
+    return basketball_api.stats()
+
+@app.get("/metrics/db")
+async def get_database_metrics(top: int = 20):
+    """Задержки запросов, медленные запросы, ожидание пула и запросы на HTTP-запрос"""
+    return db_manager.instrumentation.stats(top=top)
+
+@app.delete("/metrics/db")
+async def reset_database_metrics():
+    """Сброс накопленных метрик БД"""
+    db_manager.instrumentation.reset()
+    
+    return {"status": "reset"}
+
+@app.get("/storage/partitions")
+async def get_partitions():
+    """Секции сезонов player_game_stats, team_game_stats и odds"""
+    return {"partitions": await db_manager.partitions.list_partitions()}
+
+@app.post("/storage/partitions/ensure")
+async def ensure_partitions():
+    """Создание секций текущего и следующих сезонов"""
+    await db_manager.partitions.ensure_upcoming()
+    
+    return {"status": "ok", "created": db_manager.partitions.created}
+
+@app.post("/storage/partitions/{season_year}/detach")
+async def detach_season_partitions(season_year: int, drop: bool = False):
+    """Отключение секций прошедшего сезона (перенос в архивную схему или удаление при drop=true)"""
+    try:
+        return await db_manager.partitions.detach_season(season_year, drop=drop)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/standings/rebuild")
+async def rebuild_standings(league_id: Optional[int] = None, season_id: Optional[int] = None):
+    """Полный пересчет team_season_stats из игр (лига/сезон или все)"""
+    return await season_stats_aggregator.rebuild(league_id, season_id)
+
+@app.get("/standings/check")
+async def check_standings(league_id: Optional[int] = None, season_id: Optional[int] = None, limit: int = 50):
+    """Сравнение team_season_stats с пересчетом из игр"""
+    return await season_stats_aggregator.check(league_id, season_id, limit=limit)
+
 @app.get("/data/leagues")
 async def get_leagues_data(skip: int = 0, limit: int = 50):
     """Просмотр лиг в БД"""
-    leagues = await repositories.leagues.get_all(skip=skip, limit=limit)
-    seasons = await repositories.seasons.get_all(skip=skip, limit=limit)
-    teams = await repositories.teams.get_all(skip=skip, limit=limit)
+    # Три чтения в одной сессии и одном снимке данных
+    async with db_manager.unit_of_work(read_only=True):
+        leagues = await repositories.leagues.get_all(skip=skip, limit=limit)
+        seasons = await repositories.seasons.get_all(skip=skip, limit=limit)
+        teams = await repositories.teams.get_all(skip=skip, limit=limit)
     
     return {
         "leagues_count": len(leagues),
@@ -349,14 +599,13 @@ async def get_teams_statistics(
     if not basketball_api:
         raise HTTPException(status_code=500, detail="API client not initialized")
     
-    # Валидация параметров
-    if game_ids:
-        ids_count = len(game_ids.split('-'))
-        if ids_count > 20:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Maximum 20 game ids allowed, got {ids_count}"
-            )
+    # Больше 20 игр - загружаем чанками
+    ids_list = parse_game_ids(game_ids)
+    if len(ids_list) > MAX_GAME_IDS_PER_REQUEST:
+        statistics = await basketball_api.get_teams_statistics_batch(ids_list)
+        if statistics is None:
+            raise HTTPException(status_code=500, detail="Failed to fetch teams statistics")
+        return statistics
     
     statistics = await basketball_api.get_teams_statistics(
         game_id=game_id,
@@ -381,15 +630,6 @@ async def get_players_statistics(
     if not basketball_api:
         raise HTTPException(status_code=500, detail="API client not initialized")
     
-    # Валидация параметров
-    if game_ids:
-        ids_count = len(game_ids.split('-'))
-        if ids_count > 20:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Maximum 20 game ids allowed, got {ids_count}"
-            )
-    
     # Если указан player, season обязателен
     if player and not season:
         raise HTTPException(
@@ -397,6 +637,19 @@ async def get_players_statistics(
             detail="Season parameter is required when using player filter"
         )
     
+    # Больше 20 игр - загружаем чанками (фильтр по игроку в пакетном режиме не поддерживается)
+    ids_list = parse_game_ids(game_ids)
+    if len(ids_list) > MAX_GAME_IDS_PER_REQUEST:
+        if player:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Player filter supports at most {MAX_GAME_IDS_PER_REQUEST} game ids, got {len(ids_list)}"
+            )
+        statistics = await basketball_api.get_players_statistics_batch(ids_list)
+        if statistics is None:
+            raise HTTPException(status_code=500, detail="Failed to fetch players statistics")
+        return statistics
+    
     statistics = await basketball_api.get_players_statistics(
         game_id=game_id,
         game_ids=game_ids,
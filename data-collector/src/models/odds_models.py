@@ -0,0 +1,46 @@
+from pydantic import BaseModel, field_validator
+from typing import Optional, Tuple
+from datetime import datetime, timezone
+
+# Цены, по которым определяется изменение снимка коэффициентов
+PRICE_FIELDS = (
+    "odds_home", "odds_away", "odds_draw",
+    "total_over", "total_under", "total_points",
+    "handicap_home", "handicap_away", "handicap_value",
+)
+
+# Снимок коэффициентов одного матча у букмекера (из любого источника)
+class OddsSnapshot(BaseModel):
+    bookmaker: str
+    league_external_id: int  # ID лиги у букмекера (league_mappings.betcity_league_id)
+    league_name: Optional[str] = None
+    home_team: str  # Название команды у букмекера (team_aliases.betcity_name)
+    away_team: str
+    start_time: datetime  # Начало матча, UTC
+    captured_at: datetime  # Время снятия коэффициентов, UTC
+
+    # Основные коэффициенты
+    odds_home: Optional[float] = None
+    odds_away: Optional[float] = None
+    odds_draw: Optional[float] = None
+
+    # Тоталы
+    total_over: Optional[float] = None
+    total_under: Optional[float] = None
+    total_points: Optional[float] = None
+
+    # Форы
+    handicap_home: Optional[float] = None
+    handicap_away: Optional[float] = None
+    handicap_value: Optional[float] = None
+
+    @field_validator('start_time', 'captured_at')
+    @classmethod
+    def to_naive_utc(cls, v: datetime) -> datetime:
+        """Время в БД хранится naive UTC"""
+        if v.tzinfo is not None:
+            return v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+
+    def prices(self) -> Tuple[Optional[float], ...]:
+        return tuple(getattr(self, field) for field in PRICE_FIELDS)
@@ -0,0 +1,442 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
+from structlog import get_logger
+
+from api.cache import FINISHED_STATUSES
+from api.decoding import DecodeMode, decode_response
+from models.basketball_models import GamesResponse
+from storage.repositories import repositories
+from storage.database import CollectionWatermark, Season, db_manager
+
+logger = get_logger()
+
+# Игры в этих статусах больше не меняются - водяной знак можно сдвигать через них
+SETTLED_STATUSES = FINISHED_STATUSES | {"CANC", "ABD"}
+
+# Основные лиги для исторического сбора
+DEFAULT_BACKFILL_LEAGUES = (
+    12,  # NBA
+    13,  # Euroleague
+)
+
+
+def game_datetime(game_data) -> datetime:
+    """Время начала игры в UTC (naive, как хранится в games.date)"""
+    return datetime.fromtimestamp(game_data.timestamp, tz=timezone.utc).replace(tzinfo=None)
+
+
+class BackfillEngine:
+    """Возобновляемый исторический сбор по водяным знакам (лига, сезон, ресурс)
+
+    Завершенные ресурсы пропускаются, после падения сбор продолжается
+    с последней сохраненной пачки, а для текущего сезона запрашиваются
+    только игры после водяного знака. Статистика игр (box scores) - отдельный
+    ресурс со своим водяным знаком по записанным завершенным играм.
+    """
+
+    LEAGUES = "leagues"
+    TEAMS = "teams"
+    GAMES = "games"
+    STATISTICS = "statistics"
+
+    # Глобальные ресурсы (список лиг) хранятся под league_id = 0 и пустым сезоном
+    GLOBAL_LEAGUE_ID = 0
+    GLOBAL_SEASON = ""
+
+    def __init__(
+        self,
+        orchestrator,
+        league_ids: Sequence[int] = DEFAULT_BACKFILL_LEAGUES,
+        seasons_per_league: int = 1,
+        batch_size: int = 200,
+        leagues_refresh: timedelta = timedelta(hours=24),
+        date_window_days: int = 7,
+        decode_mode: str = DecodeMode.CONSTRUCT
+    ):
+        self.orchestrator = orchestrator
+        self.league_ids = list(league_ids)
+        self.seasons_per_league = max(1, seasons_per_league)
+        self.batch_size = max(1, batch_size)
+        self.leagues_refresh = leagues_refresh
+        self.date_window_days = date_window_days
+        # Ответы /games сборки backfill - без валидации (модели игр не нормализуют значения)
+        self.decode_mode = decode_mode
+        self.is_running = False
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def run(
+        self,
+        force: bool = False,
+        league_ids: Optional[Sequence[int]] = None,
+        refresh_leagues: bool = True
+    ) -> Dict[str, int]:
+        """Один проход backfill; force - повторить и завершенные ресурсы
+
+        league_ids - подмножество лиг (шарды воркера), refresh_leagues - обновлять
+        ли глобальный список лиг (в шардированном режиме это делает лидер).
+        """
+        self.is_running = True
+        started_at = datetime.utcnow()
+        league_ids = self.league_ids if league_ids is None else list(league_ids)
+        totals = {
+            self.LEAGUES: 0, self.TEAMS: 0, self.GAMES: 0, self.STATISTICS: 0,
+            "skipped": 0, "failed": 0, "pending_leagues": 0
+        }
+
+        try:
+            if refresh_leagues:
+                await self._run_resource(self.GLOBAL_LEAGUE_ID, self.GLOBAL_SEASON, self.LEAGUES, force, totals)
+
+            seasons_by_league = await asyncio.gather(
+                *(self._latest_seasons(league_id) for league_id in league_ids)
+            )
+            totals["pending_leagues"] = sum(1 for league_seasons in seasons_by_league if not league_seasons)
+            seasons = [season for league_seasons in seasons_by_league for season in league_seasons]
+
+            # Команды до игр: игры ссылаются на команды
+            await asyncio.gather(
+                *(self._run_resource(season.league_id, season.season, self.TEAMS, force, totals) for season in seasons)
+            )
+            await self._backfill_games(seasons, force, totals)
+            # Статистика - по уже записанным играм
+            await self._backfill_statistics(seasons, force, totals)
+
+            logger.info("🎉 Backfill pass completed", **totals)
+            return totals
+
+        finally:
+            self.is_running = False
+            self.last_run = {
+                "started_at": started_at.isoformat(),
+                "finished_at": datetime.utcnow().isoformat(),
+                "force": force,
+                "leagues": league_ids,
+                "totals": totals
+            }
+
+    async def _latest_seasons(self, league_id: int) -> List[Season]:
+        """Самые свежие сезоны лиги из БД"""
+        # Сезоны только что записаны сбором - читаем из основной БД, не из реплики
+        async with self.orchestrator.db_semaphore:
+            with db_manager.read_your_writes():
+                seasons = await repositories.seasons.get_seasons_by_league(league_id)
+        if not seasons:
+            logger.warning(f"⚠️ No seasons found for league {league_id}, skipping backfill")
+            return []
+        return sorted(seasons, key=lambda s: s.season, reverse=True)[:self.seasons_per_league]
+
+    async def _run_resource(
+        self,
+        league_id: int,
+        season_name: str,
+        resource: str,
+        force: bool,
+        totals: Dict[str, int]
+    ):
+        """Обработка лиг или команд с отметками start/advance/complete в watermarks"""
+        watermark = await repositories.watermarks.get_watermark(league_id, season_name, resource)
+        if not force and self._is_fresh(watermark, resource):
+            logger.debug("⏭️ Backfill resource already complete", league_id=league_id,
+                         season=season_name, resource=resource)
+            totals["skipped"] += 1
+            return
+
+        await repositories.watermarks.mark_started(league_id, season_name, resource)
+        started = time.perf_counter()
+        try:
+            if resource == self.LEAGUES:
+                items, complete = await self._backfill_leagues()
+            else:
+                items, complete = await self._backfill_teams(league_id, season_name)
+
+            if complete:
+                await repositories.watermarks.mark_complete(league_id, season_name, resource)
+            totals[resource] += items
+            self.orchestrator._record_phase(resource, started, items)
+
+        except Exception as e:
+            logger.error("❌ Backfill resource failed", league_id=league_id,
+                         season=season_name, resource=resource, error=str(e))
+            await repositories.watermarks.mark_failed(league_id, season_name, resource, str(e))
+            totals["failed"] += 1
+
+    def _is_fresh(self, watermark: Optional[CollectionWatermark], resource: str) -> bool:
+        if watermark is None or watermark.status != repositories.watermarks.COMPLETE:
+            return False
+        if resource == self.LEAGUES:
+            # Список лиг и сезонов периодически обновляется
+            return watermark.completed_at is not None and \
+                datetime.utcnow() - watermark.completed_at < self.leagues_refresh
+        return True
+
+    async def _backfill_leagues(self) -> Tuple[int, bool]:
+        """Лиги и сезоны целиком (один ответ /leagues)"""
+        leagues_saved = await self.orchestrator._collect_leagues()
+        await repositories.watermarks.advance(
+            self.GLOBAL_LEAGUE_ID, self.GLOBAL_SEASON, self.LEAGUES,
+            watermark=datetime.utcnow(), last_item_id=None, items=leagues_saved
+        )
+        return leagues_saved, leagues_saved > 0
+
+    async def _backfill_teams(self, league_id: int, season_name: str) -> Tuple[int, bool]:
+        """Команды лиги за сезон"""
+        async with self.orchestrator.api_semaphore:
+            teams_response = await self.orchestrator.api_client.get_teams(league=league_id, season=season_name)
+        if not teams_response or not teams_response.response:
+            logger.warning(f"⚠️ No teams data for league {league_id} season {season_name}")
+            return 0, False
+
+        teams_saved = await self.orchestrator._save_teams_bulk(teams_response.response)
+        await repositories.watermarks.advance(
+            league_id, season_name, self.TEAMS,
+            watermark=datetime.utcnow(), last_item_id=None,
+            items=teams_saved, items_expected=len(teams_response.response)
+        )
+        logger.info(f"✅ Saved {teams_saved} teams for league {league_id} season {season_name}")
+        return teams_saved, True
+
+    async def _backfill_games(self, seasons: List[Season], force: bool, totals: Dict[str, int]):
+        """Игры всех сезонов через конвейер fetch -> parse -> transform -> persist
+
+        Пока сохраняется один сезон, следующие уже загружаются и разбираются.
+        """
+        started = time.perf_counter()
+
+        async def fetch(season: Season) -> Optional[Dict[str, Any]]:
+            watermark = await repositories.watermarks.get_watermark(season.league_id, season.season, self.GAMES)
+            if not force and self._is_fresh(watermark, self.GAMES):
+                totals["skipped"] += 1
+                return None
+            watermark = await repositories.watermarks.mark_started(season.league_id, season.season, self.GAMES)
+
+            season_finished = season.end_date is not None and season.end_date < datetime.utcnow() - timedelta(days=1)
+            position = (watermark.watermark, watermark.last_item_id or 0) if watermark.watermark and not force else None
+            responses, full_season = await self._fetch_games(season.league_id, season.season, position, season_finished)
+            return {
+                "season": season,
+                "position": position,
+                "season_finished": season_finished,
+                "full_season": full_season,
+                "responses": responses
+            }
+
+        async def parse(unit: Dict[str, Any]) -> Dict[str, Any]:
+            unit["games"] = [
+                game_data
+                for data, raw in unit.pop("responses")
+                for game_data in decode_response(GamesResponse, data, raw, self.decode_mode).response
+            ]
+            return unit
+
+        async def transform(unit: Dict[str, Any]) -> Dict[str, Any]:
+            position = unit["position"]
+            games = sorted(unit["games"], key=lambda g: (game_datetime(g), g.id))
+            pending = [g for g in games if position is None or (game_datetime(g), g.id) > position]
+            unit["games_total"] = len(games)
+            unit["chunks"] = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+            del unit["games"]
+            return unit
+
+        async def persist(unit: Dict[str, Any]) -> int:
+            return await self._persist_games(unit)
+
+        async def on_error(stage: str, item: Any, error: Exception):
+            season = item if isinstance(item, Season) else item["season"]
+            totals["failed"] += 1
+            await repositories.watermarks.mark_failed(season.league_id, season.season, self.GAMES, f"{stage}: {error}")
+
+        pipeline = self.orchestrator._build_pipeline(
+            "backfill_games", fetch, parse, transform, persist, on_error=on_error
+        )
+        persisted = await pipeline.run(seasons)
+
+        totals[self.GAMES] += sum(persisted)
+        self.orchestrator._record_phase(self.GAMES, started, sum(persisted))
+
+    async def _persist_games(self, unit: Dict[str, Any]) -> int:
+        """Пачки игр сезона по порядку; водяной знак сдвигается после каждой пачки"""
+        season: Season = unit["season"]
+        position = unit["position"]
+        persisted = 0
+        failed = 0
+        settled = 0
+        settled_prefix = True
+        for chunk in unit["chunks"]:
+            _, failed_ids = await self.orchestrator._save_games(chunk, season.id)
+            persisted += len(chunk) - len(failed_ids)
+            failed += len(failed_ids)
+
+            # Водяной знак сдвигается только через непрерывный префикс завершенных и записанных
+            # игр: все, что после первой незавершенной или незаписанной игры, будет запрошено повторно
+            chunk_settled = 0
+            for game_data in chunk:
+                if not settled_prefix or game_data.id in failed_ids or \
+                        game_data.status.short not in SETTLED_STATUSES:
+                    settled_prefix = False
+                    break
+                position = (game_datetime(game_data), game_data.id)
+                chunk_settled += 1
+
+            if chunk_settled:
+                settled += chunk_settled
+                await repositories.watermarks.advance(
+                    season.league_id, season.season, self.GAMES,
+                    watermark=position[0], last_item_id=position[1], items=chunk_settled,
+                    items_expected=unit["games_total"] if unit["full_season"] else None
+                )
+
+        complete = unit["full_season"] and unit["season_finished"] and settled_prefix and not failed
+        if complete:
+            await repositories.watermarks.mark_complete(season.league_id, season.season, self.GAMES)
+        if failed:
+            logger.warning(f"⚠️ Games backfill for league {season.league_id} season {season.season} has unwritten games",
+                           failed=failed)
+        logger.info(f"✅ Games backfill for league {season.league_id} season {season.season}",
+                    fetched=unit["games_total"], persisted=persisted, failed=failed, settled=settled,
+                    complete=complete)
+        return persisted
+
+    async def _backfill_statistics(self, seasons: List[Season], force: bool, totals: Dict[str, int]):
+        """Статистика завершенных игр сезонов после водяного знака (сезоны по очереди)"""
+        started = time.perf_counter()
+        collected = 0
+        for season in seasons:
+            try:
+                collected += await self._backfill_season_statistics(season, force, totals)
+            except Exception as e:
+                logger.error("❌ Backfill resource failed", league_id=season.league_id,
+                             season=season.season, resource=self.STATISTICS, error=str(e))
+                await repositories.watermarks.mark_failed(season.league_id, season.season, self.STATISTICS, str(e))
+                totals["failed"] += 1
+
+        totals[self.STATISTICS] += collected
+        self.orchestrator._record_phase(self.STATISTICS, started, collected)
+
+    async def _backfill_season_statistics(self, season: Season, force: bool, totals: Dict[str, int]) -> int:
+        """Статистика игр сезона пачками по batch_size игр; возвращает число игр со статистикой
+
+        Водяной знак (дата, id игры) идет по непрерывному префиксу завершенных
+        игр и останавливается перед первой пачкой с ошибкой загрузки или записи.
+        """
+        if not (season.has_teams_stats or season.has_players_stats):
+            # Для сезона без coverage статистики api-sports ее не отдает
+            totals["skipped"] += 1
+            return 0
+
+        watermark = await repositories.watermarks.get_watermark(season.league_id, season.season, self.STATISTICS)
+        if not force and self._is_fresh(watermark, self.STATISTICS):
+            totals["skipped"] += 1
+            return 0
+        watermark = await repositories.watermarks.mark_started(season.league_id, season.season, self.STATISTICS)
+        position = (watermark.watermark, watermark.last_item_id or 0) if watermark.watermark and not force else None
+
+        games = await repositories.games.get_games_after(season.id, position)
+        settled = []
+        for game in games:
+            # После первой незавершенной игры - в следующий проход
+            if game[2] not in SETTLED_STATUSES:
+                break
+            settled.append(game)
+
+        collected = 0
+        failed = 0
+        for start in range(0, len(settled), self.batch_size):
+            chunk = settled[start:start + self.batch_size]
+            # Отмененные и прерванные игры без статистики - водяной знак проходит их без запросов
+            finished_ids = [game_id for game_id, _, status in chunk if status in FINISHED_STATUSES]
+            games_with_stats, failed_ids = await self.orchestrator._collect_statistics_batches(
+                finished_ids, pipeline_name="backfill_statistics", copy_load=True
+            )
+            collected += len(games_with_stats)
+
+            passed = []
+            for game in chunk:
+                if game[0] in failed_ids:
+                    break
+                passed.append(game)
+            if passed:
+                await repositories.watermarks.advance(
+                    season.league_id, season.season, self.STATISTICS,
+                    watermark=passed[-1][1], last_item_id=passed[-1][0], items=len(passed)
+                )
+            if failed_ids:
+                failed = len(failed_ids)
+                break
+
+        # Завершено: сезон окончен, все его игры записаны, завершены и со статистикой
+        games_watermark = await repositories.watermarks.get_watermark(season.league_id, season.season, self.GAMES)
+        season_finished = season.end_date is not None and season.end_date < datetime.utcnow() - timedelta(days=1)
+        complete = season_finished and not failed and len(settled) == len(games) and \
+            self._is_fresh(games_watermark, self.GAMES)
+        if complete:
+            await repositories.watermarks.mark_complete(season.league_id, season.season, self.STATISTICS)
+        if failed:
+            logger.warning(f"⚠️ Statistics backfill for league {season.league_id} season {season.season} stopped on failed games",
+                           failed=failed)
+        logger.info(f"✅ Statistics backfill for league {season.league_id} season {season.season}",
+                    games=len(settled), with_stats=collected, failed=failed, complete=complete)
+        return collected
+
+    async def _fetch_games(
+        self,
+        league_id: int,
+        season_name: str,
+        position: Optional[Tuple[datetime, int]],
+        season_finished: bool
+    ) -> Tuple[List[Tuple[Dict[str, Any], Optional[bytes]]], bool]:
+        """Сырые ответы /games после водяного знака: по дням для недавнего знака, иначе весь сезон"""
+        api_client = self.orchestrator.api_client
+        today = datetime.utcnow().date()
+
+        if position is not None and not season_finished and \
+                (today - position[0].date()).days <= self.date_window_days:
+            days = (today - position[0].date()).days + 1
+            dates = [(position[0].date() + timedelta(days=offset)).isoformat() for offset in range(days)]
+
+            async def fetch_day(date: str):
+                async with self.orchestrator.api_semaphore:
+                    return await api_client.fetch_raw("/games", {"league": league_id, "season": season_name, "date": date})
+
+            return list(await asyncio.gather(*(fetch_day(date) for date in dates))), False
+
+        async with self.orchestrator.api_semaphore:
+            response = await api_client.fetch_raw("/games", {"league": league_id, "season": season_name})
+        return [response], True
+
+    async def get_progress(self) -> Dict[str, Any]:
+        """Прогресс backfill по водяным знакам (для /collection/status)"""
+        watermarks = await repositories.watermarks.get_all_watermarks()
+
+        by_status: Dict[str, int] = {}
+        resources = []
+        for watermark in watermarks:
+            by_status[watermark.status] = by_status.get(watermark.status, 0) + 1
+            percent = None
+            if watermark.items_expected:
+                percent = round(min(100.0, 100.0 * (watermark.items_collected or 0) / watermark.items_expected), 1)
+            if watermark.status == repositories.watermarks.COMPLETE:
+                percent = 100.0
+            resources.append({
+                "league_id": watermark.league_id,
+                "season": watermark.season,
+                "resource": watermark.resource,
+                "status": watermark.status,
+                "watermark": watermark.watermark.isoformat() if watermark.watermark else None,
+                "items_collected": watermark.items_collected,
+                "items_expected": watermark.items_expected,
+                "percent": percent,
+                "attempts": watermark.attempts,
+                "last_error": watermark.last_error,
+                "updated_at": watermark.updated_at.isoformat() if watermark.updated_at else None
+            })
+
+        return {
+            "is_running": self.is_running,
+            "leagues": self.league_ids,
+            "seasons_per_league": self.seasons_per_league,
+            "by_status": by_status,
+            "last_run": self.last_run,
+            "resources": resources
+        }
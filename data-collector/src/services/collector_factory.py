@@ -0,0 +1,150 @@
+import os
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from api.basketball_api import BasketballAPI
+from api.cache import MemoryCacheBackend, RedisCacheBackend, ResponseCache
+from api.cassette import CassetteTransport
+from api.rate_limiter import RateLimiter
+from api.resilience import CircuitBreakerRegistry, RetryPolicy
+from services.data_orchestrator import DataOrchestrator
+from services.game_events import MemoryEventBus, RedisEventBus
+from services.live_scheduler import LivePollScheduler
+from services.odds_ingestion import OddsIngestionService
+from services.odds_sources import create_odds_sources
+from services.sharding import ShardCoordinator
+from storage.database import db_manager
+
+# Сборка клиента API и оркестратора по переменным окружения
+# (общая для FastAPI-сервиса и отдельных процессов-воркеров)
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Создание кеша ответов API по настройкам окружения"""
+    backend_name = os.getenv("API_CACHE_BACKEND", "memory").lower()
+    if backend_name == "none":
+        return None
+
+    if backend_name == "redis":
+        backend = RedisCacheBackend.from_url(os.getenv("REDIS_URL", "redis://redis:6379/0"))
+    else:
+        backend = MemoryCacheBackend(max_size=int(os.getenv("API_CACHE_MAX_SIZE", "1024")))
+
+    return ResponseCache(backend)
+
+def create_cassette_transport() -> Optional[CassetteTransport]:
+    """Запись/воспроизведение ответов API (API_CASSETTE_MODE=record|replay)"""
+    mode = os.getenv("API_CASSETTE_MODE")
+    if not mode:
+        return None
+
+    return CassetteTransport(os.getenv("API_CASSETTE_DIR", "cassettes"), mode=mode)
+
+def create_event_bus():
+    """Шина событий игр (EVENT_BUS_BACKEND=redis|memory|none)"""
+    backend_name = os.getenv("EVENT_BUS_BACKEND", "memory").lower()
+    if backend_name == "none":
+        return None
+
+    max_len = int(os.getenv("EVENT_STREAM_MAXLEN", "100000"))
+    if backend_name == "redis":
+        return RedisEventBus.from_url(
+            os.getenv("REDIS_URL", "redis://redis:6379/0"),
+            stream=os.getenv("EVENT_STREAM_NAME", "game_events"),
+            max_len=max_len
+        )
+    return MemoryEventBus(max_len=max_len)
+
+def worker_quota_shares(processes: int) -> Tuple[float, float]:
+    """Доли квоты api-sports (лидер, остальные) для N процессов-воркеров
+
+    Лидер опрашивает лайв-игры за все лиги, поэтому получает
+    COLLECTOR_LEADER_QUOTA_SHARE (по умолчанию вдвое больше остальных: 2 / (N + 1),
+    не меньше 1/N), остальные делят остаток поровну.
+    """
+    processes = max(processes, 1)
+    if processes == 1:
+        return 1.0, 1.0
+    leader_share = float(os.getenv("COLLECTOR_LEADER_QUOTA_SHARE") or 2.0 / (processes + 1))
+    leader_share = min(max(leader_share, 1.0 / processes), 1.0)
+    return leader_share, (1.0 - leader_share) / (processes - 1)
+
+def create_basketball_api(quota_share: float = 1.0) -> BasketballAPI:
+    """Клиент api-sports; quota_share - доля лимитов аккаунта для этого процесса"""
+    api_key = os.getenv("BASKETBALL_API_KEY")
+    if not api_key:
+        raise Exception("BASKETBALL_API_KEY not found in environment variables")
+
+    rate_limiter = RateLimiter(
+        requests_per_minute=int(os.getenv("API_RATE_LIMIT_PER_MINUTE", "10")),
+        daily_quota=int(os.getenv("API_DAILY_QUOTA", "100")),
+        quota_share=quota_share
+    )
+    retry_policy = RetryPolicy(
+        max_attempts=int(os.getenv("API_RETRY_MAX_ATTEMPTS", "3")),
+        base_delay=float(os.getenv("API_RETRY_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("API_RETRY_MAX_DELAY", "10"))
+    )
+    circuit_breakers = CircuitBreakerRegistry(
+        failure_threshold=int(os.getenv("API_BREAKER_FAILURE_THRESHOLD", "5")),
+        recovery_timeout=float(os.getenv("API_BREAKER_RECOVERY_TIMEOUT", "30"))
+    )
+    return BasketballAPI(
+        api_key,
+        base_url=os.getenv("BASKETBALL_API_URL", "https://v1.basketball.api-sports.io"),
+        cache=create_response_cache(),
+        rate_limiter=rate_limiter,
+        retry_policy=retry_policy,
+        circuit_breakers=circuit_breakers,
+        transport=create_cassette_transport()
+    )
+
+def create_shard_coordinator(worker_index: Optional[int] = None) -> ShardCoordinator:
+    """Координатор шардов лиг (advisory-блокировки в основной БД)"""
+    return ShardCoordinator(
+        db_manager.engine,
+        shards=int(os.getenv("COLLECTOR_SHARDS", "4")),
+        worker_index=worker_index,
+        rebalance_interval=float(os.getenv("COLLECTOR_SHARD_REBALANCE_INTERVAL", "30"))
+    )
+
+def create_data_orchestrator(
+    basketball_api: BasketballAPI,
+    coordinator: Optional[ShardCoordinator] = None,
+    quota_shares: Optional[Tuple[float, float]] = None
+) -> DataOrchestrator:
+    """Оркестратор сбора с настройками параллелизма, backfill и опроса лайв-игр"""
+    return DataOrchestrator(
+        basketball_api,
+        api_concurrency=int(os.getenv("COLLECTOR_API_CONCURRENCY", "4")),
+        db_concurrency=int(os.getenv("COLLECTOR_DB_CONCURRENCY", "5")),
+        backfill_leagues=[int(league_id) for league_id in os.getenv("COLLECTOR_BACKFILL_LEAGUES", "12,13").split(",") if league_id],
+        backfill_seasons=int(os.getenv("COLLECTOR_BACKFILL_SEASONS", "1")),
+        backfill_interval=float(os.getenv("COLLECTOR_BACKFILL_INTERVAL", "3600")),
+        live_scheduler=LivePollScheduler(
+            rate_limiter=basketball_api.rate_limiter,
+            idle_interval=float(os.getenv("COLLECTOR_POLL_IDLE_INTERVAL", "600")),
+            live_interval=float(os.getenv("COLLECTOR_POLL_LIVE_INTERVAL", "60")),
+            clutch_interval=float(os.getenv("COLLECTOR_POLL_CLUTCH_INTERVAL", "15")),
+            quota_reserve=int(os.getenv("COLLECTOR_POLL_QUOTA_RESERVE", "10"))
+        ),
+        pipeline_workers={
+            "fetch": int(os.getenv("COLLECTOR_PIPELINE_FETCH_WORKERS", "4")),
+            "parse": int(os.getenv("COLLECTOR_PIPELINE_PARSE_WORKERS", "1")),
+            "transform": int(os.getenv("COLLECTOR_PIPELINE_TRANSFORM_WORKERS", "1")),
+            "persist": int(os.getenv("COLLECTOR_PIPELINE_PERSIST_WORKERS", "5"))
+        },
+        pipeline_queue_size=int(os.getenv("COLLECTOR_PIPELINE_QUEUE_SIZE", "8")),
+        coordinator=coordinator,
+        quota_shares=quota_shares,
+        event_bus=create_event_bus()
+    )
+
+def create_odds_service() -> OddsIngestionService:
+    """Прием коэффициентов (ODDS_SOURCES="json:путь,html:путь,http:url")"""
+    return OddsIngestionService(
+        create_odds_sources(os.getenv("ODDS_SOURCES", ""), bookmaker=os.getenv("ODDS_BOOKMAKER", "betcity")),
+        batch_size=int(os.getenv("ODDS_BATCH_SIZE", "5000")),
+        poll_interval=float(os.getenv("ODDS_POLL_INTERVAL", "30")),
+        match_window=timedelta(hours=float(os.getenv("ODDS_MATCH_WINDOW_HOURS", "12")))
+    )
@@ -1,18 +1,146 @@
 import asyncio
-from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import time
+from typing import Dict, Any, List, Optional, Sequence, Set, Tuple
 from datetime import datetime, timedelta
 from structlog import get_logger
 
 from storage.repositories import repositories
-from api.basketball_api import BasketballAPI
-from storage.database import League, Season, Team
+from api.basketball_api import BasketballAPI, chunk_game_ids
+from api.cache import FINISHED_STATUSES, LIVE_STATUSES
+from api.decoding import decode_response
+from models.basketball_models import Game as GameModel, League as LeagueModel, Team as TeamModel
+from models.basketball_models import PlayersStatisticsResponse, TeamsStatisticsResponse
+from storage.database import League, Season, Team, db_manager
+from services.backfill import DEFAULT_BACKFILL_LEAGUES, BackfillEngine, game_datetime
+from services.game_events import detect_game_events
+from services.live_scheduler import LivePollScheduler
+from services.odds_ingestion import ODDS_DEAD_LETTER_KIND
+from services.pipeline import Pipeline, PipelineStage
+from services.sharding import ShardCoordinator
+from services.standings import TeamSeasonStatsAggregator, season_stats_aggregator
 
 logger = get_logger()
 
+# Стадии конвейеров сбора
+PIPELINE_STAGES = ("fetch", "parse", "transform", "persist")
+
+# Эндпоинты статистики игр и модели их ответов
+STATISTICS_ENDPOINTS = {
+    "/games/statistics/teams": TeamsStatisticsResponse,
+    "/games/statistics/players": PlayersStatisticsResponse,
+}
+
+# Типы элементов dead-letter очереди: модель ответа API и пакетный метод повторной записи
+DEAD_LETTER_KINDS = {
+    "league": (LeagueModel, "_save_leagues_bulk"),
+    "team": (TeamModel, "_save_teams_bulk"),
+    "game": (GameModel, "_save_games_bulk"),
+}
+
 class DataOrchestrator:
-    def __init__(self, api_client: BasketballAPI):
+    def __init__(
+        self,
+        api_client: BasketballAPI,
+        api_concurrency: int = 4,
+        db_concurrency: int = 5,
+        backfill_leagues: Sequence[int] = DEFAULT_BACKFILL_LEAGUES,
+        backfill_seasons: int = 1,
+        live_scheduler: Optional[LivePollScheduler] = None,
+        pipeline_workers: Optional[Dict[str, int]] = None,
+        pipeline_queue_size: int = 8,
+        backfill_interval: float = 3600.0,
+        coordinator: Optional[ShardCoordinator] = None,
+        quota_shares: Optional[Tuple[float, float]] = None,
+        event_bus=None,
+        season_stats: Optional[TeamSeasonStatsAggregator] = None
+    ):
         self.api_client = api_client
         self.is_running = False
+        # Отдельные ограничения параллелизма для upstream API и БД
+        self.api_concurrency = api_concurrency
+        self.db_concurrency = db_concurrency
+        self.api_semaphore = asyncio.Semaphore(api_concurrency)
+        self.db_semaphore = asyncio.Semaphore(db_concurrency)
+        # Метрики последнего прогона по фазам
+        self.phase_metrics: Dict[str, Dict[str, Any]] = {}
+        # Воркеры стадий конвейеров: загрузка ограничена API, запись - БД
+        self.pipeline_workers = {
+            "fetch": api_concurrency,
+            "parse": 1,
+            "transform": 1,
+            "persist": db_concurrency,
+            **(pipeline_workers or {})
+        }
+        self.pipeline_queue_size = pipeline_queue_size
+        # Последний прогон каждого конвейера (метрики стадий)
+        self.pipelines: Dict[str, Pipeline] = {}
+        # Счетчики записи игр (неизмененные игры пропускаются по хешу)
+        self.games_written = 0
+        self.games_unchanged = 0
+        # Счетчики записи статистики игр (неизмененные строки не обновляются)
+        self.stats_rows_written = 0
+        self.stats_rows_unchanged = 0
+        # Игры, по которым последний опрос вернул лайв или финальный статус
+        self._stats_game_ids: List[int] = []
+        # Кеш ID сезонов по (лига, сезон) для ответов /games
+        self._season_ids: Dict[Tuple[int, str], int] = {}
+        # Возобновляемый исторический сбор по водяным знакам
+        self.backfill = BackfillEngine(self, league_ids=backfill_leagues, seasons_per_league=backfill_seasons)
+        # Интервал опроса лайв-игр по расписанию и бюджету запросов
+        self.live_scheduler = live_scheduler or LivePollScheduler(rate_limiter=api_client.rate_limiter)
+        # Повторный проход backfill (новые игры текущего сезона)
+        self.backfill_interval = backfill_interval
+        # Шарды лиг между процессами-воркерами (None - один процесс собирает все)
+        self.coordinator = coordinator
+        # Доли квоты API (лидер, остальные воркеры); None - доля не меняется
+        self.quota_shares = quota_shares
+        # Поток событий переходов статуса и счета игр (MemoryEventBus / RedisEventBus)
+        self.event_bus = event_bus
+        self.events_published = 0
+        # Приращения team_season_stats при записи игр
+        self.season_stats = season_stats or season_stats_aggregator
+
+    def _record_phase(self, phase: str, started: float, items: int):
+        """Сохранение длительности и пропускной способности фазы"""
+        duration = time.perf_counter() - started
+        self.phase_metrics[phase] = {
+            "finished_at": datetime.now().isoformat(),
+            "duration_seconds": round(duration, 3),
+            "items": items,
+            "items_per_second": round(items / duration, 2) if duration > 0 else 0.0
+        }
+        logger.info(f"⏱️ Phase {phase} finished", duration=round(duration, 3), items=items)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Метрики сбора для /collection/status"""
+        return {
+            "api_concurrency": self.api_concurrency,
+            "db_concurrency": self.db_concurrency,
+            "games_written": self.games_written,
+            "games_unchanged": self.games_unchanged,
+            "stats_rows_written": self.stats_rows_written,
+            "stats_rows_unchanged": self.stats_rows_unchanged,
+            "events_published": self.events_published,
+            "season_stats": self.season_stats.stats(),
+            "phases": self.phase_metrics,
+            "pipelines": {name: pipeline.stats() for name, pipeline in self.pipelines.items()}
+        }
+
+    def _build_pipeline(self, name: str, fetch, parse, transform, persist, on_error=None) -> Pipeline:
+        """Конвейер fetch -> parse -> transform -> persist с ограниченными очередями между стадиями"""
+        handlers = {"fetch": fetch, "parse": parse, "transform": transform, "persist": persist}
+        pipeline = Pipeline(
+            name,
+            [
+                PipelineStage(stage, handlers[stage], workers=self.pipeline_workers[stage], queue_size=self.pipeline_queue_size)
+                for stage in PIPELINE_STAGES
+            ],
+            on_error=on_error
+        )
+        self.pipelines[name] = pipeline
+        return pipeline
 
     async def start_collection(self):
         """Запуск сбора данных"""
@@ -24,43 +152,138 @@ class DataOrchestrator:
         logger.info("🚀 Starting data collection")
         
         try:
-            # Сбор исторических данных при первом запуске
-            await self.collect_historical_data()
+            if self.coordinator:
+                await self.coordinator.start()
+            last_backfill: Optional[float] = None
             
-            # Запуск периодического сбора
             while self.is_running:
-                await self.collect_live_data()
-                await asyncio.sleep(60)  # Ждем 60 секунд между итерациями
+                # Сбор исторических данных при первом запуске, смене шардов и раз в backfill_interval
+                ownership_changed = await self.coordinator.rebalance() if self.coordinator else False
+                self._apply_quota_share()
+                if ownership_changed or last_backfill is None or \
+                        time.perf_counter() - last_backfill >= self.backfill_interval:
+                    totals = await self._collect_owned_historical_data()
+                    # Сезоны лиг еще не сохранены лидером - повторим на следующем круге
+                    waiting_for_leader = self.coordinator is not None and not self.coordinator.is_leader \
+                        and totals.get("pending_leagues")
+                    last_backfill = None if waiting_for_leader else time.perf_counter()
+                
+                # Лайв-игры опрашивает только лидер: один запрос /games?date= покрывает все лиги
+                delay = self.live_scheduler.idle_interval
+                if self.coordinator is None or self.coordinator.is_leader:
+                    await self.collect_live_data()
+                    delay = self.live_scheduler.seconds_until_next_poll()
+                if self.coordinator:
+                    delay = min(delay, self.coordinator.rebalance_interval)
+                
+                # Пауза зависит от расписания игр
+                await asyncio.sleep(delay)
                 
         except Exception as e:
             logger.error("Data collection failed", error=str(e))
-            self.is_running = False
             raise
+        
+        finally:
+            self.is_running = False
+            if self.coordinator:
+                await self.coordinator.stop()
+
+    def _apply_quota_share(self):
+        """Доля квоты API по роли воркера: лидер опрашивает лайв-игры за все лиги"""
+        if self.coordinator is None or self.quota_shares is None or self.api_client.rate_limiter is None:
+            return
+        leader_share, worker_share = self.quota_shares
+        self.api_client.rate_limiter.set_quota_share(leader_share if self.coordinator.is_leader else worker_share)
+
+    async def _collect_owned_historical_data(self) -> Dict[str, int]:
+        """Backfill лиг из шардов этого воркера (список лиг обновляет лидер)"""
+        if self.coordinator is None:
+            return await self.collect_historical_data()
+        
+        league_ids = self.coordinator.owned_keys(self.backfill.league_ids)
+        if not league_ids and not self.coordinator.is_leader:
+            return {}
+        return await self.collect_historical_data(league_ids=league_ids, refresh_leagues=self.coordinator.is_leader)
 
     async def stop_collection(self):
         """Остановка сбора данных"""
         self.is_running = False
         logger.info("🛑 Stopping data collection")
 
-    async def collect_historical_data(self):
-        """Сбор исторических данных (лиги, команды, сезоны)"""
-        logger.info("📚 Starting historical data collection")
+    async def collect_historical_data(
+        self,
+        force: bool = False,
+        league_ids: Optional[Sequence[int]] = None,
+        refresh_leagues: bool = True
+    ) -> Dict[str, int]:
+        """Сбор исторических данных (лиги, сезоны, команды, игры, статистика игр) с продолжением по водяным знакам"""
+        logger.info("📚 Starting historical data collection", force=force, league_ids=league_ids)
+        started = time.perf_counter()
         
         try:
-            # 1. Получаем и сохраняем лиги с полной статистикой
-            leagues_count = await self._collect_leagues()
-            logger.info(f"✅ Leagues collected: {leagues_count}")
-            
-            # 2. Получаем команды для основных лиг
-            teams_count = await self._collect_teams()
-            logger.info(f"✅ Teams collected: {teams_count}")
+            totals = await self.backfill.run(force=force, league_ids=league_ids, refresh_leagues=refresh_leagues)
+            logger.info(f"✅ Leagues collected: {totals['leagues']}")
+            logger.info(f"✅ Teams collected: {totals['teams']}")
+            logger.info(f"✅ Games collected: {totals['games']}")
+            logger.info(f"✅ Games with statistics collected: {totals['statistics']}")
             
+            self._record_phase("historical", started,
+                               totals['leagues'] + totals['teams'] + totals['games'] + totals['statistics'])
             logger.info("🎉 Historical data collection completed")
+            return totals
             
         except Exception as e:
             logger.error("Historical data collection failed", error=str(e))
             raise
 
+    async def read_game_events(self, cursor: Optional[str] = None, consumer: Optional[str] = None, count: int = 100) -> Dict[str, Any]:
+        """События игр после курсора (по умолчанию - после сохраненного курсора потребителя)"""
+        if self.event_bus is None:
+            return {"enabled": False, "events": [], "cursor": cursor}
+        
+        if cursor is None and consumer is not None:
+            cursor = await self.event_bus.get_cursor(consumer)
+        entries = await self.event_bus.read(cursor, count=count)
+        return {
+            "enabled": True,
+            "events": [{"id": entry_id, **event} for entry_id, event in entries],
+            # Следующий курсор; потребитель фиксирует его после обработки
+            "cursor": entries[-1][0] if entries else cursor
+        }
+
+    def get_sharding_status(self) -> Optional[Dict[str, Any]]:
+        """Шарды лиг этого воркера"""
+        if self.coordinator is None:
+            return None
+        return self.coordinator.stats(self.backfill.league_ids)
+
+    async def get_dead_letters(self, kind: Optional[str] = None, status: Optional[str] = "pending", limit: int = 100) -> Dict[str, Any]:
+        """Содержимое dead-letter очереди (для /collection/dead-letters)"""
+        dead_letters = await repositories.dead_letters.get_dead_letters(kind=kind, status=status, limit=limit)
+        return {
+            "counts": await repositories.dead_letters.get_counts(),
+            "items": [
+                {
+                    "id": dead_letter.id,
+                    "kind": dead_letter.kind,
+                    "item_id": dead_letter.item_id,
+                    "stage": dead_letter.stage,
+                    "status": dead_letter.status,
+                    "error_type": dead_letter.error_type,
+                    "error": dead_letter.error,
+                    "attempts": dead_letter.attempts,
+                    "first_failed_at": dead_letter.first_failed_at.isoformat() if dead_letter.first_failed_at else None,
+                    "last_failed_at": dead_letter.last_failed_at.isoformat() if dead_letter.last_failed_at else None,
+                    "replayed_at": dead_letter.replayed_at.isoformat() if dead_letter.replayed_at else None
+                }
+                for dead_letter in dead_letters
+            ]
+        }
+
+    async def get_backfill_progress(self) -> Dict[str, Any]:
+        """Прогресс исторического сбора"""
+        return await self.backfill.get_progress()
+
     async def collect_live_data(self):
         """Сбор лайв-данных"""
         logger.info("🎯 Collecting live data")
@@ -82,7 +305,8 @@ class DataOrchestrator:
         logger.info("🏀 Collecting leagues data")
         
         # Получаем доступные сезоны
-        seasons_response = await self.api_client.get_seasons()
+        async with self.api_semaphore:
+            seasons_response = await self.api_client.get_seasons()
         if not seasons_response:
             logger.warning("❌ No seasons data available from API")
             return 0
@@ -96,7 +320,8 @@ class DataOrchestrator:
         
         # Получаем все лиги для этого сезона
         logger.info(f"🔍 Fetching leagues for season: {available_season}")
-        leagues_response = await self.api_client.get_leagues(season=available_season)
+        async with self.api_semaphore:
+            leagues_response = await self.api_client.get_leagues(season=available_season)
         
         if not leagues_response:
             logger.warning("❌ No leagues data available from API")
@@ -115,48 +340,298 @@ class DataOrchestrator:
             logger.warning("❌ No 'response' attribute in leagues response")
             return 0
         
+        leagues_saved = await self._save_leagues_bulk(leagues_list)
+        
+        logger.info(f"💾 Successfully saved {leagues_saved} leagues to database")
+        return leagues_saved
+
+    async def _save_leagues_bulk(self, leagues_list: List) -> int:
+        """Сохранение всего ответа /leagues: лиги и сезоны двумя пакетными upsert"""
+        try:
+            league_rows = [self._league_row(league_data) for league_data in leagues_list]
+            season_rows = [
+                self._season_row(league_data.id, season_data)
+                for league_data in leagues_list
+                for season_data in getattr(league_data, 'seasons', [])
+            ]
+            
+            # Лиги и их сезоны - одной транзакцией
+            async with self.db_semaphore, db_manager.unit_of_work():
+                leagues_saved = await repositories.leagues.bulk_upsert(league_rows)
+                seasons_saved = await repositories.seasons.bulk_upsert(season_rows)
+            
+            logger.info(f"✅ Bulk upserted leagues: {leagues_saved}, seasons: {seasons_saved}")
+            return leagues_saved
+            
+        except Exception as e:
+            # Пакет не прошел целиком - сохраняем по одной лиге, чтобы изолировать ошибочную
+            logger.error("❌ Bulk leagues upsert failed, falling back to per-league saves", error=str(e))
+        
+        results = await asyncio.gather(
+            *(self._save_league(league_data) for league_data in leagues_list),
+            return_exceptions=True
+        )
         leagues_saved = 0
-        for league_data in leagues_list:
-            try:
-                # Сохраняем лигу
-                league_saved = await self._save_league(league_data)
-                if league_saved:
-                    leagues_saved += 1
-                    
-            except Exception as e:
+        for league_data, result in zip(leagues_list, results):
+            if isinstance(result, Exception):
                 logger.error("❌ Failed to save league", 
                         league_id=getattr(league_data, 'id', 'unknown'),
                         league_name=getattr(league_data, 'name', 'unknown'),
-                        error=str(e))
-        
-        logger.info(f"💾 Successfully saved {leagues_saved} leagues to database")
+                        error=str(result))
+            elif result:
+                leagues_saved += 1
         return leagues_saved
 
-    async def _save_league(self, league_data) -> bool:
-        """Сохранение одной лиги в БД"""
+    def _league_row(self, league_data) -> Dict[str, Any]:
+        """Строка таблицы leagues из ответа API"""
+        # Извлекаем данные страны
+        country_data = getattr(league_data, 'country', {})
+        return {
+            'id': league_data.id,
+            'name': league_data.name,
+            'type': league_data.type,
+            'logo': league_data.logo or '',
+            'country_name': getattr(country_data, 'name', '') if country_data else '',
+            'country_code': getattr(country_data, 'code', '') if country_data else '',
+            'country_flag': getattr(country_data, 'flag', '') if country_data else ''
+        }
+
+    def _season_row(self, league_id: int, season_data) -> Dict[str, Any]:
+        """Строка таблицы seasons из ответа API"""
+        # Проверяем coverage статистики
+        coverage = getattr(season_data, 'coverage', None)
+        has_full_stats = bool(
+            coverage and 
+            getattr(coverage, 'games', None) and 
+            getattr(coverage.games, 'statistics', None) and
+            getattr(coverage.games.statistics, 'teams', False) and
+            getattr(coverage.games.statistics, 'players', False)
+        )
+        
+        # Парсим даты
+        start_date = None
+        end_date = None
         try:
-            # Извлекаем данные страны
-            country_data = getattr(league_data, 'country', {})
-            country_name = getattr(country_data, 'name', '') if country_data else ''
-            country_code = getattr(country_data, 'code', '') if country_data else ''
-            country_flag = getattr(country_data, 'flag', '') if country_data else ''
-            
-            # Сохраняем лигу
-            league, created = await repositories.leagues.get_or_create(
-                id=league_data.id,
-                defaults={
-                    'name': league_data.name,
-                    'type': league_data.type,
-                    'logo': league_data.logo or '',
-                    'country_name': country_name,
-                    'country_code': country_code,
-                    'country_flag': country_flag
+            start_str = getattr(season_data, 'start', None)
+            end_str = getattr(season_data, 'end', None)
+            
+            if start_str:
+                start_date = datetime.fromisoformat(start_str.replace('Z', '+00:00'))
+            if end_str:
+                end_date = datetime.fromisoformat(end_str.replace('Z', '+00:00'))
+        except (ValueError, AttributeError) as e:
+            logger.warning(f"⚠️ Failed to parse dates for season {getattr(season_data, 'season', 'unknown')}", 
+                         error=str(e))
+        
+        return {
+            'league_id': league_id,
+            'season': season_data.season,
+            'start_date': start_date,
+            'end_date': end_date,
+            'has_teams_stats': has_full_stats,
+            'has_players_stats': has_full_stats,
+            'has_standings': bool(getattr(coverage, 'standings', False)) if coverage else False,
+            'has_odds': bool(getattr(coverage, 'odds', False)) if coverage else False
+        }
+
+    def _team_row(self, team_data) -> Dict[str, Any]:
+        """Строка таблицы teams из ответа API"""
+        # Извлекаем данные страны
+        country_data = getattr(team_data, 'country', {})
+        return {
+            'id': team_data.id,
+            'name': team_data.name,
+            'country': getattr(country_data, 'name', '') if country_data else '',
+            'code': getattr(country_data, 'code', '') if country_data else '',
+            'logo': team_data.logo or '',
+            'national': getattr(team_data, 'nationnal', False)
+        }
+
+    def _game_row(self, game_data, season_id: int) -> Dict[str, Any]:
+        """Строка таблицы games из ответа API"""
+        home_scores = game_data.scores.home
+        away_scores = game_data.scores.away
+        return {
+            'id': game_data.id,
+            'league_id': game_data.league.id,
+            'season_id': season_id,
+            'home_team_id': game_data.teams.home.id,
+            'away_team_id': game_data.teams.away.id,
+            'date': game_datetime(game_data),
+            'timestamp': game_data.timestamp,
+            'timezone': game_data.timezone,
+            'status': game_data.status.short,
+            'stage': game_data.stage,
+            'week': game_data.week,
+            'venue': game_data.venue,
+            'home_score_total': home_scores.total,
+            'away_score_total': away_scores.total,
+            'home_score_q1': home_scores.quarter_1,
+            'home_score_q2': home_scores.quarter_2,
+            'home_score_q3': home_scores.quarter_3,
+            'home_score_q4': home_scores.quarter_4,
+            'home_score_ot': home_scores.over_time,
+            'away_score_q1': away_scores.quarter_1,
+            'away_score_q2': away_scores.quarter_2,
+            'away_score_q3': away_scores.quarter_3,
+            'away_score_q4': away_scores.quarter_4,
+            'away_score_ot': away_scores.over_time
+        }
+
+    def _game_hash(self, row: Dict[str, Any]) -> str:
+        """Хеш содержимого строки игры"""
+        payload = json.dumps(row, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    async def _resolve_season_ids(self, games_list: List) -> Dict[Tuple[int, str], int]:
+        """ID сезонов для игр из ответа (лиги и сезоны, которых нет в БД, досоздаются)"""
+        keys = {(game_data.league.id, game_data.league.season) for game_data in games_list}
+        missing = [key for key in keys if key not in self._season_ids]
+        if not missing:
+            return self._season_ids
+        
+        async with self.db_semaphore:
+            self._season_ids.update(await repositories.seasons.get_ids_by_keys(missing))
+        
+        unknown = [key for key in missing if key not in self._season_ids]
+        if unknown:
+            leagues = {game_data.league.id: game_data for game_data in games_list}
+            league_rows = [
+                {
+                    'id': league_id,
+                    'name': leagues[league_id].league.name,
+                    'type': leagues[league_id].league.type,
+                    'logo': leagues[league_id].league.logo or '',
+                    'country_name': leagues[league_id].country.name,
+                    'country_code': leagues[league_id].country.code,
+                    'country_flag': leagues[league_id].country.flag or ''
                 }
+                for league_id in {league_id for league_id, _ in unknown}
+            ]
+            season_rows = [{'league_id': league_id, 'season': season} for league_id, season in unknown]
+            async with self.db_semaphore, db_manager.unit_of_work():
+                await repositories.leagues.bulk_upsert(league_rows, update_columns=[])
+                await repositories.seasons.bulk_upsert(season_rows, update_columns=[])
+                self._season_ids.update(await repositories.seasons.get_ids_by_keys(unknown))
+        
+        return self._season_ids
+
+    async def _save_games_bulk(self, games_list: List, season_id: Optional[int] = None) -> int:
+        """Пакетная запись игр; при ошибке пакета - сохранение по одной"""
+        written, _ = await self._save_games(games_list, season_id)
+        return written
+
+    async def _save_games(self, games_list: List, season_id: Optional[int] = None) -> Tuple[int, Set[int]]:
+        """Пакетная запись игр с отчетом: число записанных и id игр, которые записать не удалось
+
+        Незаписанные игры уходят в dead-letter очередь (см. _save_game).
+        """
+        try:
+            return await self._write_games(games_list, season_id), set()
+        except Exception as e:
+            logger.error("❌ Bulk games upsert failed, falling back to per-game saves", error=str(e))
+        
+        results = await asyncio.gather(
+            *(self._save_game(game_data, season_id) for game_data in games_list)
+        )
+        failed_ids = {game_data.id for game_data, saved in zip(games_list, results) if saved is None}
+        return sum(1 for saved in results if saved), failed_ids
+
+    async def _write_games(self, games_list: List, season_id: Optional[int] = None) -> int:
+        """Пакетный upsert игр: пишутся только новые и изменившиеся (по хешу содержимого)"""
+        if not games_list:
+            return 0
+        
+        # Одна игра может прийти в нескольких ответах - оставляем последнюю версию
+        games_list = list({game_data.id: game_data for game_data in games_list}.values())
+        
+        season_ids = {} if season_id is not None else await self._resolve_season_ids(games_list)
+        game_rows = []
+        for game_data in games_list:
+            row = self._game_row(
+                game_data,
+                season_id if season_id is not None else season_ids[(game_data.league.id, game_data.league.season)]
             )
-            
-            # Сохраняем сезоны лиги
+            row['content_hash'] = self._game_hash(row)
+            game_rows.append(row)
+        
+        async with self.db_semaphore:
+            stored = await repositories.games.get_game_snapshots([row['id'] for row in game_rows])
+        changed = [
+            row for row in game_rows
+            if row['id'] not in stored or stored[row['id']]['content_hash'] != row['content_hash']
+        ]
+        self.games_unchanged += len(game_rows) - len(changed)
+        if not changed:
+            return 0
+        
+        # Игры ссылаются на команды - создаем недостающие по данным из ответа /games
+        new_ids = {row['id'] for row in changed if row['id'] not in stored}
+        team_rows = [
+            {'id': team.id, 'name': team.name, 'logo': team.logo or ''}
+            for game_data in games_list if game_data.id in new_ids
+            for team in (game_data.teams.home, game_data.teams.away)
+        ]
+        
+        async with self.db_semaphore, db_manager.unit_of_work():
+            # До записи игр: полный пересчет team_season_stats не идет параллельно с приращениями
+            await self.season_stats.lock()
+            if team_rows:
+                await repositories.teams.bulk_upsert(team_rows, update_columns=[])
+            written = await repositories.games.bulk_upsert(changed)
+            # Перенесенные игры: строки секционированных таблиц переезжают на новую game_date
+            await self._move_game_dates({
+                row['id']: row['date'] for row in changed
+                if row['id'] in stored and stored[row['id']]['date'] != row['date']
+            })
+            # Сезонная статистика команд по завершенным играм - в той же транзакции
+            await self.season_stats.apply_games([row['id'] for row in changed])
+        
+        self.games_written += written
+        logger.debug("💾 Games saved", received=len(game_rows), written=written,
+                     unchanged=len(game_rows) - len(changed))
+        
+        # События только для уже известных игр: первая запись игры (backfill) переходом не считается
+        await self._publish_game_events([
+            event for row in changed if row['id'] in stored
+            for event in detect_game_events(stored[row['id']], row)
+        ])
+        return written
+
+    async def _move_game_dates(self, dates: Dict[int, datetime]):
+        """game_date статистики и коэффициентов перенесенных игр (внутри unit of work записи игр)"""
+        if not dates:
+            return
+        moved = {
+            name: await getattr(repositories, name).move_game_dates(dates)
+            for name in ("player_stats", "team_game_stats", "odds")
+        }
+        logger.info("📅 Rescheduled games moved", games=len(dates), **moved)
+
+    async def _publish_game_events(self, events: List[Dict[str, Any]]):
+        """Публикация событий после записи игр; ошибка шины не отменяет запись"""
+        if not events or self.event_bus is None:
+            return
+        try:
+            await self.event_bus.publish(events)
+            self.events_published += len(events)
+            logger.debug("📣 Game events published", events=len(events))
+        except Exception as e:
+            logger.error("❌ Failed to publish game events", events=len(events), error=str(e))
+
+    async def _save_league(self, league_data) -> bool:
+        """Сохранение одной лиги в БД"""
+        try:
+            row = self._league_row(league_data)
             seasons_data = getattr(league_data, 'seasons', [])
-            seasons_saved = await self._save_league_seasons(league, seasons_data)
+            
+            # Лига и ее сезоны - одна сессия и транзакция (семафор держим на весь unit of work)
+            async with self.db_semaphore, db_manager.unit_of_work():
+                league, created = await repositories.leagues.get_or_create(
+                    id=row.pop('id'),
+                    defaults=row
+                )
+                seasons_saved = await self._save_league_seasons(league, seasons_data)
             
             action = "created" if created else "updated"
             logger.info(f"✅ League {action}: {league.name} (ID: {league.id}), seasons: {seasons_saved}")
@@ -166,138 +641,63 @@ class DataOrchestrator:
             logger.error("❌ Failed to save league", 
                        league_id=getattr(league_data, 'id', 'unknown'),
                        error=str(e))
+            await self._dead_letter("league", league_data, "save_league", e)
             return False
 
     async def _save_league_seasons(self, league: League, seasons_data: List) -> int:
-        """Сохранение сезонов для лиги"""
-        seasons_saved = 0
-        
-        for season_data in seasons_data:
-            try:
-                # Проверяем coverage статистики
-                coverage = getattr(season_data, 'coverage', None)
-                has_full_stats = (
-                    coverage and 
-                    getattr(coverage, 'games', None) and 
-                    getattr(coverage.games, 'statistics', None) and
-                    getattr(coverage.games.statistics, 'teams', False) and
-                    getattr(coverage.games.statistics, 'players', False)
-                )
-                
-                # Парсим даты
-                start_date = None
-                end_date = None
-                try:
-                    start_str = getattr(season_data, 'start', None)
-                    end_str = getattr(season_data, 'end', None)
-                    
-                    if start_str:
-                        start_date = datetime.fromisoformat(start_str.replace('Z', '+00:00'))
-                    if end_str:
-                        end_date = datetime.fromisoformat(end_str.replace('Z', '+00:00'))
-                except (ValueError, AttributeError) as e:
-                    logger.warning(f"⚠️ Failed to parse dates for season {getattr(season_data, 'season', 'unknown')}", 
-                                 error=str(e))
-                
-                # Сохраняем сезон
-                season, created = await repositories.seasons.get_or_create(
-                    league_id=league.id,
-                    season=season_data.season,
-                    defaults={
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'has_teams_stats': has_full_stats,
-                        'has_players_stats': has_full_stats,
-                        'has_standings': getattr(coverage, 'standings', False) if coverage else False,
-                        'has_odds': getattr(coverage, 'odds', False) if coverage else False
-                    }
-                )
-                
-                seasons_saved += 1
-                
-            except Exception as e:
-                logger.error("❌ Failed to save season", 
-                           league_id=league.id,
-                           season=getattr(season_data, 'season', 'unknown'),
-                           error=str(e))
-        
-        return seasons_saved
+        """Сохранение сезонов для лиги (в unit of work лиги)"""
+        results = await asyncio.gather(
+            *(self._save_season(league, season_data) for season_data in seasons_data)
+        )
+        return sum(1 for saved in results if saved)
 
-    async def _collect_teams(self) -> int:
-        """Сбор команд для основных лиг"""
-        logger.info("👥 Collecting teams data")
-        
-        # Основные лиги для сбора команд
-        main_leagues = [
-            {"id": 12, "name": "NBA"},      # NBA
-            {"id": 13, "name": "Euroleague"} # Euroleague
-        ]
-        
-        total_teams_saved = 0
-        
-        for league_info in main_leagues:
-            try:
-                league_id = league_info["id"]
-                league_name = league_info["name"]
-                
-                logger.info(f"🔍 Collecting teams for {league_name} (ID: {league_id})")
-                
-                # Получаем последний сезон лиги из БД
-                seasons = await repositories.seasons.get_seasons_by_league(league_id)
-                if not seasons:
-                    logger.warning(f"⚠️ No seasons found for league {league_name}")
-                    continue
-                
-                # Берем самый свежий сезон
-                latest_season = max(seasons, key=lambda s: s.season)
-                logger.info(f"📅 Using season: {latest_season.season} for {league_name}")
-                
-                # Получаем команды лиги из API
-                teams_response = await self.api_client.get_teams(
-                    league=league_id, 
-                    season=latest_season.season
+    async def _save_season(self, league: League, season_data) -> bool:
+        """Сохранение одного сезона лиги"""
+        try:
+            row = self._season_row(league.id, season_data)
+            
+            # Сохраняем сезон (семафор уже взят в _save_league)
+            season, created = await repositories.seasons.get_or_create(
+                league_id=row.pop('league_id'),
+                season=row.pop('season'),
+                defaults=row
+            )
+            
+            return True
+            
+        except Exception as e:
+            logger.error("❌ Failed to save season", 
+                       league_id=league.id,
+                       season=getattr(season_data, 'season', 'unknown'),
+                       error=str(e))
+            return False
+
+    async def _save_teams_bulk(self, teams_list: List) -> int:
+        """Пакетный upsert команд; при ошибке пакета - сохранение по одной"""
+        try:
+            async with self.db_semaphore:
+                return await repositories.teams.bulk_upsert(
+                    [self._team_row(team_data) for team_data in teams_list]
                 )
-                
-                if not teams_response or not teams_response.response:
-                    logger.warning(f"⚠️ No teams data for {league_name} season {latest_season.season}")
-                    continue
-                
-                # Сохраняем команды
-                teams_saved = 0
-                for team_data in teams_response.response:
-                    if await self._save_team(team_data):
-                        teams_saved += 1
-                
-                total_teams_saved += teams_saved
-                logger.info(f"✅ Saved {teams_saved} teams for {league_name}")
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to collect teams for league {league_info['name']}", 
-                           error=str(e))
+        except Exception as e:
+            logger.error("❌ Bulk teams upsert failed, falling back to per-team saves", error=str(e))
         
-        logger.info(f"💾 Total teams saved: {total_teams_saved}")
-        return total_teams_saved
+        results = await asyncio.gather(
+            *(self._save_team(team_data) for team_data in teams_list)
+        )
+        return sum(1 for saved in results if saved)
 
     async def _save_team(self, team_data) -> bool:
         """Сохранение одной команды в БД"""
         try:
-            # Извлекаем данные страны
-            country_data = getattr(team_data, 'country', {})
-            country_name = getattr(country_data, 'name', '') if country_data else ''
-            country_code = getattr(country_data, 'code', '') if country_data else ''
-            country_flag = getattr(country_data, 'flag', '') if country_data else ''
+            row = self._team_row(team_data)
             
             # Сохраняем команду
-            team, created = await repositories.teams.get_or_create(
-                id=team_data.id,
-                defaults={
-                    'name': team_data.name,
-                    'country': country_name,
-                    'code': country_code,
-                    'logo': team_data.logo or '',
-                    'national': getattr(team_data, 'nationnal', False)
-                }
-            )
+            async with self.db_semaphore:
+                team, created = await repositories.teams.get_or_create(
+                    id=row.pop('id'),
+                    defaults=row
+                )
             
             action = "created" if created else "updated"
             logger.debug(f"✅ Team {action}: {team.name} (ID: {team.id})")
@@ -307,62 +707,137 @@ class DataOrchestrator:
             logger.error("❌ Failed to save team", 
                        team_id=getattr(team_data, 'id', 'unknown'),
                        error=str(e))
+            await self._dead_letter("team", team_data, "save_team", e)
             return False
 
     async def _update_live_games(self) -> int:
-        """Обновление лайв-игр"""
+        """Обновление игр, которым по расписанию пора опроситься"""
         logger.info("🔄 Updating live games")
         
+        self._stats_game_ids = []
         try:
-            # Получаем лайв-игры из API
-            games_response = await self.api_client.get_games(live=True)
-            if not games_response or not games_response.response:
-                logger.info("📭 No live games found")
+            await self.live_scheduler.refresh()
+            requests = self.live_scheduler.due_requests()
+            if not requests:
+                logger.info("📭 No games due for polling",
+                            next_poll_in=round(self.live_scheduler.seconds_until_next_poll()))
                 return 0
             
-            games_updated = 0
-            for game_data in games_response.response:
-                if await self._save_game(game_data):
-                    games_updated += 1
+            responses = await asyncio.gather(
+                *(self._poll_games(request) for request in requests)
+            )
+            
+            # Все ответы опроса сохраняются одной пачкой
+            games = [game_data for response_games in responses for game_data in response_games]
+            games_updated = await self._save_games_bulk(games)
             
-            logger.info(f"✅ Live games updated: {games_updated}")
+            # Статистику собираем только для опрошенных игр, которые идут или только что закончились
+            due_ids = {game_id for request in requests for game_id in request["game_ids"]}
+            self._stats_game_ids = list(dict.fromkeys(
+                game_data.id for game_data in games
+                if game_data.id in due_ids and game_data.status.short in LIVE_STATUSES | FINISHED_STATUSES
+            ))
+            
+            logger.info(f"✅ Live games updated: {games_updated}", received=len(games), requests=len(requests))
             return games_updated
             
         except Exception as e:
             logger.error("❌ Failed to update live games", error=str(e))
             return 0
 
-    async def _save_game(self, game_data) -> bool:
-        """Сохранение игры в БД"""
+    async def _poll_games(self, request: Dict[str, Any]) -> List:
+        """Один запрос /games из плана опроса (по id игры или по дате)
+
+        Всегда мимо кеша: ответ с завершенными играми кешируется бессрочно, и финальный
+        опрос после FT иначе не увидел бы поздних исправлений счета и статуса.
+        """
+        async with self.api_semaphore:
+            if "game_id" in request:
+                games_response = await self.api_client.get_games(game_id=request["game_id"], refresh=True)
+            else:
+                games_response = await self.api_client.get_games(date=request["date"], refresh=True)
+        
+        games = games_response.response if games_response else []
+        self.live_scheduler.mark_polled(request, games)
+        return games
+
+    async def _save_game(self, game_data, season_id: Optional[int] = None) -> Optional[bool]:
+        """Сохранение одной игры в БД (True - игра записана, False - без изменений, None - ошибка)"""
         try:
-            # TODO: Реализовать полное сохранение игр
-            # Сейчас просто логируем для отладки
-            home_team = getattr(game_data.teams, 'home', {})
-            away_team = getattr(game_data.teams, 'away', {})
-            
-            logger.debug(f"🎯 Game found: {getattr(home_team, 'name', 'Unknown')} vs {getattr(away_team, 'name', 'Unknown')} "
-                        f"(Status: {getattr(game_data.status, 'short', 'Unknown')})")
-            
-            return True
+            return await self._write_games([game_data], season_id) > 0
             
         except Exception as e:
             logger.error("❌ Failed to save game", 
                        game_id=getattr(game_data, 'id', 'unknown'),
                        error=str(e))
-            return False
+            await self._dead_letter("game", game_data, "save_game", e)
+            return None
+
+    async def _dead_letter(self, kind: str, item, stage: str, error: Exception):
+        """Сохранение неудавшегося элемента для повторной записи"""
+        try:
+            await repositories.dead_letters.record(
+                kind, item.id, stage, item.model_dump(mode="json", by_alias=True), error
+            )
+        except Exception as e:
+            logger.error("❌ Failed to write dead letter", kind=kind,
+                         item_id=getattr(item, 'id', 'unknown'), error=str(e))
+
+    async def replay_dead_letters(self, kind: Optional[str] = None, limit: int = 1000) -> Dict[str, int]:
+        """Повторная запись элементов из dead-letter очереди через пакетные upsert"""
+        replay_started_at = datetime.utcnow()
+        # Статус pending должен быть актуальным: иначе отставшая реплика вернет уже повторенные
+        with db_manager.read_your_writes():
+            dead_letters = await repositories.dead_letters.get_dead_letters(kind=kind, limit=limit)
+        totals = {"requested": len(dead_letters), "replayed": 0, "failed": 0, "invalid": 0}
+        
+        by_kind: Dict[str, List] = {}
+        for dead_letter in dead_letters:
+            by_kind.setdefault(dead_letter.kind, []).append(dead_letter)
+        
+        for letter_kind, letters in by_kind.items():
+            if letter_kind == ODDS_DEAD_LETTER_KIND:
+                # Снимки коэффициентов повторяет OddsIngestionService.replay_dead_letters
+                totals["requested"] -= len(letters)
+                continue
+            if letter_kind not in DEAD_LETTER_KINDS:
+                totals["invalid"] += len(letters)
+                continue
+            model, save_bulk = DEAD_LETTER_KINDS[letter_kind]
+            
+            items, ids = [], []
+            for dead_letter in letters:
+                try:
+                    items.append(model.model_validate(dead_letter.payload))
+                    ids.append(dead_letter.id)
+                except Exception as e:
+                    logger.error("❌ Invalid dead letter payload", kind=letter_kind,
+                                 item_id=dead_letter.item_id, error=str(e))
+                    totals["invalid"] += 1
+            
+            # Пакетные методы при ошибке пишут по одному и снова кладут упавшие элементы в очередь
+            try:
+                await getattr(self, save_bulk)(items)
+                replayed = await repositories.dead_letters.mark_replayed(ids, replay_started_at)
+            except Exception as e:
+                logger.error("❌ Dead letter replay failed", kind=letter_kind, error=str(e))
+                replayed = 0
+            totals["replayed"] += replayed
+            totals["failed"] += len(ids) - replayed
+        
+        logger.info("♻️ Dead letters replayed", kind=kind, **totals)
+        return totals
 
     async def _collect_live_statistics(self) -> int:
-        """Сбор статистики для активных игр"""
+        """Сбор статистики для всех опрошенных лайв-игр пачками по 20 игр"""
         logger.info("📊 Collecting live statistics")
         
         try:
-            # Получаем активные игры из БД
-            live_games = await repositories.games.get_live_games()
+            if not self._stats_game_ids:
+                logger.info("📭 No live games for statistics")
+                return 0
             
-            stats_collected = 0
-            for game in live_games:
-                if await self._collect_game_statistics(game.id):
-                    stats_collected += 1
+            stats_collected = await self._collect_statistics(self._stats_game_ids)
             
             logger.info(f"✅ Live statistics collected for {stats_collected} games")
             return stats_collected
@@ -374,14 +849,131 @@ class DataOrchestrator:
     async def _collect_game_statistics(self, game_id: int) -> bool:
         """Сбор статистики для конкретной игры"""
         try:
-            # TODO: Реализовать сбор и сохранение статистики
-            logger.debug(f"📈 Collecting statistics for game {game_id}")
-            return True
+            return await self._collect_statistics([game_id]) > 0
             
         except Exception as e:
             logger.error("❌ Failed to collect game statistics", game_id=game_id, error=str(e))
             return False
 
+    async def _collect_statistics(self, game_ids: List[int]) -> int:
+        """Статистика команд и игроков по играм; возвращает число игр со статистикой"""
+        games_with_stats, _ = await self._collect_statistics_batches(game_ids)
+        return len(games_with_stats)
+
+    async def _collect_statistics_batches(
+        self,
+        game_ids: List[int],
+        pipeline_name: str = "statistics",
+        copy_load: bool = False
+    ) -> Tuple[Set[int], Set[int]]:
+        """Статистика через конвейер: запросы ids= по 20 игр
+
+        Возвращает id игр со статистикой и id игр, пачку которых не удалось
+        загрузить или записать (для водяного знака backfill). Backfill передает
+        свое имя конвейера, чтобы его метрики не смешивались с live сбором,
+        и copy_load - запись через COPY вместо INSERT ... VALUES.
+        """
+        failed_ids: Set[int] = set()
+        
+        async def fetch(item):
+            path, chunk = item
+            async with self.api_semaphore:
+                data, raw = await self.api_client.fetch_raw(path, {"ids": "-".join(str(game_id) for game_id in chunk)})
+            return path, chunk, data, raw
+        
+        async def parse(item):
+            path, chunk, data, raw = item
+            response = decode_response(STATISTICS_ENDPOINTS[path], data, raw, self.api_client.decode_mode)
+            if response.errors:
+                logger.warning("⚠️ Statistics response has errors", path=path, game_ids=chunk, errors=response.errors)
+            return path, chunk, response.response
+        
+        async def transform(item):
+            path, chunk, items = item
+            if path == "/games/statistics/teams":
+                return path, chunk, [self._team_game_stats_row(stats) for stats in items], []
+            # Строки игроков ссылаются на players - досоздаем игроков из ответа
+            players = [{'id': stats.player["id"], 'name': stats.player.get("name") or ''} for stats in items]
+            return path, chunk, [self._player_game_stats_row(stats) for stats in items], players
+        
+        async def persist(item):
+            path, chunk, rows, players = item
+            if not rows:
+                return set()
+            async with self.db_semaphore, db_manager.unit_of_work():
+                if players:
+                    await repositories.players.bulk_upsert(players, update_columns=[])
+                repository = repositories.team_game_stats if path == "/games/statistics/teams" else repositories.player_stats
+                if copy_load:
+                    # COPY во временную таблицу и слияние - на порядок быстрее INSERT ... VALUES
+                    # на исторических объемах (benchmarks/stats_load_benchmark.py)
+                    written = await repository.copy_upsert(rows, skip_unchanged=True)
+                else:
+                    # Live пачки малы - временная таблица на каждую не окупается
+                    written = await repository.bulk_upsert(rows, skip_unchanged=True)
+            self.stats_rows_written += written
+            self.stats_rows_unchanged += len(rows) - written
+            return {row['game_id'] for row in rows}
+        
+        async def on_error(stage: str, item, error: Exception):
+            # Во всех стадиях второй элемент - пачка id игр запроса
+            failed_ids.update(item[1])
+        
+        items = [(path, chunk) for chunk in chunk_game_ids(game_ids) for path in STATISTICS_ENDPOINTS]
+        pipeline = self._build_pipeline(pipeline_name, fetch, parse, transform, persist, on_error=on_error)
+        results = await pipeline.run(items)
+        
+        games_with_stats = set().union(*results) - failed_ids
+        logger.debug("💾 Game statistics saved", games=len(game_ids), with_stats=len(games_with_stats),
+                     failed=len(failed_ids))
+        return games_with_stats, failed_ids
+
+    def _team_game_stats_row(self, stats) -> Dict[str, Any]:
+        """Строка таблицы team_game_stats из ответа /games/statistics/teams"""
+        return {
+            'game_id': stats.game["id"],
+            'team_id': stats.team["id"],
+            'field_goals_made': stats.field_goals.total,
+            'field_goals_attempted': stats.field_goals.attempts,
+            'field_goals_percentage': float(stats.field_goals.percentage or 0),
+            'three_point_made': stats.threepoint_goals.total,
+            'three_point_attempted': stats.threepoint_goals.attempts,
+            'three_point_percentage': float(stats.threepoint_goals.percentage or 0),
+            'free_throws_made': stats.freethrows_goals.total,
+            'free_throws_attempted': stats.freethrows_goals.attempts,
+            'free_throws_percentage': float(stats.freethrows_goals.percentage or 0),
+            'rebounds_total': stats.rebounds.total,
+            'rebounds_offensive': stats.rebounds.offence,
+            'rebounds_defensive': stats.rebounds.defense,
+            'assists': stats.assists,
+            'steals': stats.steals,
+            'blocks': stats.blocks,
+            'turnovers': stats.turnovers,
+            'personal_fouls': stats.personal_fouls
+        }
+
+    def _player_game_stats_row(self, stats) -> Dict[str, Any]:
+        """Строка таблицы player_game_stats из ответа /games/statistics/players"""
+        return {
+            'game_id': stats.game["id"],
+            'team_id': stats.team["id"],
+            'player_id': stats.player["id"],
+            'player_type': stats.type,
+            'minutes_played': stats.minutes,
+            'field_goals_made': stats.field_goals.total,
+            'field_goals_attempted': stats.field_goals.attempts,
+            'field_goals_percentage': float(stats.field_goals.percentage or 0),
+            'three_point_made': stats.threepoint_goals.total,
+            'three_point_attempted': stats.threepoint_goals.attempts,
+            'three_point_percentage': float(stats.threepoint_goals.percentage or 0),
+            'free_throws_made': stats.freethrows_goals.total,
+            'free_throws_attempted': stats.freethrows_goals.attempts,
+            'free_throws_percentage': float(stats.freethrows_goals.percentage or 0),
+            'rebounds_total': stats.rebounds.get("total", 0),
+            'assists': stats.assists,
+            'points': stats.points
+        }
+
     def _get_latest_season(self, seasons: List) -> str:
         """Получение самого актуального сезона с данными для бесплатного тарифа"""
         try:
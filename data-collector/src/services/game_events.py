@@ -0,0 +1,164 @@
+import json
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from structlog import get_logger
+
+from api.cache import FINISHED_STATUSES, LIVE_STATUSES
+from services.live_scheduler import status_rank
+
+logger = get_logger()
+
+# Типы событий по играм
+GAME_STARTED = "game_started"      # NS -> Q1 (или сразу в игру)
+PERIOD_CHANGED = "period_changed"  # Q1 -> Q2, Q2 -> HT, Q4 -> OT ...
+GAME_FINISHED = "game_finished"    # -> FT / AOT / AWD
+STATUS_CHANGED = "status_changed"  # прочие: POST, CANC, SUSP ...
+SCORE_CHANGED = "score_changed"
+
+# Курсор "с начала потока"
+STREAM_START = "0-0"
+
+StreamEntry = Tuple[str, Dict[str, Any]]
+
+
+def _status_event_type(previous: Optional[str], current: str) -> str:
+    if current in FINISHED_STATUSES:
+        return GAME_FINISHED
+    if current in LIVE_STATUSES:
+        return PERIOD_CHANGED if previous in LIVE_STATUSES else GAME_STARTED
+    return STATUS_CHANGED
+
+
+def detect_game_events(previous: Dict[str, Any], row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """События перехода статуса и счета между сохраненной строкой games и новой
+
+    Откат статуса назад (устаревший ответ поверх свежего) событием не считается.
+    """
+    events = []
+    base = {
+        "game_id": row["id"],
+        "league_id": row.get("league_id"),
+        "status": row.get("status"),
+        "home": row.get("home_score_total"),
+        "away": row.get("away_score_total"),
+        "at": datetime.utcnow().isoformat(),
+    }
+
+    previous_status, status = previous.get("status"), row.get("status")
+    if status != previous_status and status_rank(status) >= status_rank(previous_status):
+        events.append({
+            **base,
+            "type": _status_event_type(previous_status, status),
+            "status_from": previous_status,
+        })
+
+    previous_score = (previous.get("home_score_total"), previous.get("away_score_total"))
+    if (base["home"], base["away"]) != previous_score and (base["home"] is not None or base["away"] is not None):
+        events.append({
+            **base,
+            "type": SCORE_CHANGED,
+            "home_from": previous_score[0],
+            "away_from": previous_score[1],
+        })
+    return events
+
+
+def _entry_key(entry_id: str) -> Tuple[int, int]:
+    milliseconds, _, sequence = entry_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+class MemoryEventBus:
+    """Поток событий в памяти процесса (для тестов и запуска без Redis)
+
+    ID записей в формате Redis Streams ("<ms>-<seq>"), курсор - ID последней
+    прочитанной записи.
+    """
+
+    def __init__(self, max_len: int = 10000):
+        self.max_len = max_len
+        self._entries: Deque[StreamEntry] = deque(maxlen=max_len)
+        self._cursors: Dict[str, str] = {}
+        self._sequence = 0
+        self.published = 0
+
+    async def publish(self, events: List[Dict[str, Any]]) -> List[str]:
+        ids = []
+        for event in events:
+            self._sequence += 1
+            entry_id = f"0-{self._sequence}"
+            self._entries.append((entry_id, event))
+            ids.append(entry_id)
+        self.published += len(events)
+        return ids
+
+    async def read(self, cursor: Optional[str] = None, count: int = 100) -> List[StreamEntry]:
+        after = _entry_key(cursor or STREAM_START)
+        return [entry for entry in self._entries if _entry_key(entry[0]) > after][:count]
+
+    async def get_cursor(self, consumer: str) -> Optional[str]:
+        return self._cursors.get(consumer)
+
+    async def commit(self, consumer: str, cursor: str):
+        self._cursors[consumer] = cursor
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "length": len(self._entries), "published": self.published,
+                "consumers": dict(self._cursors)}
+
+
+class RedisEventBus:
+    """Поток событий в Redis Stream (XADD с приблизительным MAXLEN, курсоры потребителей в hash)"""
+
+    def __init__(self, client, stream: str = "game_events", max_len: int = 100000):
+        self.client = client
+        self.stream = stream
+        self.max_len = max_len
+        self.cursors_key = f"{stream}:cursors"
+        self.published = 0
+
+    @classmethod
+    def from_url(cls, url: str, stream: str = "game_events", max_len: int = 100000) -> "RedisEventBus":
+        """Создание шины по REDIS_URL"""
+        try:
+            from redis import asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("redis package is required for the Redis event bus") from e
+
+        return cls(aioredis.from_url(url, decode_responses=True), stream=stream, max_len=max_len)
+
+    async def publish(self, events: List[Dict[str, Any]]) -> List[str]:
+        if not events:
+            return []
+        # Одна транзакция на пачку: события одной игры попадают в поток подряд и по порядку
+        pipe = self.client.pipeline(transaction=True)
+        for event in events:
+            pipe.xadd(
+                self.stream,
+                {"game_id": str(event["game_id"]), "type": event["type"], "data": json.dumps(event)},
+                maxlen=self.max_len,
+                approximate=True
+            )
+        ids = await pipe.execute()
+        self.published += len(ids)
+        return ids
+
+    async def read(self, cursor: Optional[str] = None, count: int = 100) -> List[StreamEntry]:
+        entries = await self.client.xrange(self.stream, min=f"({cursor or STREAM_START}", count=count)
+        return [(entry_id, json.loads(fields["data"])) for entry_id, fields in entries]
+
+    async def get_cursor(self, consumer: str) -> Optional[str]:
+        return await self.client.hget(self.cursors_key, consumer)
+
+    async def commit(self, consumer: str, cursor: str):
+        await self.client.hset(self.cursors_key, consumer, cursor)
+
+    async def close(self):
+        await self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "stream": self.stream, "max_len": self.max_len, "published": self.published}
@@ -0,0 +1,256 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+from structlog import get_logger
+
+from api.cache import FINISHED_STATUSES
+from api.rate_limiter import RateLimiter
+from storage.repositories import repositories
+
+logger = get_logger()
+
+# Концовка матча - ставки в игре меняются быстрее всего
+CLUTCH_STATUSES = {"Q4", "OT"}
+BREAK_STATUSES = {"HT", "BT"}
+IN_PLAY_STATUSES = {"Q1", "Q2", "Q3"}
+# Игры, которые больше не опрашиваются
+INACTIVE_STATUSES = {"POST", "CANC", "SUSP", "ABD"}
+# Порядок статусов по ходу игры (неизвестные и итоговые - в конце)
+STATUS_ORDER = {"NS": 0, "Q1": 1, "Q2": 2, "HT": 3, "Q3": 4, "Q4": 5, "BT": 5, "OT": 6, "FT": 7, "AOT": 7}
+
+
+def status_rank(status: Optional[str]) -> int:
+    return STATUS_ORDER.get(status or "NS", len(STATUS_ORDER))
+
+
+class GamePollState:
+    """Состояние опроса одной игры"""
+
+    def __init__(self, game_id: int, date: datetime, status: Optional[str]):
+        self.game_id = game_id
+        self.date = date
+        self.status = status
+        self.last_polled_at: Optional[datetime] = None
+        self.final_polled = False
+        self.next_poll_at: Optional[datetime] = None
+        self.phase = "idle"
+        self.interval: Optional[float] = None
+
+
+class LivePollScheduler:
+    """Адаптивный интервал опроса игр по сохраненному расписанию (Game.date, Game.status)
+
+    Нет игр рядом с началом - опрос не нужен (раз в schedule_refresh_interval
+    запрашивается расписание на сегодня); перед началом и в первых трех
+    четвертях - умеренно, в Q4/OT - часто, после FT - один финальный опрос.
+    Интервалы растягиваются, если план не укладывается в дневную квоту.
+    """
+
+    def __init__(
+        self,
+        rate_limiter: Optional[RateLimiter] = None,
+        idle_interval: float = 600.0,
+        pregame_window: timedelta = timedelta(minutes=30),
+        pregame_interval: float = 300.0,
+        overdue_interval: float = 60.0,
+        live_interval: float = 60.0,
+        break_interval: float = 120.0,
+        clutch_interval: float = 15.0,
+        final_delay: float = 60.0,
+        schedule_refresh_interval: float = 3 * 3600.0,
+        lookback: timedelta = timedelta(hours=6),
+        lookahead: timedelta = timedelta(hours=12),
+        quota_reserve: int = 10
+    ):
+        self.rate_limiter = rate_limiter
+        self.idle_interval = idle_interval
+        self.pregame_window = pregame_window
+        self.pregame_interval = pregame_interval
+        self.overdue_interval = overdue_interval
+        self.live_interval = live_interval
+        self.break_interval = break_interval
+        self.clutch_interval = clutch_interval
+        self.final_delay = final_delay
+        self.schedule_refresh_interval = schedule_refresh_interval
+        self.lookback = lookback
+        self.lookahead = lookahead
+        self.quota_reserve = quota_reserve
+
+        self.states: Dict[int, GamePollState] = {}
+        self.budget_factor = 1.0
+        self.last_schedule_refresh: Optional[datetime] = None
+        self.polls = 0
+        self.requests = 0
+
+    def _base_interval(self, state: GamePollState, now: datetime) -> Tuple[str, Optional[float]]:
+        """Фаза игры и базовый интервал опроса (None - не опрашивать)"""
+        status = state.status or "NS"
+        if status in CLUTCH_STATUSES:
+            return "clutch", self.clutch_interval
+        if status in IN_PLAY_STATUSES:
+            return "live", self.live_interval
+        if status in BREAK_STATUSES:
+            return "break", self.break_interval
+        if status in FINISHED_STATUSES:
+            return ("final", self.final_delay) if not state.final_polled else ("finished", None)
+        if status in INACTIVE_STATUSES:
+            return "inactive", None
+        # NS: ждем начала
+        if state.date <= now:
+            return "overdue", self.overdue_interval
+        if state.date - now <= self.pregame_window:
+            return "pregame", self.pregame_interval
+        return "scheduled", None
+
+    def _schedule(self, state: GamePollState, now: datetime):
+        state.phase, base = self._base_interval(state, now)
+        if base is None:
+            state.interval = None
+            # Запланированная игра впервые опрашивается при входе в предматчевое окно
+            state.next_poll_at = state.date - self.pregame_window if state.phase == "scheduled" else None
+            return
+
+        # Финальный опрос не растягиваем - он один
+        state.interval = base if state.phase == "final" else base * self.budget_factor
+        if state.last_polled_at is None:
+            state.next_poll_at = now
+        else:
+            state.next_poll_at = state.last_polled_at + timedelta(seconds=state.interval)
+
+    def _update_budget(self, now: datetime):
+        """Множитель интервалов, чтобы план опроса укладывался в остаток дневной квоты"""
+        if self.rate_limiter is None:
+            self.budget_factor = 1.0
+            return
+
+        intervals = [
+            base for base in (self._base_interval(state, now)[1] for state in self.states.values())
+            if base is not None
+        ]
+        if not intervals:
+            self.budget_factor = 1.0
+            return
+
+        # Один запрос /games?date= покрывает все игры дня - считаем по самому частому интервалу
+        horizon = min(self.rate_limiter.seconds_until_reset(), self._active_horizon(now))
+        projected = horizon / min(intervals)
+        available = max(self.rate_limiter.daily_remaining - self.quota_reserve, 1)
+        self.budget_factor = max(1.0, projected / available)
+
+    def _active_horizon(self, now: datetime) -> float:
+        """Сколько еще секунд будут идти игры из расписания (оценка: 3 часа от последнего начала)"""
+        last_tip_off = max(state.date for state in self.states.values())
+        return max((last_tip_off + timedelta(hours=3) - now).total_seconds(), self.idle_interval)
+
+    async def refresh(self, now: Optional[datetime] = None):
+        """Обновление расписания из БД и пересчет времени следующего опроса"""
+        now = now or datetime.utcnow()
+        games = await repositories.games.get_games_in_window(now - self.lookback, now + self.lookahead)
+
+        seen = set()
+        for game in games:
+            seen.add(game.id)
+            state = self.states.get(game.id)
+            if state is None:
+                state = GamePollState(game.id, game.date, game.status)
+                self.states[game.id] = state
+            state.date = game.date
+            # Статус из последнего опроса может быть свежее записи в БД - назад не откатываем
+            if status_rank(game.status) >= status_rank(state.status):
+                state.status = game.status
+
+        for game_id in [game_id for game_id in self.states if game_id not in seen]:
+            del self.states[game_id]
+
+        self._update_budget(now)
+        for state in self.states.values():
+            self._schedule(state, now)
+
+    def due_requests(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Запросы к /games для игр, которым пора обновиться (сгруппированы по дате)"""
+        now = now or datetime.utcnow()
+        due = [
+            state for state in self.states.values()
+            if state.next_poll_at is not None and state.next_poll_at <= now and state.phase != "scheduled"
+        ]
+
+        by_date: Dict[str, List[int]] = {}
+        for state in due:
+            by_date.setdefault(state.date.date().isoformat(), []).append(state.game_id)
+
+        requests = []
+        for date, game_ids in sorted(by_date.items()):
+            if len(game_ids) == 1:
+                requests.append({"game_id": game_ids[0], "game_ids": game_ids})
+            else:
+                requests.append({"date": date, "game_ids": game_ids})
+
+        if self._schedule_refresh_due(now) and not any(r.get("date") == now.date().isoformat() for r in requests):
+            requests.append({"date": now.date().isoformat(), "game_ids": [], "schedule": True})
+        return requests
+
+    def _schedule_refresh_due(self, now: datetime) -> bool:
+        return self.last_schedule_refresh is None or \
+            (now - self.last_schedule_refresh).total_seconds() >= self.schedule_refresh_interval
+
+    def mark_polled(self, request: Dict[str, Any], games: Iterable, now: Optional[datetime] = None):
+        """Учет выполненного запроса и статусов из ответа"""
+        now = now or datetime.utcnow()
+        self.requests += 1
+        if request.get("date") == now.date().isoformat():
+            self.last_schedule_refresh = now
+
+        returned = {game_data.id: game_data for game_data in games}
+        for game_id in set(request.get("game_ids", [])) | set(returned):
+            state = self.states.get(game_id)
+            if state is None:
+                continue
+            game_data = returned.get(game_id)
+            if game_data is not None:
+                state.status = game_data.status.short
+            if state.phase == "final":
+                state.final_polled = True
+            state.last_polled_at = now
+            self.polls += 1
+            self._schedule(state, now)
+
+    def seconds_until_next_poll(self, now: Optional[datetime] = None) -> float:
+        """Сколько спать до ближайшего опроса"""
+        now = now or datetime.utcnow()
+        candidates = [state.next_poll_at for state in self.states.values() if state.next_poll_at is not None]
+        if self.last_schedule_refresh is not None:
+            candidates.append(self.last_schedule_refresh + timedelta(seconds=self.schedule_refresh_interval))
+        else:
+            candidates.append(now)
+
+        wake = (min(candidates) - now).total_seconds()
+        return min(max(wake, 1.0), self.idle_interval)
+
+    def get_plan(self, now: Optional[datetime] = None, limit: int = 50) -> Dict[str, Any]:
+        """Ближайшие опросы (для /collection/poll-plan)"""
+        now = now or datetime.utcnow()
+        planned = sorted(
+            (state for state in self.states.values() if state.next_poll_at is not None),
+            key=lambda state: state.next_poll_at
+        )
+        return {
+            "now": now.isoformat(),
+            "next_poll_in": round(self.seconds_until_next_poll(now), 1),
+            "budget_factor": round(self.budget_factor, 2),
+            "tracked_games": len(self.states),
+            "polls": self.polls,
+            "requests": self.requests,
+            "last_schedule_refresh": self.last_schedule_refresh.isoformat() if self.last_schedule_refresh else None,
+            "rate_limit": self.rate_limiter.stats() if self.rate_limiter else None,
+            "games": [
+                {
+                    "game_id": state.game_id,
+                    "date": state.date.isoformat(),
+                    "status": state.status,
+                    "phase": state.phase,
+                    "interval": round(state.interval, 1) if state.interval is not None else None,
+                    "next_poll_at": state.next_poll_at.isoformat(),
+                    "next_poll_in": round((state.next_poll_at - now).total_seconds(), 1)
+                }
+                for state in planned[:limit]
+            ]
+        }
@@ -0,0 +1,356 @@
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from structlog import get_logger
+
+from models.odds_models import PRICE_FIELDS, OddsSnapshot
+from services.odds_sources import OddsSource
+from storage.database import db_manager
+from storage.repositories import repositories
+
+logger = get_logger()
+
+PriceKey = Tuple[int, str]  # (game_id, bookmaker)
+
+# Снимки, которые не удалось записать: одна запись dead-letter очереди на игру
+ODDS_DEAD_LETTER_KIND = "odds"
+
+
+def _record_payload(record: Tuple[Any, ...]) -> List[Any]:
+    """Кортеж COPY -> JSON (даты игры и снятия - ISO-строки)"""
+    game_id, game_date, bookmaker, *prices, captured_at = record
+    return [game_id, game_date.isoformat(), bookmaker, *prices, captured_at.isoformat()]
+
+
+def _payload_record(row: List[Any]) -> Tuple[Any, ...]:
+    game_id, game_date, bookmaker, *prices, captured_at = row
+    return (game_id, datetime.fromisoformat(game_date), bookmaker, *prices, datetime.fromisoformat(captured_at))
+
+
+class OddsIngestionService:
+    """Прием снимков коэффициентов из источников в таблицу odds
+
+    Лига букмекера -> наша лига через league_mappings, команды - через
+    team_aliases, игра - по паре команд и ближайшей дате в match_window.
+    Пишутся только снимки, цены которых изменились с последнего сохраненного,
+    пачками через COPY; пачки, которые не удалось записать, уходят в
+    dead-letter очередь. Игры, прошедшие больше match_window назад, при
+    обновлении справочников вытесняются из памяти.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[OddsSource] = (),
+        batch_size: int = 5000,
+        poll_interval: float = 30.0,
+        match_window: timedelta = timedelta(hours=12),
+        mappings_refresh: float = 300.0
+    ):
+        self.sources = list(sources)
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.match_window = match_window
+        self.mappings_refresh = mappings_refresh
+        self.is_running = False
+
+        # Справочники сопоставления (обновляются раз в mappings_refresh)
+        self._league_map: Dict[int, int] = {}
+        self._alias_map: Dict[str, int] = {}
+        self._mappings_loaded_at: Optional[float] = None
+        # (хозяева, гости, начало) -> ID игры (None - игра не найдена)
+        self._game_ids: Dict[Tuple[int, int, datetime], Optional[int]] = {}
+        # Дата найденной игры - ключ секционирования odds
+        self._game_dates: Dict[int, datetime] = {}
+        # Последние сохраненные цены по (игра, букмекер)
+        self._last_prices: Dict[PriceKey, Tuple[Optional[float], ...]] = {}
+        self._warmed_games: set = set()
+
+        self._buffer: List[Tuple[Any, ...]] = []
+        self._buffer_keys: List[PriceKey] = []
+        self._flush_lock = asyncio.Lock()
+
+        # Счетчики
+        self.received = 0
+        self.unchanged = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.copy_seconds = 0.0
+        self.unresolved_leagues: Counter = Counter()
+        self.unresolved_teams: Counter = Counter()
+        self.unmatched_games: Counter = Counter()
+        # Начало матча для ключей unmatched_games (для вытеснения прошедших)
+        self._unmatched_starts: Dict[str, datetime] = {}
+
+    async def refresh_mappings(self, force: bool = False):
+        """Загрузка league_mappings и team_aliases в память"""
+        if not force and self._mappings_loaded_at is not None and \
+                time.monotonic() - self._mappings_loaded_at < self.mappings_refresh:
+            return
+        self._league_map = await repositories.league_mappings.get_mapping_map()
+        self._alias_map = await repositories.team_aliases.get_alias_map()
+        # Новые алиасы и игры могли появиться - ненайденные игры ищем заново
+        self._game_ids = {key: game_id for key, game_id in self._game_ids.items() if game_id is not None}
+        await self._refresh_games()
+        self._mappings_loaded_at = time.monotonic()
+        logger.info("🗺️ Odds mappings loaded", leagues=len(self._league_map), aliases=len(self._alias_map))
+
+    async def _refresh_games(self):
+        """Актуальные даты известных игр (переносы) и вытеснение прошедших игр из памяти
+
+        Игра вытесняется, когда с ее начала прошло больше match_window: снимки
+        по ней уже не сопоставятся.
+        """
+        dates = await repositories.games.get_game_dates(list(self._game_dates))
+        horizon = datetime.utcnow() - self.match_window
+        self._game_dates = {game_id: date for game_id, date in dates.items() if date >= horizon}
+
+        self._game_ids = {
+            key: game_id for key, game_id in self._game_ids.items()
+            if key[2] >= horizon and game_id in self._game_dates
+        }
+        self._last_prices = {key: prices for key, prices in self._last_prices.items() if key[0] in self._game_dates}
+        self._warmed_games &= self._game_dates.keys()
+        for label in [label for label, start_time in self._unmatched_starts.items() if start_time < horizon]:
+            del self._unmatched_starts[label]
+            del self.unmatched_games[label]
+
+    def _resolve_teams(self, snapshot: OddsSnapshot) -> Optional[Tuple[int, int, int]]:
+        league_id = self._league_map.get(snapshot.league_external_id)
+        if league_id is None:
+            self.unresolved_leagues[f"{snapshot.league_external_id} {snapshot.league_name or ''}".strip()] += 1
+            return None
+
+        home_id = self._alias_map.get(snapshot.home_team.strip().lower())
+        away_id = self._alias_map.get(snapshot.away_team.strip().lower())
+        for name, team_id in ((snapshot.home_team, home_id), (snapshot.away_team, away_id)):
+            if team_id is None:
+                self.unresolved_teams[name] += 1
+        if home_id is None or away_id is None:
+            return None
+        return league_id, home_id, away_id
+
+    async def _match_games(self, keys: List[Tuple[int, int, int, datetime]]):
+        """Поиск игр для новых (лига, хозяева, гости, начало) одним запросом"""
+        missing = [key for key in keys if key[1:] not in self._game_ids]
+        if not missing:
+            return
+
+        starts = [key[3] for key in missing]
+        candidates = await repositories.games.find_games_by_teams(
+            list({(home_id, away_id) for _, home_id, away_id, _ in missing}),
+            min(starts) - self.match_window,
+            max(starts) + self.match_window
+        )
+        by_pair: Dict[Tuple[int, int], List[Tuple[int, int, datetime]]] = {}
+        for game_id, league_id, home_id, away_id, date in candidates:
+            by_pair.setdefault((home_id, away_id), []).append((game_id, league_id, date))
+            self._game_dates[game_id] = date
+
+        for league_id, home_id, away_id, start_time in missing:
+            matches = [
+                (abs(date - start_time), game_id)
+                for game_id, game_league_id, date in by_pair.get((home_id, away_id), [])
+                if game_league_id == league_id and abs(date - start_time) <= self.match_window
+            ]
+            self._game_ids[(home_id, away_id, start_time)] = min(matches)[1] if matches else None
+
+    async def _warm_prices(self, game_ids: List[int]):
+        """Последние цены из БД для игр, которых еще нет в памяти"""
+        new_ids = [game_id for game_id in set(game_ids) if game_id not in self._warmed_games]
+        if not new_ids:
+            return
+        latest = await repositories.odds.get_latest_prices(new_ids)
+        for key, row in latest.items():
+            self._last_prices.setdefault(key, tuple(row[field] for field in PRICE_FIELDS))
+        self._warmed_games.update(new_ids)
+
+    async def ingest(self, snapshots: Sequence[OddsSnapshot]) -> Dict[str, int]:
+        """Сопоставление, отбор изменившихся и постановка в буфер записи"""
+        await self.refresh_mappings()
+        self.received += len(snapshots)
+        result = {"received": len(snapshots), "queued": 0, "unchanged": 0, "unresolved": 0}
+
+        resolved = []
+        for snapshot in snapshots:
+            teams = self._resolve_teams(snapshot)
+            if teams is None:
+                result["unresolved"] += 1
+                continue
+            resolved.append((teams, snapshot))
+
+        await self._match_games([(*teams, snapshot.start_time) for teams, snapshot in resolved])
+        matched = []
+        for (league_id, home_id, away_id), snapshot in resolved:
+            game_id = self._game_ids.get((home_id, away_id, snapshot.start_time))
+            if game_id is None:
+                label = f"{snapshot.home_team} - {snapshot.away_team} {snapshot.start_time.isoformat()}"
+                self.unmatched_games[label] += 1
+                self._unmatched_starts[label] = snapshot.start_time
+                result["unresolved"] += 1
+                continue
+            matched.append((game_id, snapshot))
+
+        await self._warm_prices([game_id for game_id, _ in matched])
+        # Внутри пачки - по времени снятия, чтобы сравнивать с предыдущим снимком
+        for game_id, snapshot in sorted(matched, key=lambda item: item[1].captured_at):
+            key = (game_id, snapshot.bookmaker)
+            prices = snapshot.prices()
+            if self._last_prices.get(key) == prices or all(price is None for price in prices):
+                result["unchanged"] += 1
+                continue
+            self._last_prices[key] = prices
+            self._buffer.append((game_id, self._game_dates[game_id], snapshot.bookmaker, *prices, snapshot.captured_at))
+            self._buffer_keys.append(key)
+            result["queued"] += 1
+
+        self.unchanged += result["unchanged"]
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        return result
+
+    async def flush(self) -> int:
+        """Запись буфера через COPY; неудавшиеся пачки - в dead-letter очередь"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            records, keys = self._buffer, self._buffer_keys
+            self._buffer, self._buffer_keys = [], []
+
+            started = time.perf_counter()
+            written = 0
+            for start in range(0, len(records), self.batch_size):
+                chunk = records[start:start + self.batch_size]
+                try:
+                    written += await repositories.odds.copy_snapshots(chunk)
+                except Exception as e:
+                    # Цены не сохранены - забываем их, чтобы следующий такой же снимок записался
+                    self.failed += len(chunk)
+                    for key in keys[start:start + self.batch_size]:
+                        self._last_prices.pop(key, None)
+                        self._warmed_games.discard(key[0])
+                    logger.error("❌ Odds COPY failed", rows=len(chunk), error=str(e))
+                    await self._dead_letter(chunk, e)
+
+            self.copy_seconds += time.perf_counter() - started
+            self.written += written
+            self.flushes += 1
+            logger.debug("💾 Odds written", rows=written, duration_ms=round(1000 * (time.perf_counter() - started), 1))
+            return written
+
+    async def _dead_letter(self, records: List[Tuple[Any, ...]], error: Exception):
+        """Сохранение незаписанных снимков для повтора (replay_dead_letters)"""
+        by_game: Dict[int, List[List[Any]]] = {}
+        for record in records:
+            by_game.setdefault(record[0], []).append(_record_payload(record))
+        try:
+            pending = await repositories.dead_letters.get_pending_payloads(ODDS_DEAD_LETTER_KIND, list(by_game))
+            for game_id, rows in by_game.items():
+                # Снимки прошлых неудач игры еще ждут повтора - дополняем их (без повторов по букмекеру и времени)
+                merged = {(row[2], row[-1]): row for row in pending.get(game_id, {}).get("records", []) + rows}
+                await repositories.dead_letters.record(
+                    ODDS_DEAD_LETTER_KIND, game_id, "copy_odds", {"records": list(merged.values())}, error
+                )
+        except Exception as e:
+            logger.error("❌ Failed to write dead letter", kind=ODDS_DEAD_LETTER_KIND, rows=len(records), error=str(e))
+
+    async def replay_dead_letters(self, limit: int = 1000) -> Dict[str, int]:
+        """Повторная запись снимков из dead-letter очереди одной транзакцией"""
+        replay_started_at = datetime.utcnow()
+        with db_manager.read_your_writes():
+            letters = await repositories.dead_letters.get_dead_letters(kind=ODDS_DEAD_LETTER_KIND, limit=limit)
+        totals = {"requested": len(letters), "replayed": 0, "failed": 0, "rows": 0}
+        if not letters:
+            return totals
+
+        records = [_payload_record(row) for letter in letters for row in letter.payload.get("records", [])]
+        try:
+            # Игры могли перенести, пока снимки ждали повтора
+            dates = await repositories.games.get_game_dates(list({record[0] for record in records}))
+            records = [(record[0], dates.get(record[0], record[1]), *record[2:]) for record in records]
+            async with db_manager.unit_of_work():
+                for start in range(0, len(records), self.batch_size):
+                    await repositories.odds.copy_snapshots(records[start:start + self.batch_size])
+                replayed = await repositories.dead_letters.mark_replayed(
+                    [letter.id for letter in letters], replay_started_at
+                )
+            totals["rows"] = len(records)
+        except Exception as e:
+            logger.error("❌ Dead letter replay failed", kind=ODDS_DEAD_LETTER_KIND, error=str(e))
+            replayed = 0
+        totals["replayed"] = replayed
+        totals["failed"] = len(letters) - replayed
+
+        logger.info("♻️ Dead letters replayed", kind=ODDS_DEAD_LETTER_KIND, **totals)
+        return totals
+
+    async def collect_once(self) -> Dict[str, int]:
+        """Один проход по всем источникам"""
+        responses = await asyncio.gather(*(source.fetch() for source in self.sources), return_exceptions=True)
+        totals = {"sources": len(self.sources), "received": 0, "queued": 0, "unchanged": 0, "unresolved": 0, "failed_sources": 0}
+        for source, snapshots in zip(self.sources, responses):
+            if isinstance(snapshots, Exception):
+                logger.error("❌ Odds source failed", source=source.name, error=str(snapshots))
+                totals["failed_sources"] += 1
+                continue
+            for key, value in (await self.ingest(snapshots)).items():
+                totals[key] += value
+        totals["written"] = await self.flush()
+        logger.info("🎲 Odds collected", **totals)
+        return totals
+
+    async def start(self):
+        """Периодический опрос источников"""
+        if self.is_running:
+            logger.warning("Odds ingestion is already running")
+            return
+        self.is_running = True
+        logger.info("🚀 Starting odds ingestion", sources=len(self.sources), interval=self.poll_interval)
+        try:
+            while self.is_running:
+                await self.collect_once()
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            self.is_running = False
+            await self.flush()
+
+    async def stop(self):
+        self.is_running = False
+        logger.info("🛑 Stopping odds ingestion")
+
+    async def close(self):
+        for source in self.sources:
+            await source.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики приема (для /odds/stats)"""
+        return {
+            "is_running": self.is_running,
+            "sources": [source.name for source in self.sources],
+            "received": self.received,
+            "unchanged": self.unchanged,
+            "written": self.written,
+            "failed": self.failed,
+            "buffered": len(self._buffer),
+            "flushes": self.flushes,
+            "copy_rows_per_second": round(self.written / self.copy_seconds, 1) if self.copy_seconds > 0 else 0.0,
+            "tracked_prices": len(self._last_prices),
+            "tracked_games": len(self._game_dates),
+            "league_mappings": len(self._league_map),
+            "team_aliases": len(self._alias_map),
+            "unresolved": {
+                "leagues": sum(self.unresolved_leagues.values()),
+                "teams": sum(self.unresolved_teams.values()),
+                "games": sum(self.unmatched_games.values()),
+            }
+        }
+
+    def get_unresolved(self, limit: int = 50) -> Dict[str, Any]:
+        """Чаще всего не сопоставленные лиги, команды и игры (что добавить в маппинги)"""
+        return {
+            "leagues": dict(self.unresolved_leagues.most_common(limit)),
+            "teams": dict(self.unresolved_teams.most_common(limit)),
+            "games": dict(self.unmatched_games.most_common(limit)),
+        }
@@ -0,0 +1,206 @@
+import json
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import httpx
+from structlog import get_logger
+
+from models.odds_models import OddsSnapshot
+
+logger = get_logger()
+
+# Теги без закрывающего - не меняют вложенность
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Рынки в JSON/HTML источниках -> поля снимка
+MARKET_FIELDS = {
+    "win1": "odds_home",
+    "win2": "odds_away",
+    "draw": "odds_draw",
+    "over": "total_over",
+    "under": "total_under",
+    "total": "total_points",
+    "handicap_home": "handicap_home",
+    "handicap_away": "handicap_away",
+    "handicap": "handicap_value",
+}
+
+
+def _price(value: Any) -> Optional[float]:
+    """Коэффициент из строки линии ("1.85", "1,85", "-" - нет цены)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip().replace(",", ".")
+    try:
+        return float(value) if value not in ("", "-") else None
+    except ValueError:
+        return None
+
+
+def parse_odds_json(payload: Dict[str, Any], default_bookmaker: str = "betcity") -> List[OddsSnapshot]:
+    """Снимки из JSON-линии: {"bookmaker", "captured_at", "events": [{league_id, home, away, start, markets}]}"""
+    bookmaker = payload.get("bookmaker", default_bookmaker)
+    captured_at = payload.get("captured_at") or datetime.utcnow().isoformat()
+    snapshots = []
+    for event in payload.get("events", []):
+        markets = event.get("markets", {})
+        snapshots.append(OddsSnapshot(
+            bookmaker=bookmaker,
+            league_external_id=event["league_id"],
+            league_name=event.get("league"),
+            home_team=event["home"],
+            away_team=event["away"],
+            start_time=event["start"],
+            captured_at=event.get("captured_at", captured_at),
+            **{field: _price(markets.get(market)) for market, field in MARKET_FIELDS.items()}
+        ))
+    return snapshots
+
+
+class _LineHTMLParser(HTMLParser):
+    """Разбор HTML-линии формата Betcity:
+
+    <div class="line-event" data-league-id="..." data-start="...">
+      <span class="line-event__team-home">...</span> <span class="line-event__team-away">...</span>
+      <span class="line-event__market" data-market="win1">1.85</span> ...
+    </div>
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.events: List[Dict[str, Any]] = []
+        self._event: Optional[Dict[str, Any]] = None
+        self._depth = 0
+        self._field: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if "line-event" in classes:
+            self._event = {
+                "league_id": int(attrs["data-league-id"]),
+                "league": attrs.get("data-league"),
+                "start": attrs.get("data-start"),
+                "markets": {},
+            }
+            self._depth = 0
+        if self._event is None or tag in VOID_TAGS:
+            return
+
+        self._depth += 1
+        if "line-event__team-home" in classes:
+            self._field = "home"
+        elif "line-event__team-away" in classes:
+            self._field = "away"
+        elif "line-event__market" in classes and attrs.get("data-market") in MARKET_FIELDS:
+            self._field = "market:" + attrs["data-market"]
+
+    def handle_endtag(self, tag):
+        if self._event is None or tag in VOID_TAGS:
+            return
+        self._field = None
+        self._depth -= 1
+        if self._depth == 0:
+            self.events.append(self._event)
+            self._event = None
+
+    def handle_data(self, data):
+        if self._event is None or self._field is None or not data.strip():
+            return
+        if self._field.startswith("market:"):
+            self._event["markets"][self._field[7:]] = data.strip()
+        else:
+            self._event[self._field] = data.strip()
+
+
+def parse_odds_html(html: str, bookmaker: str = "betcity", captured_at: Optional[datetime] = None) -> List[OddsSnapshot]:
+    """Снимки из HTML-страницы линии"""
+    parser = _LineHTMLParser()
+    parser.feed(html)
+    parser.close()
+    return parse_odds_json({
+        "bookmaker": bookmaker,
+        "captured_at": (captured_at or datetime.utcnow()).isoformat(),
+        "events": [event for event in parser.events if event.get("home") and event.get("away")],
+    })
+
+
+class OddsSource:
+    """Источник снимков коэффициентов; реализации переопределяют fetch()"""
+
+    name = "base"
+
+    async def fetch(self) -> List[OddsSnapshot]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class JsonFileOddsSource(OddsSource):
+    """JSON-линия из файла (фикстуры, выгрузки)"""
+
+    name = "json_file"
+
+    def __init__(self, path: str, bookmaker: str = "betcity"):
+        self.path = Path(path)
+        self.bookmaker = bookmaker
+
+    async def fetch(self) -> List[OddsSnapshot]:
+        return parse_odds_json(json.loads(self.path.read_text(encoding="utf-8")), self.bookmaker)
+
+
+class HtmlFileOddsSource(OddsSource):
+    """HTML-страница линии из файла"""
+
+    name = "html_file"
+
+    def __init__(self, path: str, bookmaker: str = "betcity"):
+        self.path = Path(path)
+        self.bookmaker = bookmaker
+
+    async def fetch(self) -> List[OddsSnapshot]:
+        return parse_odds_html(self.path.read_text(encoding="utf-8"), self.bookmaker)
+
+
+class HttpOddsSource(OddsSource):
+    """Линия по HTTP: JSON или HTML (по Content-Type)"""
+
+    name = "http"
+
+    def __init__(self, url: str, bookmaker: str = "betcity", timeout: float = 10.0):
+        self.url = url
+        self.bookmaker = bookmaker
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def fetch(self) -> List[OddsSnapshot]:
+        response = await self.client.get(self.url)
+        response.raise_for_status()
+        if "json" in response.headers.get("content-type", ""):
+            return parse_odds_json(response.json(), self.bookmaker)
+        return parse_odds_html(response.text, self.bookmaker)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# Типы источников для ODDS_SOURCES="тип:путь_или_url,..."
+ODDS_SOURCE_TYPES = {
+    "json": JsonFileOddsSource,
+    "html": HtmlFileOddsSource,
+    "http": HttpOddsSource,
+}
+
+
+def create_odds_sources(spec: str, bookmaker: str = "betcity") -> List[OddsSource]:
+    """Источники по строке вида "json:fixtures/line.json,http:https://..." """
+    sources = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        source_type, _, location = item.partition(":")
+        if source_type not in ODDS_SOURCE_TYPES or not location:
+            raise ValueError(f"Unknown odds source: {item}")
+        sources.append(ODDS_SOURCE_TYPES[source_type](location, bookmaker=bookmaker))
+    return sources
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+from structlog import get_logger
+
+logger = get_logger()
+
+StageHandler = Callable[[Any], Awaitable[Any]]
+ErrorHandler = Callable[[str, Any, Exception], Awaitable[None]]
+
+
+class PipelineStage:
+    """Стадия конвейера: N воркеров читают из ограниченной входной очереди
+
+    Обработчик возвращает элемент для следующей стадии (None - элемент
+    отбрасывается); при fan_out=True возвращается список элементов.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: StageHandler,
+        workers: int = 1,
+        queue_size: int = 16,
+        fan_out: bool = False
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.fan_out = fan_out
+        self.queue: Optional[asyncio.Queue] = None
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        self.processed = 0
+        self.failed = 0
+        self.emitted = 0
+        self.max_queue_depth = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+        self._latencies: Deque[float] = deque(maxlen=1000)
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        handled = self.processed + self.failed
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "emitted": self.emitted,
+            "items_per_second": round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "avg_latency_ms": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p95_latency_ms": round(1000 * latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else 0.0,
+            "avg_queue_wait_ms": round(1000 * self.queue_wait_seconds / handled, 2) if handled else 0.0,
+            # Доля времени, когда воркеры заняты: у узкого места близка к 1
+            "utilization": round(self.busy_seconds / (self.workers * elapsed), 3) if elapsed > 0 else 0.0,
+            # Время ожидания места в очереди следующей стадии (обратное давление)
+            "blocked_seconds": round(self.blocked_seconds, 3),
+        }
+
+
+class Pipeline:
+    """Конвейер стадий, связанных ограниченными asyncio.Queue
+
+    Заполненная очередь блокирует предыдущую стадию, поэтому медленная
+    стадия (например, запись в БД) притормаживает загрузку, а не копит
+    данные в памяти.
+    """
+
+    def __init__(self, name: str, stages: List[PipelineStage], on_error: Optional[ErrorHandler] = None):
+        if not stages:
+            raise ValueError("Pipeline requires at least one stage")
+        self.name = name
+        self.stages = stages
+        self.on_error = on_error
+        self.is_running = False
+        self.items_in = 0
+        self._started = 0.0
+        self._elapsed = 0.0
+
+    async def _put(self, queue: asyncio.Queue, stage: PipelineStage, item: Any):
+        if queue.full():
+            blocked = time.perf_counter()
+            await queue.put((time.perf_counter(), item))
+            stage.blocked_seconds += time.perf_counter() - blocked
+        else:
+            queue.put_nowait((time.perf_counter(), item))
+
+    async def _worker(self, index: int, results: List[Any]):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            enqueued_at, item = await stage.queue.get()
+            try:
+                started = time.perf_counter()
+                stage.queue_wait_seconds += started - enqueued_at
+                try:
+                    result = await stage.handler(item)
+                except Exception as e:
+                    stage.failed += 1
+                    logger.error("❌ Pipeline stage failed", pipeline=self.name, stage=stage.name, error=str(e))
+                    if self.on_error is not None:
+                        try:
+                            await self.on_error(stage.name, item, e)
+                        except Exception as handler_error:
+                            logger.error("❌ Pipeline error handler failed", pipeline=self.name,
+                                         stage=stage.name, error=str(handler_error))
+                    continue
+                finally:
+                    duration = time.perf_counter() - started
+                    stage.busy_seconds += duration
+                    stage._latencies.append(duration)
+
+                stage.processed += 1
+                outputs = (result or []) if stage.fan_out else ([] if result is None else [result])
+                for output in outputs:
+                    stage.emitted += 1
+                    if next_stage is None:
+                        results.append(output)
+                    else:
+                        await self._put(next_stage.queue, stage, output)
+                        next_stage.max_queue_depth = max(next_stage.max_queue_depth, next_stage.queue.qsize())
+            finally:
+                stage.queue.task_done()
+
+    async def run(self, items: Iterable[Any]) -> List[Any]:
+        """Прогон элементов через все стадии; возвращает выход последней стадии"""
+        self.is_running = True
+        self.items_in = 0
+        self._started = time.perf_counter()
+        results: List[Any] = []
+
+        for stage in self.stages:
+            stage.reset_metrics()
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+
+        workers = [
+            [asyncio.ensure_future(self._worker(index, results)) for _ in range(stage.workers)]
+            for index, stage in enumerate(self.stages)
+        ]
+        first = self.stages[0]
+        try:
+            for item in items:
+                self.items_in += 1
+                await first.queue.put((time.perf_counter(), item))
+                first.max_queue_depth = max(first.max_queue_depth, first.queue.qsize())
+
+            # Стадии завершаются по очереди: после join все элементы уже переданы дальше
+            for stage, stage_workers in zip(self.stages, workers):
+                await stage.queue.join()
+                for worker in stage_workers:
+                    worker.cancel()
+            return results
+
+        finally:
+            for worker in (worker for stage_workers in workers for worker in stage_workers):
+                worker.cancel()
+            await asyncio.gather(*(w for stage_workers in workers for w in stage_workers), return_exceptions=True)
+            self._elapsed = time.perf_counter() - self._started
+            self.is_running = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики по стадиям (во время прогона - текущие)"""
+        elapsed = time.perf_counter() - self._started if self.is_running else self._elapsed
+        stages = {stage.name: stage.stats(elapsed) for stage in self.stages}
+        busiest = max(self.stages, key=lambda stage: stages[stage.name]["utilization"])
+        return {
+            "is_running": self.is_running,
+            "items_in": self.items_in,
+            "elapsed_seconds": round(elapsed, 3),
+            "bottleneck": busiest.name if elapsed > 0 else None,
+            "stages": stages,
+        }
@@ -0,0 +1,234 @@
+import bisect
+import hashlib
+import math
+import os
+import socket
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from structlog import get_logger
+
+logger = get_logger()
+
+# Пространства ключей pg_advisory_lock(int4, int4): (namespace, key)
+SHARD_LOCK_NAMESPACE = 7301
+WORKER_LOCK_NAMESPACE = 7302
+LEADER_LOCK_NAMESPACE = 7303
+LEADER_LOCK_KEY = 0
+
+# Advisory-блокировки пространства в текущей БД (в pg_locks двухключевые блокировки имеют objsubid = 2)
+ADVISORY_LOCKS_QUERY = text("""
+    SELECT objid::int AS key, pid
+    FROM pg_locks
+    WHERE locktype = 'advisory' AND granted AND objsubid = 2 AND classid = :namespace
+      AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+""")
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+
+class ShardRing:
+    """Консистентное хеширование ключей (ID лиг) по шардам
+
+    Каждый шард занимает replicas точек на кольце, поэтому при изменении
+    числа шардов переезжает только ~1/N лиг.
+    """
+
+    def __init__(self, shards: int, replicas: int = 64):
+        self.shards = max(1, shards)
+        points = sorted((_hash(f"shard-{shard}#{replica}"), shard)
+                        for shard in range(self.shards) for replica in range(replicas))
+        self._points = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
+
+    def shard_for(self, key: Any) -> int:
+        index = bisect.bisect(self._points, _hash(f"key-{key}")) % len(self._points)
+        return self._owners[index]
+
+    def assignment(self, keys: Iterable[Any]) -> Dict[int, List[Any]]:
+        """Ключи по шардам"""
+        shards: Dict[int, List[Any]] = {shard: [] for shard in range(self.shards)}
+        for key in keys:
+            shards[self.shard_for(key)].append(key)
+        return shards
+
+
+class ShardCoordinator:
+    """Владение шардами лиг через session-level advisory-блокировки PostgreSQL
+
+    Блокировки держит одно выделенное соединение: если процесс умирает или
+    теряет соединение, PostgreSQL снимает их сам, и на следующем rebalance
+    шарды забирают живые воркеры. Каждый воркер сначала берет
+    floor(шардов / живых воркеров), оставшиеся свободные шарды - по одному за
+    rebalance (не больше ceil), и отдает лишние, если у другого воркера
+    меньше floor. Владелец блокировки лидера выполняет глобальную работу
+    (список лиг, опрос лайв-игр).
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        shards: int = 4,
+        worker_index: Optional[int] = None,
+        worker_id: Optional[str] = None,
+        rebalance_interval: float = 30.0
+    ):
+        self.engine = engine
+        self.ring = ShardRing(shards)
+        self.shards = self.ring.shards
+        self.worker_index = worker_index
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.rebalance_interval = rebalance_interval
+        # Воркер с номером сначала забирает "свой" шард, остальные начинают со случайной точки
+        self.preferred_shard = worker_index % self.shards if worker_index is not None else _hash(self.worker_id) % self.shards
+        self.owned: Set[int] = set()
+        self.is_leader = False
+        self.live_workers = 0
+        self.rebalances = 0
+        self.failovers = 0
+        self._conn: Optional[AsyncConnection] = None
+        self._backend_pid: Optional[int] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self._conn is not None
+
+    async def start(self):
+        """Выделенное соединение и блокировка присутствия воркера"""
+        if self._conn is not None:
+            return
+        conn = await self.engine.connect()
+        try:
+            # Без открытой транзакции: соединение живет, пока живет воркер
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            result = await conn.execute(
+                text("SELECT pg_advisory_lock(:namespace, pg_backend_pid()), pg_backend_pid()"),
+                {"namespace": WORKER_LOCK_NAMESPACE}
+            )
+            self._backend_pid = result.one()[1]
+        except Exception:
+            await conn.invalidate()
+            raise
+        self._conn = conn
+        logger.info("🔗 Shard coordinator connected", worker=self.worker_id, shards=self.shards,
+                    preferred_shard=self.preferred_shard)
+
+    async def stop(self):
+        """Освобождение всех шардов (соединение с блокировками не возвращается в пул как есть)"""
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            await conn.execute(text("SELECT pg_advisory_unlock_all()"))
+            await conn.close()
+        except Exception:
+            await conn.invalidate()
+        self._release_state()
+        logger.info("🔓 Shard coordinator stopped", worker=self.worker_id)
+
+    def _release_state(self):
+        self.owned = set()
+        self.is_leader = False
+
+    async def _try_lock(self, namespace: int, key: int) -> bool:
+        result = await self._conn.execute(
+            text("SELECT pg_try_advisory_lock(:namespace, :key)"), {"namespace": namespace, "key": key}
+        )
+        return bool(result.scalar())
+
+    async def _unlock(self, namespace: int, key: int):
+        await self._conn.execute(
+            text("SELECT pg_advisory_unlock(:namespace, :key)"), {"namespace": namespace, "key": key}
+        )
+
+    async def _lock_owners(self, namespace: int) -> Dict[int, int]:
+        """Ключ блокировки -> pid backend-процесса владельца"""
+        result = await self._conn.execute(ADVISORY_LOCKS_QUERY, {"namespace": namespace})
+        return {row.key: row.pid for row in result}
+
+    async def rebalance(self) -> bool:
+        """Захват свободных шардов и отдача лишних; True - набор шардов изменился"""
+        before = set(self.owned)
+        try:
+            if self._conn is None:
+                await self.start()
+
+            workers = set((await self._lock_owners(WORKER_LOCK_NAMESPACE)).values())
+            self.live_workers = max(len(workers), 1)
+            floor_share = self.shards // self.live_workers
+            ceil_share = math.ceil(self.shards / self.live_workers)
+
+            # Пока у другого воркера меньше floor, держим не больше floor
+            shard_owners = await self._lock_owners(SHARD_LOCK_NAMESPACE)
+            counts = Counter(shard_owners.values())
+            starving = any(counts[pid] < floor_share for pid in workers if pid != self._backend_pid)
+            limit = floor_share if starving else ceil_share
+
+            # Лишние шарды отдаем (свой шард - последним), их заберут другие воркеры
+            surplus = len(self.owned) - limit
+            for shard in sorted(self.owned, key=lambda s: (s == self.preferred_shard, -s))[:max(surplus, 0)]:
+                await self._unlock(SHARD_LOCK_NAMESPACE, shard)
+                self.owned.discard(shard)
+
+            # Сверх floor - по одному шарду за rebalance, чтобы новые воркеры успели взять свою долю
+            target = min(limit, floor_share + 1) if len(before) >= floor_share else floor_share
+            candidates = [(self.preferred_shard + offset) % self.shards for offset in range(self.shards)]
+            for shard in candidates:
+                if len(self.owned) >= target:
+                    break
+                if shard in self.owned or shard in shard_owners:
+                    continue
+                # Между чтением pg_locks и захватом шард могли занять - решает pg_try_advisory_lock
+                if await self._try_lock(SHARD_LOCK_NAMESPACE, shard):
+                    self.owned.add(shard)
+
+            if not self.is_leader:
+                self.is_leader = await self._try_lock(LEADER_LOCK_NAMESPACE, LEADER_LOCK_KEY)
+                if self.is_leader:
+                    logger.info("👑 Worker became leader", worker=self.worker_id)
+
+        except Exception as e:
+            # Соединение потеряно - блокировки сняты сервером, считаем что шардов у нас нет
+            logger.error("❌ Shard rebalance failed, releasing ownership", worker=self.worker_id, error=str(e))
+            if self._conn is not None:
+                conn, self._conn = self._conn, None
+                try:
+                    await conn.invalidate()
+                except Exception:
+                    pass
+            self._release_state()
+
+        self.rebalances += 1
+        changed = self.owned != before
+        if changed:
+            acquired = sorted(self.owned - before)
+            if before and acquired:
+                self.failovers += 1
+            logger.info("🔀 Shard ownership changed", worker=self.worker_id, owned=sorted(self.owned),
+                        acquired=acquired, released=sorted(before - self.owned),
+                        live_workers=self.live_workers)
+        return changed
+
+    def owned_keys(self, keys: Iterable[Any]) -> List[Any]:
+        """Ключи (ID лиг), которые относятся к шардам этого воркера"""
+        return [key for key in keys if self.ring.shard_for(key) in self.owned]
+
+    def stats(self, keys: Iterable[Any] = ()) -> Dict[str, Any]:
+        """Состояние воркера (для /collection/status)"""
+        keys = list(keys)
+        return {
+            "worker": self.worker_id,
+            "worker_index": self.worker_index,
+            "connected": self.is_active,
+            "is_leader": self.is_leader,
+            "shards": self.shards,
+            "owned_shards": sorted(self.owned),
+            "owned_keys": self.owned_keys(keys),
+            "live_workers": self.live_workers,
+            "rebalances": self.rebalances,
+            "failovers": self.failovers,
+            "assignment": {str(shard): shard_keys for shard, shard_keys in self.ring.assignment(keys).items()}
+        }
@@ -0,0 +1,175 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from structlog import get_logger
+
+from api.cache import FINISHED_STATUSES
+from storage.database import db_manager
+from storage.repositories import repositories
+from storage.repositories.team_repository import SEASON_COUNTER_COLUMNS, SEASON_DERIVED_COLUMNS
+
+logger = get_logger()
+
+# Advisory-блокировка агрегатов (пространство ключей как в services/sharding.py):
+# запись игр берет разделяемую, полный пересчет - исключительную
+STANDINGS_LOCK_NAMESPACE = 7304
+STANDINGS_LOCK_KEY = 0
+
+# Допуск сравнения производных колонок (float) при проверке
+RATIO_TOLERANCE = 1e-9
+
+SeasonKey = Tuple[int, int]  # (team_id, season_id)
+
+
+def game_contribution(game: Optional[Dict[str, Any]], sign: int = 1) -> List[Dict[str, Any]]:
+    """Вклад учтенной версии игры в счетчики обеих команд (пусто для None - игра не учитывается)"""
+    if game is None:
+        return []
+
+    rows = []
+    for team_id, points_for, points_against, side in (
+        (game["home_team_id"], game["home_score"], game["away_score"], "home"),
+        (game["away_team_id"], game["away_score"], game["home_score"], "away"),
+    ):
+        row = {column: 0 for column in SEASON_COUNTER_COLUMNS}
+        row.update(team_id=team_id, season_id=game["season_id"], league_id=game["league_id"])
+        row["games_played"] = row[f"games_played_{side}"] = sign
+        # Ничья (в баскетболе - только при некорректных данных) не победа и не поражение
+        if points_for != points_against:
+            result = "wins" if points_for > points_against else "losses"
+            row[f"{result}_total"] = row[f"{result}_{side}"] = sign
+        row["points_for_total"] = sign * points_for
+        row["points_against_total"] = sign * points_against
+        rows.append(row)
+    return rows
+
+
+def merge_deltas(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Сложение приращений по (team_id, season_id); нулевые отбрасываются"""
+    merged: Dict[SeasonKey, Dict[str, Any]] = {}
+    for row in rows:
+        key = (row["team_id"], row["season_id"])
+        if key not in merged:
+            merged[key] = dict(row)
+            continue
+        for column in SEASON_COUNTER_COLUMNS:
+            merged[key][column] += row[column]
+    return [row for row in merged.values() if any(row[column] for column in SEASON_COUNTER_COLUMNS)]
+
+
+class TeamSeasonStatsAggregator:
+    """team_season_stats из завершенных игр
+
+    При записи игр (в той же транзакции) применяются только приращения: учтенная
+    версия игры хранится в team_season_stats_games, разница с текущей - вклад игры
+    (завершение, исправление счета, откат статуса, перенос в другой сезон). Полный
+    пересчет из games - для первичного заполнения и починки, проверка сравнивает
+    строки с пересчетом.
+    """
+
+    def __init__(self):
+        self.games_applied = 0
+        self.rows_updated = 0
+        self.rebuilds = 0
+
+    async def lock(self, exclusive: bool = False):
+        """Блокировка агрегатов до конца транзакции (вызывать внутри unit of work до записи игр)"""
+        function = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+        async with db_manager.get_async_session() as session:
+            await session.execute(
+                text(f"SELECT {function}(:namespace, :key)"),
+                {"namespace": STANDINGS_LOCK_NAMESPACE, "key": STANDINGS_LOCK_KEY}
+            )
+
+    async def apply_games(self, game_ids: List[int]) -> int:
+        """Приращения по записанным играм (внутри unit of work записи, после lock()); возвращает число учтенных игр"""
+        games = await repositories.team_stats.claim_games(game_ids, FINISHED_STATUSES)
+        if not games:
+            return 0
+
+        deltas = merge_deltas([
+            row
+            for previous, current in games
+            for row in game_contribution(previous, sign=-1) + game_contribution(current)
+        ])
+        updated = await repositories.team_stats.apply_deltas(deltas)
+        self.games_applied += len(games)
+        self.rows_updated += updated
+        logger.debug("📈 Team season stats updated", games=len(games), rows=updated)
+        return len(games)
+
+    async def rebuild(self, league_id: Optional[int] = None, season_id: Optional[int] = None) -> Dict[str, Any]:
+        """Полный пересчет строк лиги/сезона (все при None) из games"""
+        started = time.perf_counter()
+        async with db_manager.unit_of_work():
+            # Запись игр ждет окончания пересчета, пересчет - текущих транзакций записи
+            await self.lock(exclusive=True)
+            counts = await repositories.team_stats.rebuild(FINISHED_STATUSES, league_id, season_id)
+        self.rebuilds += 1
+
+        result = {
+            "league_id": league_id,
+            "season_id": season_id,
+            "rows": counts["rows"],
+            "games": counts["games"],
+            "duration_seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info("🔁 Team season stats rebuilt", **result)
+        return result
+
+    async def check(self, league_id: Optional[int] = None, season_id: Optional[int] = None,
+                    limit: int = 50) -> Dict[str, Any]:
+        """Сравнение сохраненных строк с пересчетом из games; limit - число выводимых расхождений"""
+        expected = {
+            (row["team_id"], row["season_id"]): row
+            for row in await repositories.team_stats.recompute(FINISHED_STATUSES, league_id, season_id)
+        }
+        stored = {
+            (row["team_id"], row["season_id"]): row
+            for row in await repositories.team_stats.get_scope_rows(league_id, season_id)
+        }
+
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            differences = self._compare(stored.get(key), expected.get(key))
+            if differences:
+                mismatches.append({"team_id": key[0], "season_id": key[1], "differences": differences})
+
+        result = {
+            "league_id": league_id,
+            "season_id": season_id,
+            "rows_checked": len(set(expected) | set(stored)),
+            "mismatched": len(mismatches),
+            "consistent": not mismatches,
+            "mismatches": mismatches[:limit],
+        }
+        if mismatches:
+            logger.warning("⚠️ Team season stats inconsistent", league_id=league_id, season_id=season_id,
+                           mismatched=len(mismatches))
+        return result
+
+    @staticmethod
+    def _compare(stored: Optional[Dict[str, Any]], expected: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Колонки с расхождениями: {колонка: [сохранено, пересчет]}
+
+        Строка с нулевыми счетчиками (игры команды откатились из завершенных) равна отсутствующей.
+        """
+        differences = {}
+        for column in SEASON_COUNTER_COLUMNS:
+            stored_value = (stored or {}).get(column) or 0
+            expected_value = (expected or {}).get(column) or 0
+            if stored_value != expected_value:
+                differences[column] = [stored_value, expected_value]
+        for column in SEASON_DERIVED_COLUMNS:
+            stored_value = (stored or {}).get(column) or 0.0
+            expected_value = (expected or {}).get(column) or 0.0
+            if abs(stored_value - expected_value) > RATIO_TOLERANCE:
+                differences[column] = [stored_value, expected_value]
+        return differences
+
+    def stats(self) -> Dict[str, Any]:
+        return {"games_applied": self.games_applied, "rows_updated": self.rows_updated, "rebuilds": self.rebuilds}
+
+
+# Глобальный агрегатор (сбор и эндпоинты /standings)
+season_stats_aggregator = TeamSeasonStatsAggregator()
@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+
+# Добавляем путь для импортов
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from dotenv import load_dotenv
+
+# Переменные окружения нужны до импорта storage (DATABASE_URL читается при импорте)
+load_dotenv('config/.env')
+
+# Сезонная статистика команд (team_season_stats) вне сервиса:
+#   python standings_tool.py rebuild [--league-id N] [--season-id N]  - полный пересчет из games
+#   python standings_tool.py check [--league-id N] [--season-id N]    - сравнение с пересчетом
+# Код выхода check: 1 при расхождениях.
+
+
+async def run(command: str, league_id: Optional[int], season_id: Optional[int], limit: int) -> int:
+    from services.standings import season_stats_aggregator
+    from storage.database import db_manager
+
+    try:
+        if command == "rebuild":
+            result = await season_stats_aggregator.rebuild(league_id, season_id)
+        else:
+            result = await season_stats_aggregator.check(league_id, season_id, limit=limit)
+    finally:
+        await db_manager.dispose()
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0 if result.get("consistent", True) else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет и проверка сезонной статистики команд")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--league-id", type=int)
+    parser.add_argument("--season-id", type=int)
+    parser.add_argument("--limit", type=int, default=50, help="Число выводимых расхождений (check)")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.command, args.league_id, args.season_id, args.limit)))
@@ -1,14 +1,23 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, JSON, ForeignKey, Text, UniqueConstraint, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.orm import DeclarativeBase
 import os
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 
+from storage.instrumentation import InstrumentedQueuePool, QueryInstrumentation
+from storage.partitions import PartitionManager
+from storage.unit_of_work import UnitOfWork, current_unit_of_work
+
 load_dotenv('config/.env')
 
+# Запрошено чтение своих записей: чтения репозиториев идут в основную БД, а не в реплику
+read_your_writes_requested: ContextVar[bool] = ContextVar("read_your_writes_requested", default=False)
+
 # Базовый класс для моделей
 class Base(DeclarativeBase):
     pass
@@ -31,6 +40,9 @@ class League(Base):
 
 class Season(Base):
     __tablename__ = 'seasons'
+    __table_args__ = (
+        UniqueConstraint('league_id', 'season', name='uq_seasons_league_season'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     league_id = Column(Integer, ForeignKey('leagues.id'), nullable=False)
@@ -68,6 +80,20 @@ class Team(Base):
 
 class Game(Base):
     __tablename__ = 'games'
+    __table_args__ = (
+        # Очные встречи и поиск игры по паре команд (сопоставление коэффициентов)
+        Index('ix_games_home_away_date', 'home_team_id', 'away_team_id', 'date'),
+        # Игры команды: домашние - по ix_games_home_away_date, гостевые - здесь
+        Index('ix_games_away_date', 'away_team_id', 'date'),
+        Index('ix_games_season_date', 'season_id', 'date'),
+        # Окна дат (предстоящие игры, планировщик опроса)
+        Index('ix_games_date', 'date'),
+        # Лайв-игры - малая доля таблицы, частичный индекс
+        Index(
+            'ix_games_live_status', 'status',
+            postgresql_where=text("status IN ('Q1', 'Q2', 'Q3', 'Q4', 'OT', 'BT', 'HT')")
+        ),
+    )
     
     id = Column(Integer, primary_key=True)
     league_id = Column(Integer, ForeignKey('leagues.id'), nullable=False)
@@ -99,6 +125,7 @@ class Game(Base):
     away_score_ot = Column(Integer)
     
     # Метаданные
+    content_hash = Column(String(40))  # sha1 данных игры - неизмененные игры не перезаписываются
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
@@ -112,6 +139,10 @@ class Game(Base):
 
 class TeamSeasonStats(Base):
     __tablename__ = 'team_season_stats'
+    __table_args__ = (
+        # Одна строка на команду в сезоне (приращения агрегатора через ON CONFLICT)
+        UniqueConstraint('team_id', 'season_id', name='uq_team_season_stats_team_season'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
@@ -150,11 +181,34 @@ class TeamSeasonStats(Base):
     season = relationship("Season", back_populates="team_stats")
     league = relationship("League")
 
+# Завершенная игра в том виде, в котором она учтена в team_season_stats: приращение
+# при изменении игры - вклад новой версии минус вклад учтенной (сезон, команды, счет)
+class TeamSeasonStatsGame(Base):
+    __tablename__ = 'team_season_stats_games'
+    __table_args__ = (
+        Index('ix_team_season_stats_games_season', 'season_id'),
+    )
+    
+    game_id = Column(Integer, ForeignKey('games.id'), primary_key=True)
+    season_id = Column(Integer, ForeignKey('seasons.id'), nullable=False)
+    league_id = Column(Integer, ForeignKey('leagues.id'), nullable=False)
+    home_team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
+    away_team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
+    home_score = Column(Integer, nullable=False)
+    away_score = Column(Integer, nullable=False)
+
 class TeamGameStats(Base):
     __tablename__ = 'team_game_stats'
+    __table_args__ = (
+        # Ключи секционированной таблицы включают ключ секционирования
+        UniqueConstraint('game_id', 'team_id', 'game_date', name='uq_team_game_stats_game_team'),
+        # Секция на сезон (storage/partitions.py)
+        {'postgresql_partition_by': 'RANGE (game_date)'},
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     game_id = Column(Integer, ForeignKey('games.id'), nullable=False)
+    game_date = Column(DateTime, primary_key=True)  # Дата игры - ключ секционирования
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     
     # Броски
@@ -204,9 +258,17 @@ class Player(Base):
 
 class PlayerGameStats(Base):
     __tablename__ = 'player_game_stats'
+    __table_args__ = (
+        UniqueConstraint('game_id', 'player_id', 'game_date', name='uq_player_game_stats_game_player'),
+        # Статистика игрока за сезон и карьеру
+        Index('ix_player_game_stats_player_game', 'player_id', 'game_id'),
+        Index('ix_player_game_stats_team', 'team_id'),
+        {'postgresql_partition_by': 'RANGE (game_date)'},
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     game_id = Column(Integer, ForeignKey('games.id'), nullable=False)
+    game_date = Column(DateTime, primary_key=True)
     team_id = Column(Integer, ForeignKey('teams.id'), nullable=False)
     player_id = Column(Integer, ForeignKey('players.id'), nullable=False)
     
@@ -246,9 +308,16 @@ class PlayerGameStats(Base):
 
 class Odds(Base):
     __tablename__ = 'odds'
+    __table_args__ = (
+        # История и последний снимок по (игра, букмекер)
+        Index('ix_odds_game_bookmaker_timestamp', 'game_id', 'bookmaker', 'timestamp'),
+        # Секция на сезон игры: снимки сезона удаляются вместе со статистикой
+        {'postgresql_partition_by': 'RANGE (game_date)'},
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     game_id = Column(Integer, ForeignKey('games.id'), nullable=False)
+    game_date = Column(DateTime, primary_key=True)
     bookmaker = Column(String(50), nullable=False)  # "betcity", "etc"
     
     # Основные коэффициенты
@@ -303,31 +372,193 @@ class LeagueMapping(Base):
     # Связи
     league = relationship("League")
 
+class CollectionWatermark(Base):
+    __tablename__ = 'collection_watermarks'
+    __table_args__ = (
+        UniqueConstraint('league_id', 'season', 'resource', name='uq_collection_watermarks_scope'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    league_id = Column(Integer, nullable=False, default=0)  # 0 - глобальный ресурс (список лиг)
+    season = Column(String(20), nullable=False, default='')  # '' - ресурс без сезона
+    resource = Column(String(30), nullable=False)  # "leagues", "teams", "games"
+    status = Column(String(20), nullable=False, default='pending')  # "pending", "in_progress", "complete", "failed"
+    
+    # Водяной знак: все элементы до него включительно сохранены
+    watermark = Column(DateTime)
+    last_item_id = Column(Integer)
+    items_collected = Column(Integer, default=0)
+    items_expected = Column(Integer)
+    
+    # Попытки и ошибки
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text)
+    
+    # Метаданные
+    started_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class DeadLetter(Base):
+    __tablename__ = 'dead_letters'
+    __table_args__ = (
+        UniqueConstraint('kind', 'item_id', name='uq_dead_letters_kind_item'),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(20), nullable=False)  # "league", "team", "game"
+    item_id = Column(Integer, nullable=False)  # ID элемента в api-sports
+    stage = Column(String(50), nullable=False)  # Где упала запись: "save_league", "save_team", "save_game"
+    status = Column(String(20), nullable=False, default='pending')  # "pending", "replayed"
+    
+    # Исходные данные из ответа API (для повторной записи)
+    payload = Column(JSON, nullable=False)
+    
+    # Ошибка и попытки
+    error_type = Column(String(100))
+    error = Column(Text)
+    attempts = Column(Integer, default=1)
+    
+    # Метаданные
+    first_failed_at = Column(DateTime, server_default=func.now())
+    last_failed_at = Column(DateTime, server_default=func.now())
+    replayed_at = Column(DateTime)
+
 # Асинхронный менеджер БД
 class DatabaseManager:
     def __init__(self):
         self.database_url = os.getenv('DATABASE_URL')
         if not self.database_url:
             raise ValueError("DATABASE_URL not found in environment variables")
+        # Реплика для чтения (необязательно): отдельный пул для запросов репозиториев на чтение
+        self.read_database_url = os.getenv('DATABASE_READ_URL') or None
         
-        # Заменяем sync на async драйвер
-        async_database_url = self.database_url.replace('postgresql+psycopg2', 'postgresql+asyncpg')
-        
-        self.engine = create_async_engine(async_database_url, echo=True)
+        # Вывод всего SQL в stdout только для отладки (DB_ECHO=true) - метрики запросов в instrumentation
+        echo = os.getenv('DB_ECHO', 'false').lower() == 'true'
+        self.engine = create_async_engine(self._async_url(self.database_url), echo=echo, poolclass=InstrumentedQueuePool)
+        self.instrumentation = QueryInstrumentation(
+            slow_query_ms=float(os.getenv('DB_SLOW_QUERY_MS', '200')),
+            log_parameters=os.getenv('DB_SLOW_QUERY_LOG_PARAMETERS', 'true').lower() == 'true',
+            request_query_warn=int(os.getenv('DB_REQUEST_QUERY_WARN', '50'))
+        )
+        self.instrumentation.attach(self.engine, name="primary")
+        # Секции создаются и отключаются только в основной БД
+        self.partitions = PartitionManager(
+            self,
+            seasons_ahead=int(os.getenv('DB_PARTITION_SEASONS_AHEAD', '1')),
+            archive_schema=os.getenv('DB_PARTITION_ARCHIVE_SCHEMA', 'archive')
+        )
         self.async_session_maker = async_sessionmaker(
             self.engine, 
             class_=AsyncSession, 
             expire_on_commit=False
         )
+        
+        if self.read_database_url:
+            self.read_engine = create_async_engine(
+                self._async_url(self.read_database_url),
+                echo=echo,
+                poolclass=InstrumentedQueuePool,
+                pool_size=int(os.getenv('DB_READ_POOL_SIZE', '5')),
+                max_overflow=int(os.getenv('DB_READ_MAX_OVERFLOW', '10'))
+            )
+            self.instrumentation.attach(self.read_engine, name="replica")
+            self.read_session_maker = async_sessionmaker(
+                self.read_engine,
+                class_=AsyncSession,
+                expire_on_commit=False
+            )
+        else:
+            self.read_engine = self.engine
+            self.read_session_maker = self.async_session_maker
+    
+    @staticmethod
+    def _async_url(url: str) -> str:
+        # Заменяем sync на async драйвер
+        return url.replace('postgresql+psycopg2', 'postgresql+asyncpg')
+    
+    @property
+    def has_replica(self) -> bool:
+        return self.read_engine is not self.engine
     
     async def create_tables(self):
         """Создание всех таблиц (асинхронно)"""
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+        await self.partitions.ensure_upcoming()
     
     def get_async_session(self):
-        """Возвращает асинхронный контекстный менеджер для сессии"""
+        """Возвращает асинхронный контекстный менеджер для сессии
+
+        Внутри unit_of_work() - общая сессия unit of work, иначе новая сессия на вызов.
+        """
+        unit_of_work = current_unit_of_work.get()
+        if unit_of_work is not None:
+            return unit_of_work.scope()
         return self.async_session_maker()
+    
+    def get_read_session(self):
+        """Сессия для запросов на чтение: реплика, если настроена
+
+        Внутри unit_of_work() - его сессия, внутри read_your_writes() - основная БД.
+        Чтения, по которым решается, что записать (хеши и снимки игр, последние
+        цены, водяные знаки), остаются на get_async_session(): отставание реплики
+        привело бы к пропуску записи.
+        """
+        unit_of_work = current_unit_of_work.get()
+        if unit_of_work is not None:
+            return unit_of_work.scope()
+        if read_your_writes_requested.get():
+            return self.async_session_maker()
+        return self.read_session_maker()
+    
+    @contextmanager
+    def read_your_writes(self):
+        """Чтения репозиториев внутри блока (и его дочерних задач) - из основной БД"""
+        token = read_your_writes_requested.set(True)
+        try:
+            yield
+        finally:
+            read_your_writes_requested.reset(token)
+    
+    async def dispose(self):
+        """Закрытие пулов основной БД и реплики"""
+        await self.engine.dispose()
+        if self.has_replica:
+            await self.read_engine.dispose()
+    
+    @asynccontextmanager
+    async def unit_of_work(self, read_only: bool = False):
+        """Одна сессия и транзакция для всех вызовов репозиториев внутри блока
+
+        Фиксация при выходе (read_only - откат), откат при исключении.
+        Вложенный unit_of_work() присоединяется к внешнему. read_only - снимок
+        для чтения: выполняется на реплике (кроме read_your_writes()).
+        """
+        current = current_unit_of_work.get()
+        if current is not None:
+            yield current
+            return
+        
+        if read_only and not read_your_writes_requested.get():
+            session_maker = self.read_session_maker
+        else:
+            session_maker = self.async_session_maker
+        async with session_maker() as session:
+            unit_of_work = UnitOfWork(session)
+            token = current_unit_of_work.set(unit_of_work)
+            try:
+                yield unit_of_work
+                # read_only - без фиксации: транзакцию откатит закрытие сессии
+                # (в отличие от rollback() загруженные объекты остаются доступны)
+                if not read_only:
+                    async with unit_of_work.lock:
+                        await session.commit()
+            except BaseException:
+                await session.rollback()
+                raise
+            finally:
+                current_unit_of_work.reset(token)
 
 # Создаем экземпляр менеджера БД
 db_manager = DatabaseManager()
\ No newline at end of file
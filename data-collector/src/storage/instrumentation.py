@@ -0,0 +1,300 @@
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional, Sequence
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from structlog import get_logger
+
+logger = get_logger()
+
+# Границы корзин гистограмм задержек (мс); все, что больше последней - в "+inf"
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Списки параметров IN (...), IN ((...), ...) и VALUES (...), (...) разной длины - один и тот же запрос
+_PARAMS_GROUP = r"\(\s*\$\d+(?:::\w+(?:\[\])?)?(?:\s*,\s*\$\d+(?:::\w+(?:\[\])?)?)*\s*\)"
+_PARAMS_LIST_RE = re.compile(
+    r"\b(IN|VALUES)\s*(\()?" + _PARAMS_GROUP + r"(?:\s*,\s*" + _PARAMS_GROUP + r")*(?(2)\))", re.IGNORECASE
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Общая метка HTTP-запросов без маршрута приложения (404, сканеры путей): сырые пути
+# в метриках по маршрутам раздували бы их без ограничения
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Счетчик запросов текущего HTTP-запроса (выставляет middleware)
+_request_queries: ContextVar[Optional["RequestQueries"]] = ContextVar("request_queries", default=None)
+
+
+def normalize_statement(statement: str) -> str:
+    """Ключ запроса для статистики: без переносов и с одинаковыми списками параметров"""
+    return _PARAMS_LIST_RE.sub(r"\1 (...)", _WHITESPACE_RE.sub(" ", statement).strip())
+
+
+class LatencyHistogram:
+    """Гистограмма задержек с фиксированными корзинами (мс)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float):
+        index = 0
+        while index < len(self.buckets) and duration_ms > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля по верхней границе корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(float(self.buckets[index]), self.max_ms) if index < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def stats(self) -> Dict[str, Any]:
+        labels = [f"le_{bucket:g}" for bucket in self.buckets] + ["+inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class RequestQueries:
+    """Запросы к БД в рамках одного HTTP-запроса"""
+
+    def __init__(self, route: str, path: Optional[str] = None):
+        self.route = route
+        # Фактический путь - только для журнала медленных запросов
+        self.path = path
+        self.queries = 0
+        self.duration_ms = 0.0
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, замеряющий ожидание соединения (включая установку нового соединения)
+
+    Время кладется в info записи пула и забирается обработчиком события checkout.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        record = super()._do_get()
+        record.info["checkout_wait"] = time.perf_counter() - started
+        return record
+
+
+class QueryInstrumentation:
+    """Метрики запросов по событиям движка SQLAlchemy
+
+    Гистограммы задержек (общая и по нормализованному тексту запроса),
+    журнал медленных запросов с параметрами, ожидание соединения из пула
+    и число запросов на HTTP-запрос (поиск N+1). Движки (основная БД и
+    реплика) различаются по имени: число запросов и пулы - по каждому.
+    """
+
+    def __init__(
+        self,
+        slow_query_ms: float = 200.0,
+        log_parameters: bool = True,
+        request_query_warn: int = 50,
+        max_statements: int = 500,
+        slow_log_size: int = 100
+    ):
+        self.slow_query_ms = slow_query_ms
+        self.log_parameters = log_parameters
+        self.request_query_warn = request_query_warn
+        self.max_statements = max_statements
+
+        self.queries = LatencyHistogram()
+        self.statements: Dict[str, LatencyHistogram] = {}
+        self.errors = 0
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self.slow_total = 0
+
+        self.checkout_wait = LatencyHistogram()
+        self.connects = 0
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        self.engine_queries: Dict[str, int] = {}
+        self._engines: Dict[str, Any] = {}
+
+    def attach(self, engine, name: Optional[str] = None):
+        """Подписка на события движка (AsyncEngine или Engine) и его пула
+
+        name - метка движка в метриках (по умолчанию URL без пароля).
+        """
+        sync_engine = getattr(engine, "sync_engine", engine)
+        name = name or sync_engine.url.render_as_string(hide_password=True)
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+        # События пула переживают его пересоздание (dispose)
+        event.listen(sync_engine.pool, "checkout", self._on_checkout)
+        event.listen(sync_engine.pool, "connect", self._on_connect)
+        self._engines[name] = sync_engine
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("query_started")
+        if not started:
+            return
+        duration_ms = 1000 * (time.perf_counter() - started.pop())
+        self._observe(statement, duration_ms)
+        self._count_engine(conn.engine)
+
+        if duration_ms >= self.slow_query_ms:
+            self._log_slow(statement, parameters, duration_ms, executemany)
+
+    def _handle_error(self, context):
+        self.errors += 1
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        wait = connection_record.info.pop("checkout_wait", None)
+        if wait is not None:
+            self.checkout_wait.observe(1000 * wait)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _observe(self, statement: str, duration_ms: float):
+        self.queries.observe(duration_ms)
+        key = normalize_statement(statement)
+        histogram = self.statements.get(key)
+        if histogram is None:
+            # Ограничиваем число различных запросов (динамический SQL не раздувает память)
+            if len(self.statements) >= self.max_statements:
+                key = "<other>"
+                histogram = self.statements.setdefault(key, LatencyHistogram())
+            else:
+                histogram = self.statements[key] = LatencyHistogram()
+        histogram.observe(duration_ms)
+
+        request = _request_queries.get()
+        if request is not None:
+            request.queries += 1
+            request.duration_ms += duration_ms
+
+    def _count_engine(self, engine):
+        for name, attached in self._engines.items():
+            if attached is engine:
+                self.engine_queries[name] = self.engine_queries.get(name, 0) + 1
+                return
+
+    def _log_slow(self, statement: str, parameters, duration_ms: float, executemany: bool):
+        self.slow_total += 1
+        entry = {
+            "duration_ms": round(duration_ms, 2),
+            "statement": statement[:2000],
+            "executemany": executemany,
+            "at": time.time(),
+        }
+        if self.log_parameters:
+            entry["parameters"] = repr(parameters)[:2000]
+        request = _request_queries.get()
+        if request is not None:
+            entry["route"] = request.route
+            if request.path is not None:
+                entry["path"] = request.path
+        self.slow_queries.append(entry)
+        logger.warning("🐢 Slow query", **{key: value for key, value in entry.items() if key != "at"})
+
+    @contextmanager
+    def track_request(self, route: str = UNMATCHED_ROUTE, path: Optional[str] = None):
+        """Подсчет запросов к БД внутри HTTP-запроса (для middleware)
+
+        Метку маршрута middleware заменяет шаблоном после сопоставления;
+        не сопоставленные запросы остаются под UNMATCHED_ROUTE.
+        """
+        request = RequestQueries(route, path)
+        token = _request_queries.set(request)
+        try:
+            yield request
+        finally:
+            _request_queries.reset(token)
+            self._record_request(request)
+
+    def _record_request(self, request: RequestQueries):
+        route = self.requests.setdefault(request.route, {"requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0})
+        route["requests"] += 1
+        route["queries"] += request.queries
+        route["max_queries"] = max(route["max_queries"], request.queries)
+        route["db_ms"] += request.duration_ms
+        if request.queries >= self.request_query_warn:
+            logger.warning("🔁 Many queries in one request (possible N+1)",
+                           route=request.route, queries=request.queries, db_ms=round(request.duration_ms, 1))
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        """Метрики для /metrics/db"""
+        statements = sorted(self.statements.items(), key=lambda item: item[1].total_ms, reverse=True)[:top]
+        pools = {}
+        for name, engine in self._engines.items():
+            pool = engine.pool
+            pools[name] = {
+                "url": engine.url.render_as_string(hide_password=True),
+                "queries": self.engine_queries.get(name, 0),
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            }
+        return {
+            "queries": self.queries.stats(),
+            "errors": self.errors,
+            "statements": [
+                {"statement": statement[:500], "total_ms": round(histogram.total_ms, 2), **histogram.stats()}
+                for statement, histogram in statements
+            ],
+            "slow_queries": {
+                "threshold_ms": self.slow_query_ms,
+                "total": self.slow_total,
+                "recent": list(self.slow_queries),
+            },
+            "pool": {
+                "checkout_wait": self.checkout_wait.stats(),
+                "connects": self.connects,
+                "pools": pools,
+            },
+            "requests": {
+                route: {
+                    **values,
+                    "db_ms": round(values["db_ms"], 2),
+                    "avg_queries": round(values["queries"] / values["requests"], 2),
+                }
+                for route, values in sorted(
+                    self.requests.items(), key=lambda item: item[1]["queries"] / item[1]["requests"], reverse=True
+                )
+            },
+        }
+
+    def reset(self):
+        """Сброс накопленных метрик (пулы остаются подписанными)"""
+        self.queries = LatencyHistogram()
+        self.statements = {}
+        self.engine_queries = {}
+        self.errors = 0
+        self.slow_queries.clear()
+        self.slow_total = 0
+        self.checkout_wait = LatencyHistogram()
+        self.connects = 0
+        self.requests = {}
@@ -0,0 +1,200 @@
+import asyncio
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import text
+from structlog import get_logger
+
+logger = get_logger()
+
+# Таблицы, секционированные по дате игры (RANGE по game_date, одна секция на сезон)
+PARTITIONED_TABLES = ("player_game_stats", "team_game_stats", "odds")
+PARTITION_KEY = "game_date"
+
+# Сезон YYYY-YYYY+1 - игры с 1 июля YYYY по 30 июня YYYY+1
+SEASON_START_MONTH = 7
+
+_BOUND_RE = re.compile(r"FROM \('(\d{4})-")
+_PARTITION_NAME_RE = re.compile(r"^(%s)_(\d{4}_\d{4}|default)$" % "|".join(PARTITIONED_TABLES))
+
+
+def season_start_year(date: datetime) -> int:
+    """Год начала сезона, в который попадает дата"""
+    return date.year if date.month >= SEASON_START_MONTH else date.year - 1
+
+
+def season_bounds(year: int) -> Tuple[datetime, datetime]:
+    """Границы секции сезона [начало, конец)"""
+    return datetime(year, SEASON_START_MONTH, 1), datetime(year + 1, SEASON_START_MONTH, 1)
+
+
+def dates_bounds(dates: Iterable[datetime]) -> Optional[Tuple[datetime, datetime]]:
+    """Границы секций, покрывающих даты (для отсечения секций в запросах)"""
+    years = [season_start_year(date) for date in dates if date is not None]
+    if not years:
+        return None
+    return season_bounds(min(years))[0], season_bounds(max(years))[1]
+
+
+def partition_name(table: str, year: int) -> str:
+    return f"{table}_{year}_{year + 1}"
+
+
+def is_partition_name(name: str) -> bool:
+    """Секция PARTITIONED_TABLES (для исключения из autogenerate Alembic)"""
+    return bool(_PARTITION_NAME_RE.match(name))
+
+
+class PartitionManager:
+    """Секции сезонов для PARTITIONED_TABLES
+
+    Секции создаются заранее (текущий сезон и seasons_ahead следующих) и по
+    требованию перед записью строк сезона без секции. Строки вне секций попадают
+    в секцию DEFAULT и переносятся при создании нужной секции. Старый сезон
+    отключается от таблиц (DETACH) и переносится в архивную схему или удаляется.
+    """
+
+    def __init__(self, database, seasons_ahead: int = 1, archive_schema: str = "archive", lock_timeout_ms: int = 5000):
+        self.database = database
+        self.seasons_ahead = seasons_ahead
+        self.archive_schema = archive_schema
+        self.lock_timeout_ms = lock_timeout_ms
+        # Таблица -> годы сезонов с секциями (None - еще не загружено)
+        self._seasons: Optional[Dict[str, Set[int]]] = None
+        self._lock = asyncio.Lock()
+        self.created = 0
+
+    async def _load(self, conn) -> Dict[str, Set[int]]:
+        """Существующие секции; несекционированные таблицы (БД до миграции 0004) пропускаются"""
+        rows = (await conn.execute(text(
+            "SELECT parent.relname AS parent, pg_get_expr(child.relpartbound, child.oid) AS bound "
+            "FROM pg_class parent "
+            "LEFT JOIN pg_inherits i ON i.inhparent = parent.oid "
+            "LEFT JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relkind = 'p' AND parent.relname = ANY(:tables) "
+            "AND parent.relnamespace = current_schema()::regnamespace"
+        ), {"tables": list(PARTITIONED_TABLES)})).all()
+
+        seasons: Dict[str, Set[int]] = {}
+        for parent, bound in rows:
+            years = seasons.setdefault(parent, set())
+            match = _BOUND_RE.search(bound or "")
+            if match:
+                years.add(int(match.group(1)))
+        for table in set(PARTITIONED_TABLES) - set(seasons):
+            logger.warning("⚠️ Table is not partitioned, run alembic upgrade", table=table)
+        return seasons
+
+    async def _get_seasons(self) -> Dict[str, Set[int]]:
+        if self._seasons is None:
+            async with self.database.engine.connect() as conn:
+                self._seasons = await self._load(conn)
+        return self._seasons
+
+    async def ensure_dates(self, dates: Iterable[datetime]) -> Set[int]:
+        """Секции для сезонов дат (перед записью строк); возвращает годы сезонов"""
+        years = {season_start_year(date) for date in dates if date is not None}
+        await self.ensure_seasons(years)
+        return years
+
+    def existing_partitions(self, table: str, years: Iterable[int]) -> List[str]:
+        known = (self._seasons or {}).get(table, set())
+        return [partition_name(table, year) for year in sorted(years) if year in known]
+
+    async def ensure_seasons(self, years: Iterable[int]):
+        """Создание недостающих секций сезонов
+
+        Ошибка создания не мешает записи: строки попадут в секцию DEFAULT.
+        """
+        years = set(years)
+        seasons = await self._get_seasons()
+        if all(years <= known for known in seasons.values()):
+            return
+
+        async with self._lock:
+            for table, known in seasons.items():
+                for year in sorted(years - known):
+                    try:
+                        await self._create_partition(table, year)
+                        known.add(year)
+                        self.created += 1
+                    except Exception as e:
+                        logger.error("❌ Failed to create partition", partition=partition_name(table, year), error=str(e))
+
+    async def _create_partition(self, table: str, year: int):
+        """Секция сезона через ATTACH: не блокирует запись в таблицу (в отличие от CREATE ... PARTITION OF)"""
+        name = partition_name(table, year)
+        start, end = (bound.isoformat(sep=" ") for bound in season_bounds(year))
+        async with self.database.engine.begin() as conn:
+            await conn.execute(text(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}"))
+            await conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            moved = 0
+            if await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"{table}_default"}):
+                # Строки сезона, записанные до появления секции
+                result = await conn.execute(text(
+                    f"WITH moved AS (DELETE FROM {table}_default WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end "
+                    f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+                ), dict(zip(("start", "end"), season_bounds(year))))
+                moved = result.rowcount
+            await conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+        logger.info("🧱 Partition created", partition=name, moved_from_default=moved)
+
+    async def ensure_upcoming(self):
+        """Секции DEFAULT, текущего и следующих сезонов (при запуске)"""
+        # Таблицы могли быть только что созданы или секционированы миграцией
+        self._seasons = None
+        seasons = await self._get_seasons()
+        async with self.database.engine.begin() as conn:
+            for table in seasons:
+                await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+        current = season_start_year(datetime.utcnow())
+        await self.ensure_seasons(range(current, current + self.seasons_ahead + 1))
+
+    async def list_partitions(self) -> List[Dict[str, Any]]:
+        """Секции с границами, оценкой числа строк и размером"""
+        async with self.database.engine.connect() as conn:
+            rows = (await conn.execute(text(
+                "SELECT parent.relname AS table, child.relname AS partition, "
+                "pg_get_expr(child.relpartbound, child.oid) AS bound, "
+                "greatest(child.reltuples, 0)::bigint AS rows_estimate, "
+                "pg_total_relation_size(child.oid) AS size_bytes "
+                "FROM pg_inherits i "
+                "JOIN pg_class parent ON parent.oid = i.inhparent "
+                "JOIN pg_class child ON child.oid = i.inhrelid "
+                "WHERE parent.relname = ANY(:tables) "
+                "AND parent.relnamespace = current_schema()::regnamespace "
+                "ORDER BY parent.relname, child.relname"
+            ), {"tables": list(PARTITIONED_TABLES)})).all()
+        return [row._asdict() for row in rows]
+
+    async def detach_season(self, year: int, drop: bool = False) -> Dict[str, Any]:
+        """Отключение секций сезона от всех таблиц: перенос в архивную схему или удаление
+
+        Операция над метаданными вместо DELETE строк сезона. Текущий и будущие
+        сезоны не отключаются.
+        """
+        if year >= season_start_year(datetime.utcnow()):
+            raise ValueError(f"Season {year}-{year + 1} is current or upcoming")
+
+        seasons = await self._get_seasons()
+        detached = []
+        async with self._lock, self.database.engine.begin() as conn:
+            await conn.execute(text(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}"))
+            if not drop:
+                await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {self.archive_schema}"))
+            for table, known in seasons.items():
+                if year not in known:
+                    continue
+                name = partition_name(table, year)
+                await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                if drop:
+                    await conn.execute(text(f"DROP TABLE {name}"))
+                else:
+                    await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {self.archive_schema}"))
+                detached.append(name)
+        for known in seasons.values():
+            known.discard(year)
+
+        action = "dropped" if drop else f"moved to {self.archive_schema}"
+        logger.info("🗄️ Season partitions detached", season=f"{year}-{year + 1}", partitions=detached, action=action)
+        return {"season": f"{year}-{year + 1}", "partitions": detached, "action": action}
@@ -1,8 +1,11 @@
 from .league_repository import LeagueRepository, SeasonRepository
-from .team_repository import TeamRepository, TeamSeasonStatsRepository
+from .team_repository import TeamRepository, TeamSeasonStatsRepository, TeamGameStatsRepository
 from .game_repository import GameRepository
 from .player_repository import PlayerRepository, PlayerGameStatsRepository
 from .alias_repository import TeamAliasRepository, LeagueMappingRepository
+from .watermark_repository import WatermarkRepository
+from .dead_letter_repository import DeadLetterRepository
+from .odds_repository import OddsRepository
 
 class AsyncRepositoryFacade:
     """Асинхронный фасад для работы со всеми репозиториями"""
@@ -12,11 +15,15 @@ class AsyncRepositoryFacade:
         self.seasons = SeasonRepository()
         self.teams = TeamRepository()
         self.team_stats = TeamSeasonStatsRepository()
+        self.team_game_stats = TeamGameStatsRepository()
         self.games = GameRepository()
         self.players = PlayerRepository()
         self.player_stats = PlayerGameStatsRepository()
         self.team_aliases = TeamAliasRepository()  
         self.league_mappings = LeagueMappingRepository()  
+        self.watermarks = WatermarkRepository()
+        self.dead_letters = DeadLetterRepository()
+        self.odds = OddsRepository()
 
 # Создаем глобальный экземпляр фасада
 repositories = AsyncRepositoryFacade()
\ No newline at end of file
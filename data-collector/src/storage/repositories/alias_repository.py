@@ -9,7 +9,7 @@ class TeamAliasRepository(AsyncBaseRepository[TeamAlias]):
 
     async def find_by_betcity_name(self, betcity_name: str) -> Optional[TeamAlias]:
         """Поиск алиаса по названию в Betcity"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(TeamAlias).filter(TeamAlias.betcity_name.ilike(betcity_name))
             )
@@ -17,12 +17,18 @@ class TeamAliasRepository(AsyncBaseRepository[TeamAlias]):
 
     async def find_by_team_id(self, team_id: int) -> List[TeamAlias]:
         """Поиск всех алиасов команды"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(TeamAlias).filter(TeamAlias.team_id == team_id)
             )
             return result.scalars().all()
 
+    async def get_alias_map(self) -> Dict[str, int]:
+        """Все алиасы: название у букмекера (в нижнем регистре) -> ID команды"""
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(select(TeamAlias.betcity_name, TeamAlias.team_id))
+            return {name.strip().lower(): team_id for name, team_id in result.all()}
+
     async def bulk_create_aliases(self, aliases_data: List[Dict]) -> List[TeamAlias]:
         """Массовое создание алиасов"""
         aliases = []
@@ -41,7 +47,7 @@ class LeagueMappingRepository(AsyncBaseRepository[LeagueMapping]):
 
     async def find_by_betcity_id(self, betcity_league_id: int) -> Optional[LeagueMapping]:
         """Поиск маппинга по ID лиги в Betcity"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(LeagueMapping).filter(LeagueMapping.betcity_league_id == betcity_league_id)
             )
@@ -49,8 +55,14 @@ class LeagueMappingRepository(AsyncBaseRepository[LeagueMapping]):
 
     async def find_by_league_id(self, league_id: int) -> Optional[LeagueMapping]:
         """Поиск маппинга по ID нашей лиги"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(LeagueMapping).filter(LeagueMapping.league_id == league_id)
             )
-            return result.scalar_one_or_none()
\ No newline at end of file
+            return result.scalar_one_or_none()
+
+    async def get_mapping_map(self) -> Dict[int, int]:
+        """Все маппинги: ID лиги у букмекера -> ID нашей лиги"""
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(select(LeagueMapping.betcity_league_id, LeagueMapping.league_id))
+            return {betcity_league_id: league_id for betcity_league_id, league_id in result.all()}
@@ -1,23 +1,33 @@
-from typing import List, Optional, TypeVar, Generic, Type, Dict, Any
-from sqlalchemy import select
+from datetime import datetime
+from typing import List, Optional, TypeVar, Generic, Type, Dict, Any, Sequence, Tuple
+from sqlalchemy import select, func, or_, and_, text, update, delete, values, column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from storage.database import Base, db_manager
+from storage.database import Base, Game, db_manager
+from storage.partitions import dates_bounds
+from storage.unit_of_work import current_unit_of_work
 
 ModelType = TypeVar("ModelType", bound=Base)
 
+# Лимит asyncpg на число параметров в одном запросе
+MAX_QUERY_PARAMS = 32767
+
 class AsyncBaseRepository(Generic[ModelType]):
+    # Колонки уникального ключа для bulk_upsert (ON CONFLICT)
+    upsert_index_elements: Sequence[str] = ("id",)
+
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
     async def get_by_id(self, id: int) -> Optional[ModelType]:
         """Получение записи по ID"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(select(self.model).filter(self.model.id == id))
             return result.scalar_one_or_none()
 
     async def get_all(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
         """Получение всех записей с пагинацией"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(self.model).offset(skip).limit(limit)
             )
@@ -81,4 +91,278 @@ class AsyncBaseRepository(Generic[ModelType]):
             session.add(obj)
             await session.commit()
             await session.refresh(obj)
-            return obj, True
\ No newline at end of file
+            return obj, True
+
+    async def bulk_upsert(
+        self,
+        rows: List[Dict[str, Any]],
+        index_elements: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+        skip_unchanged: bool = False
+    ) -> int:
+        """Массовая вставка/обновление (INSERT ... ON CONFLICT DO UPDATE) пачками в одной транзакции
+
+        skip_unchanged - обновлять только строки, у которых изменилась хотя бы одна колонка
+        (возвращаемое число тогда не включает неизмененные строки)
+        """
+        if not rows:
+            return 0
+
+        index_elements = list(index_elements or self.upsert_index_elements)
+
+        # Повтор ключа внутри одного INSERT недопустим для ON CONFLICT DO UPDATE - оставляем последнюю версию
+        rows_by_key = {tuple(row[column] for column in index_elements): row for row in rows}
+        # Единый порядок ключей исключает взаимные блокировки параллельных upsert с пересекающимися строками
+        unique_rows = [rows_by_key[key] for key in sorted(rows_by_key)]
+
+        columns = list(unique_rows[0].keys())
+        if update_columns is None:
+            update_columns = [column for column in columns if column not in index_elements]
+        batch_size = max(1, min(batch_size, MAX_QUERY_PARAMS // len(columns)))
+
+        affected = 0
+        async with db_manager.get_async_session() as session:
+            for start in range(0, len(unique_rows), batch_size):
+                stmt = pg_insert(self.model).values(unique_rows[start:start + batch_size])
+                if update_columns:
+                    set_ = {column: stmt.excluded[column] for column in update_columns}
+                    if "updated_at" in self.model.__table__.c and "updated_at" not in set_:
+                        set_["updated_at"] = func.now()
+                    where = None
+                    if skip_unchanged:
+                        where = or_(*(
+                            self.model.__table__.c[column].is_distinct_from(stmt.excluded[column])
+                            for column in update_columns
+                        ))
+                    stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_, where=where)
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+                result = await session.execute(stmt)
+                affected += result.rowcount
+            await session.commit()
+        return affected
+
+class GamePartitionedRepository(AsyncBaseRepository[ModelType]):
+    """Таблица, секционированная по дате игры (game_date, секция на сезон)
+
+    Строки получают game_date из games, секции сезонов создаются перед записью,
+    запросы ограничиваются секциями нужных сезонов.
+    """
+
+    async def get_game_dates(self, session, game_ids: Sequence[int]) -> Dict[int, datetime]:
+        result = await session.execute(select(Game.id, Game.date).filter(Game.id.in_(list(set(game_ids)))))
+        return {game_id: date for game_id, date in result.all()}
+
+    async def get_games_bounds(self, session, game_ids: Sequence[int]) -> Optional[Tuple[datetime, datetime]]:
+        """Границы секций сезонов игр (None - игр нет)"""
+        return dates_bounds((await self.get_game_dates(session, game_ids)).values())
+
+    async def get_season_bounds(self, session, season_id: int) -> Optional[Tuple[datetime, datetime]]:
+        """Границы секций сезона по датам его игр (None - игр нет)"""
+        result = await session.execute(
+            select(func.min(Game.date), func.max(Game.date)).filter(Game.season_id == season_id)
+        )
+        return dates_bounds(result.one())
+
+    def game_onclause(self):
+        """Соединение с games и по дате игры - секции отсекаются во время выполнения"""
+        return and_(self.model.game_id == Game.id, self.model.game_date == Game.date)
+
+    def in_bounds(self, bounds: Tuple[datetime, datetime]):
+        """Условие на ключ секционирования (отсечение секций при планировании)"""
+        return self.model.game_date >= bounds[0], self.model.game_date < bounds[1]
+
+    async def bulk_upsert(
+        self,
+        rows: List[Dict[str, Any]],
+        index_elements: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None,
+        batch_size: int = 1000,
+        skip_unchanged: bool = False
+    ) -> int:
+        """bulk_upsert с заполнением game_date и созданием секций сезонов строк"""
+        if not rows:
+            return 0
+
+        rows = await self._fill_game_dates(rows)
+        await self.prepare_partitions(row['game_date'] for row in rows)
+        await self.delete_moved_rows(rows, index_elements)
+        return await super().bulk_upsert(rows, index_elements, update_columns, batch_size, skip_unchanged)
+
+    async def copy_upsert(
+        self,
+        rows: List[Dict[str, Any]],
+        index_elements: Optional[Sequence[str]] = None,
+        update_columns: Optional[Sequence[str]] = None,
+        skip_unchanged: bool = False
+    ) -> int:
+        """bulk_upsert для больших пакетов: COPY во временную таблицу и слияние INSERT ... SELECT ... ON CONFLICT
+
+        Строки идут бинарным COPY asyncpg вместо VALUES с параметрами; ключи,
+        обновляемые колонки и skip_unchanged - как у bulk_upsert.
+        """
+        if not rows:
+            return 0
+
+        rows = await self._fill_game_dates(rows)
+        await self.prepare_partitions(row['game_date'] for row in rows)
+
+        table = self.model.__table__
+        index_elements = list(index_elements or self.upsert_index_elements)
+        columns = self.copy_columns()
+        if update_columns is None:
+            update_columns = [column for column in rows[0] if column in columns and column not in index_elements]
+
+        # Повтор ключа недопустим для ON CONFLICT DO UPDATE - оставляем последнюю версию,
+        # ключи по порядку - без взаимных блокировок параллельных загрузок
+        rows_by_key = {tuple(row[column] for column in index_elements): row for row in rows}
+        # Колонки, которых нет в строках, получают значения по умолчанию модели (как при INSERT через SQLAlchemy)
+        defaults = {
+            column.name: column.default.arg for column in table.columns
+            if column.default is not None and column.default.is_scalar
+        }
+        records = [
+            tuple(row.get(column, defaults.get(column)) for column in columns)
+            for row in (rows_by_key[key] for key in sorted(rows_by_key))
+        ]
+
+        staging = f"{table.name}_staging"
+        column_list = ", ".join(columns)
+        set_ = [f"{column} = EXCLUDED.{column}" for column in update_columns]
+        if "updated_at" in table.c and "updated_at" not in update_columns:
+            set_.append("updated_at = now()")
+        if set_:
+            conflict = f"DO UPDATE SET {', '.join(set_)}"
+            if skip_unchanged:
+                conflict += (
+                    f" WHERE ({', '.join(f'{table.name}.{column}' for column in update_columns)}) "
+                    f"IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in update_columns)})"
+                )
+        else:
+            conflict = "DO NOTHING"
+
+        async with db_manager.get_async_session() as session:
+            # Временная таблица остается в соединении пула между вызовами, строки
+            # очищаются при commit (TRUNCATE без удаленных версий строк)
+            await session.execute(text(
+                f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS "
+                f"SELECT {column_list} FROM {table.name} WITH NO DATA"
+            ))
+            conn = await session.connection()
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(staging, records=records, columns=columns)
+            entity_columns = self.entity_columns(index_elements)
+            if entity_columns:
+                # Строки тех же ключей со старой датой (игра перенесена) - иначе ключ задвоится
+                await session.execute(text(
+                    f"DELETE FROM {table.name} t USING {staging} s WHERE "
+                    + " AND ".join(f"t.{column} = s.{column}" for column in entity_columns)
+                    + " AND t.game_date <> s.game_date"
+                ))
+            # Строки забираются из staging тем же оператором: повторная загрузка в транзакции
+            # unit of work не сольет их второй раз
+            result = await session.execute(text(
+                f"WITH batch AS (DELETE FROM {staging} RETURNING {column_list}) "
+                f"INSERT INTO {table.name} ({column_list}) "
+                f"SELECT {column_list} FROM batch ORDER BY {', '.join(index_elements)} "
+                f"ON CONFLICT ({', '.join(index_elements)}) {conflict}"
+            ))
+            affected = result.rowcount
+            await session.commit()
+        return affected
+
+    def entity_columns(self, index_elements: Optional[Sequence[str]] = None) -> List[str]:
+        """Ключ строки без game_date (пусто - ключ upsert не включает дату игры)"""
+        index_elements = list(index_elements or self.upsert_index_elements)
+        if "game_date" not in index_elements:
+            return []
+        return [column for column in index_elements if column != "game_date"]
+
+    def _values(self, columns: Sequence[str], rows: Sequence[Tuple]):
+        table = self.model.__table__
+        return values(*(column(name, table.c[name].type) for name in columns), name="v").data(list(rows))
+
+    async def delete_moved_rows(self, rows: List[Dict[str, Any]], index_elements: Optional[Sequence[str]] = None) -> int:
+        """Удаление строк тех же ключей с другой game_date (записанных до переноса игры)"""
+        entity_columns = self.entity_columns(index_elements)
+        if not entity_columns:
+            return 0
+        columns = entity_columns + ["game_date"]
+        keys = sorted({tuple(row[column] for column in columns) for row in rows if row.get('game_date') is not None})
+        if not keys:
+            return 0
+
+        table = self.model.__table__
+        deleted = 0
+        batch_size = MAX_QUERY_PARAMS // len(columns)
+        async with db_manager.get_async_session() as session:
+            for start in range(0, len(keys), batch_size):
+                v = self._values(columns, keys[start:start + batch_size])
+                result = await session.execute(
+                    delete(table).where(
+                        *(table.c[column] == v.c[column] for column in entity_columns),
+                        table.c.game_date != v.c.game_date
+                    )
+                )
+                deleted += result.rowcount
+            await session.commit()
+        return deleted
+
+    async def move_game_dates(self, dates: Dict[int, datetime]) -> int:
+        """Перенос строк перенесенных игр на новую дату: {game_id: games.date}
+
+        UPDATE ключа секционирования перемещает строку в секцию нового сезона.
+        Строки, ключ которых на новой дате уже есть (записанные после переноса),
+        удаляются. Возвращает число перенесенных строк.
+        """
+        if not dates:
+            return 0
+        await self.prepare_partitions(dates.values())
+
+        table = self.model.__table__
+        current = table.alias("current_rows")
+        entity_columns = self.entity_columns()
+        items = sorted(dates.items())
+        moved = 0
+        async with db_manager.get_async_session() as session:
+            for start in range(0, len(items), MAX_QUERY_PARAMS // 2):
+                v = self._values(["game_id", "game_date"], items[start:start + MAX_QUERY_PARAMS // 2])
+                stale = (table.c.game_id == v.c.game_id, table.c.game_date != v.c.game_date)
+                if entity_columns:
+                    await session.execute(
+                        delete(table).where(
+                            *stale,
+                            *(current.c[column] == table.c[column] for column in entity_columns),
+                            current.c.game_date == v.c.game_date
+                        )
+                    )
+                result = await session.execute(update(table).where(*stale).values(game_date=v.c.game_date))
+                moved += result.rowcount
+            await session.commit()
+        return moved
+
+    def copy_columns(self) -> List[str]:
+        """Колонки для COPY: все, кроме id и заполняемых сервером (created_at, updated_at)"""
+        return [column.name for column in self.model.__table__.columns if column.name != "id" and column.server_default is None]
+
+    async def _fill_game_dates(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        missing = [row['game_id'] for row in rows if row.get('game_date') is None]
+        if not missing:
+            return rows
+        async with db_manager.get_async_session() as session:
+            dates = await self.get_game_dates(session, missing)
+        # Строки неизвестных игр остаются без даты и не пройдут ограничения, как и раньше по внешнему ключу
+        return [row if row.get('game_date') is not None else {**row, 'game_date': dates.get(row['game_id'])} for row in rows]
+
+    async def prepare_partitions(self, dates):
+        """Секции сезонов перед записью строк с этими датами"""
+        years = await db_manager.partitions.ensure_dates(dates)
+        if current_unit_of_work.get() is None:
+            return
+        # Транзакция unit of work, обращавшаяся к таблице до создания секции, направила бы
+        # строки по старому списку секций (в DEFAULT - ошибка ограничения секции).
+        # Блокировка секций обрабатывает накопленные инвалидации каталога.
+        async with db_manager.get_async_session() as session:
+            for name in db_manager.partitions.existing_partitions(self.model.__tablename__, years):
+                await session.execute(text(f"SELECT 1 FROM {name} LIMIT 0"))
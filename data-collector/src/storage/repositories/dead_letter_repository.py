@@ -0,0 +1,99 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from storage.database import DeadLetter, db_manager
+from storage.repositories.async_base import AsyncBaseRepository
+
+class DeadLetterRepository(AsyncBaseRepository[DeadLetter]):
+    upsert_index_elements = ("kind", "item_id")
+
+    PENDING = "pending"
+    REPLAYED = "replayed"
+
+    def __init__(self):
+        super().__init__(DeadLetter)
+
+    async def record(self, kind: str, item_id: int, stage: str, payload: Dict[str, Any], error: Exception) -> DeadLetter:
+        """Запись неудавшегося элемента; повторная ошибка увеличивает attempts и обновляет данные"""
+        now = datetime.utcnow()
+        values = {
+            "stage": stage,
+            "status": self.PENDING,
+            "payload": payload,
+            "error_type": type(error).__name__,
+            "error": str(error),
+            "last_failed_at": now,
+        }
+        stmt = pg_insert(DeadLetter).values(kind=kind, item_id=item_id, attempts=1, first_failed_at=now, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(self.upsert_index_elements),
+            set_={**values, "attempts": DeadLetter.attempts + 1, "replayed_at": None}
+        ).returning(DeadLetter)
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(stmt)
+            dead_letter = result.scalar_one()
+            await session.commit()
+            return dead_letter
+
+    async def get_dead_letters(
+        self,
+        kind: Optional[str] = None,
+        status: Optional[str] = PENDING,
+        limit: int = 100
+    ) -> List[DeadLetter]:
+        """Элементы очереди (по умолчанию - ожидающие повтора, старые первыми)"""
+        query = select(DeadLetter).order_by(DeadLetter.first_failed_at, DeadLetter.id).limit(limit)
+        if kind is not None:
+            query = query.where(DeadLetter.kind == kind)
+        if status is not None:
+            query = query.where(DeadLetter.status == status)
+        async with db_manager.get_read_session() as session:
+            result = await session.execute(query)
+            return result.scalars().all()
+
+    async def get_pending_payloads(self, kind: str, item_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Данные ожидающих повтора элементов по ID (чтобы дополнить их, а не заменить)"""
+        if not item_ids:
+            return {}
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(DeadLetter.item_id, DeadLetter.payload).where(
+                    DeadLetter.kind == kind, DeadLetter.item_id.in_(item_ids), DeadLetter.status == self.PENDING
+                )
+            )
+            return {item_id: payload for item_id, payload in result.all()}
+
+    async def get_counts(self) -> Dict[str, Dict[str, int]]:
+        """Количество элементов по типу и статусу"""
+        async with db_manager.get_read_session() as session:
+            result = await session.execute(
+                select(DeadLetter.kind, DeadLetter.status, func.count()).group_by(DeadLetter.kind, DeadLetter.status)
+            )
+            counts: Dict[str, Dict[str, int]] = {}
+            for kind, status, count in result:
+                counts.setdefault(kind, {})[status] = count
+            return counts
+
+    async def mark_replayed(self, ids: List[int], replay_started_at: datetime) -> int:
+        """Отметка повторенных элементов; упавшие снова (last_failed_at после начала повтора) остаются в очереди"""
+        if not ids:
+            return 0
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                update(DeadLetter)
+                .where(DeadLetter.id.in_(ids), DeadLetter.last_failed_at < replay_started_at)
+                .values(status=self.REPLAYED, replayed_at=datetime.utcnow())
+            )
+            await session.commit()
+            return result.rowcount
+
+    async def purge_replayed(self, older_than: Optional[datetime] = None) -> int:
+        """Удаление успешно повторенных элементов"""
+        query = delete(DeadLetter).where(DeadLetter.status == self.REPLAYED)
+        if older_than is not None:
+            query = query.where(DeadLetter.replayed_at < older_than)
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(query)
+            await session.commit()
+            return result.rowcount
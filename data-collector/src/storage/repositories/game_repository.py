@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, tuple_
 from storage.database import Game, Team, League, Odds, db_manager
 from storage.repositories.async_base import AsyncBaseRepository
 
@@ -12,9 +12,70 @@ class GameRepository(AsyncBaseRepository[Game]):
         """Получение игры по API ID"""
         return await self.get_by_id(api_id)
 
+    async def get_content_hashes(self, game_ids: Sequence[int]) -> Dict[int, Optional[str]]:
+        """Хеши сохраненных игр по ID (для пропуска неизмененных)"""
+        if not game_ids:
+            return {}
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(Game.id, Game.content_hash).filter(Game.id.in_(list(game_ids)))
+            )
+            return {game_id: content_hash for game_id, content_hash in result.all()}
+
+    async def get_game_snapshots(self, game_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        """Хеш, дата, статус и счет сохраненных игр по ID (пропуск неизмененных, переносы, события переходов)"""
+        if not game_ids:
+            return {}
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(Game.id, Game.content_hash, Game.date, Game.status, Game.home_score_total, Game.away_score_total)
+                .filter(Game.id.in_(list(game_ids)))
+            )
+            return {row.id: row._asdict() for row in result.all()}
+
+    async def get_game_dates(self, game_ids: Sequence[int]) -> Dict[int, datetime]:
+        """Текущие даты игр по ID (ключ секционирования статистики и коэффициентов; игры переносят)"""
+        if not game_ids:
+            return {}
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(select(Game.id, Game.date).filter(Game.id.in_(list(game_ids))))
+            return {game_id: date for game_id, date in result.all()}
+
+    async def get_games_after(
+        self,
+        season_id: int,
+        position: Optional[Tuple[datetime, int]] = None
+    ) -> List[Tuple[int, datetime, str]]:
+        """Игры сезона после позиции водяного знака (дата, id) по порядку: (id, дата, статус)"""
+        query = select(Game.id, Game.date, Game.status).filter(Game.season_id == season_id)
+        if position is not None:
+            query = query.filter(tuple_(Game.date, Game.id) > tuple_(*position))
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(query.order_by(Game.date, Game.id))
+            return [tuple(row) for row in result.all()]
+
+    async def find_games_by_teams(
+        self,
+        team_pairs: Sequence[Tuple[int, int]],
+        start: datetime,
+        end: datetime
+    ) -> List[Tuple[int, int, int, int, datetime]]:
+        """Игры пар команд (хозяева, гости) в окне дат: (id, league_id, home_team_id, away_team_id, date)"""
+        if not team_pairs:
+            return []
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(Game.id, Game.league_id, Game.home_team_id, Game.away_team_id, Game.date).filter(
+                    tuple_(Game.home_team_id, Game.away_team_id).in_(list(team_pairs)),
+                    Game.date >= start,
+                    Game.date <= end
+                )
+            )
+            return [tuple(row) for row in result.all()]
+
     async def get_games_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Game]:
         """Получение игр за период дат"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Game).filter(
                     Game.date >= start_date,
@@ -25,7 +86,7 @@ class GameRepository(AsyncBaseRepository[Game]):
 
     async def get_games_by_league_and_season(self, league_id: int, season_id: int) -> List[Game]:
         """Получение игр лиги за сезон"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Game).filter(
                     Game.league_id == league_id,
@@ -43,7 +104,7 @@ class GameRepository(AsyncBaseRepository[Game]):
         if season_id:
             query = query.filter(Game.season_id == season_id)
         
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(query)
             return result.scalars().all()
 
@@ -59,14 +120,14 @@ class GameRepository(AsyncBaseRepository[Game]):
         if season_id:
             query = query.filter(Game.season_id == season_id)
         
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(query.order_by(Game.date.desc()))
             return result.scalars().all()
 
     async def get_live_games(self) -> List[Game]:
         """Получение текущих лайв-игр"""
         live_statuses = ["Q1", "Q2", "Q3", "Q4", "OT", "BT", "HT"]
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Game).filter(Game.status.in_(live_statuses))
             )
@@ -76,7 +137,7 @@ class GameRepository(AsyncBaseRepository[Game]):
         """Получение предстоящих игр"""
         now = datetime.now()
         future = now + timedelta(hours=hours)
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Game).filter(
                     Game.date >= now,
@@ -86,10 +147,21 @@ class GameRepository(AsyncBaseRepository[Game]):
             )
             return result.scalars().all()
 
+    async def get_games_in_window(self, start: datetime, end: datetime) -> List[Game]:
+        """Игры с началом в окне [start, end] в любом статусе (для планировщика опроса)"""
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(Game).filter(
+                    Game.date >= start,
+                    Game.date <= end
+                ).order_by(Game.date)
+            )
+            return result.scalars().all()
+
     async def get_recent_finished_games(self, days: int = 7) -> List[Game]:
         """Получение недавно завершенных игр"""
         since = datetime.now() - timedelta(days=days)
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Game).filter(
                     Game.date >= since,
@@ -100,7 +172,7 @@ class GameRepository(AsyncBaseRepository[Game]):
 
     async def get_games_with_odds(self, bookmaker: str) -> List[Game]:
         """Получение игр с коэффициентами от указанного букмекера"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Game).join(Odds).filter(Odds.bookmaker == bookmaker)
             )
@@ -1,5 +1,5 @@
-from typing import List, Optional
-from sqlalchemy import select
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, tuple_
 from storage.database import League, Season, db_manager
 from storage.repositories.async_base import AsyncBaseRepository
 
@@ -13,7 +13,7 @@ class LeagueRepository(AsyncBaseRepository[League]):
 
     async def get_leagues_with_stats_coverage(self, season: str) -> List[League]:
         """Получение лиг с coverage статистики для указанного сезона"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(League).join(Season).filter(
                     Season.season == season,
@@ -24,12 +24,14 @@ class LeagueRepository(AsyncBaseRepository[League]):
             return result.scalars().all()
 
 class SeasonRepository(AsyncBaseRepository[Season]):
+    upsert_index_elements = ("league_id", "season")
+
     def __init__(self):
         super().__init__(Season)
 
     async def get_by_league_and_season(self, league_id: int, season: str) -> Optional[Season]:
         """Получение сезона по лиге и названию сезона"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Season).filter(
                     Season.league_id == league_id,
@@ -40,8 +42,21 @@ class SeasonRepository(AsyncBaseRepository[Season]):
 
     async def get_seasons_by_league(self, league_id: int) -> List[Season]:
         """Получение всех сезонов лиги"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Season).filter(Season.league_id == league_id)
             )
-            return result.scalars().all()
\ No newline at end of file
+            return result.scalars().all()
+
+    async def get_ids_by_keys(self, keys: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], int]:
+        """ID сезонов по парам (лига, сезон)"""
+        keys = list(set(keys))
+        if not keys:
+            return {}
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(Season.league_id, Season.season, Season.id).filter(
+                    tuple_(Season.league_id, Season.season).in_(keys)
+                )
+            )
+            return {(league_id, season): season_id for league_id, season, season_id in result.all()}
\ No newline at end of file
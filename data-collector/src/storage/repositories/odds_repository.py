@@ -0,0 +1,63 @@
+from typing import Any, Dict, List, Sequence, Tuple
+from sqlalchemy import select
+from storage.database import Odds, db_manager
+from storage.repositories.async_base import GamePartitionedRepository
+
+# Колонки odds, которые пишет COPY (id и updated_at - значения по умолчанию)
+ODDS_COPY_COLUMNS = (
+    "game_id", "game_date", "bookmaker",
+    "odds_home", "odds_away", "odds_draw",
+    "total_over", "total_under", "total_points",
+    "handicap_home", "handicap_away", "handicap_value",
+    "timestamp",
+)
+
+class OddsRepository(GamePartitionedRepository[Odds]):
+    def __init__(self):
+        super().__init__(Odds)
+
+    async def copy_snapshots(self, records: Sequence[Tuple[Any, ...]]) -> int:
+        """Запись снимков через asyncpg COPY (кортежи в порядке ODDS_COPY_COLUMNS)"""
+        if not records:
+            return 0
+        await self.prepare_partitions(record[1] for record in records)
+        async with db_manager.get_async_session() as session:
+            conn = await session.connection()
+            # COPY идет мимо SQLAlchemy напрямую через соединение asyncpg сессии
+            # (внутри unit of work - в его транзакции)
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                Odds.__tablename__, records=records, columns=list(ODDS_COPY_COLUMNS)
+            )
+            await session.commit()
+        return len(records)
+
+    async def get_latest_prices(self, game_ids: Sequence[int]) -> Dict[Tuple[int, str], Dict[str, Any]]:
+        """Последний снимок по (игра, букмекер) - для сравнения с новыми ценами"""
+        if not game_ids:
+            return {}
+        columns = [getattr(Odds, column) for column in ODDS_COPY_COLUMNS]
+        async with db_manager.get_async_session() as session:
+            # Границы по сезонам игр, а не по точной дате: перенос игры внутри сезона не теряет снимки
+            bounds = await self.get_games_bounds(session, game_ids)
+            if bounds is None:
+                return {}
+            result = await session.execute(
+                select(*columns)
+                .filter(Odds.game_id.in_(list(game_ids)), *self.in_bounds(bounds))
+                .order_by(Odds.game_id, Odds.bookmaker, Odds.timestamp.desc(), Odds.id.desc())
+                .distinct(Odds.game_id, Odds.bookmaker)
+            )
+            return {(row.game_id, row.bookmaker): row._asdict() for row in result.all()}
+
+    async def get_game_odds(self, game_id: int, bookmaker: str = None, limit: int = 500) -> List[Odds]:
+        """История коэффициентов игры (свежие первыми)"""
+        query = select(Odds).filter(Odds.game_id == game_id).order_by(Odds.timestamp.desc()).limit(limit)
+        if bookmaker is not None:
+            query = query.filter(Odds.bookmaker == bookmaker)
+        async with db_manager.get_read_session() as session:
+            bounds = await self.get_games_bounds(session, [game_id])
+            if bounds is None:
+                return []
+            result = await session.execute(query.filter(*self.in_bounds(bounds)))
+            return result.scalars().all()
@@ -1,7 +1,7 @@
 from typing import List, Optional
 from sqlalchemy import select, func
 from storage.database import Player, PlayerGameStats, Team, Game, db_manager
-from storage.repositories.async_base import AsyncBaseRepository
+from storage.repositories.async_base import AsyncBaseRepository, GamePartitionedRepository
 
 class PlayerRepository(AsyncBaseRepository[Player]):
     def __init__(self):
@@ -13,7 +13,7 @@ class PlayerRepository(AsyncBaseRepository[Player]):
 
     async def get_players_by_team(self, team_id: int) -> List[Player]:
         """Получение игроков команды"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Player).join(PlayerGameStats).filter(
                     PlayerGameStats.team_id == team_id
@@ -23,52 +23,61 @@ class PlayerRepository(AsyncBaseRepository[Player]):
 
     async def search_players(self, search_term: str) -> List[Player]:
         """Поиск игроков по имени"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Player).filter(Player.name.ilike(f"%{search_term}%"))
             )
             return result.scalars().all()
 
-class PlayerGameStatsRepository(AsyncBaseRepository[PlayerGameStats]):
+class PlayerGameStatsRepository(GamePartitionedRepository[PlayerGameStats]):
+    upsert_index_elements = ("game_id", "player_id", "game_date")
+
     def __init__(self):
         super().__init__(PlayerGameStats)
 
     async def get_player_game_stats(self, player_id: int, game_id: int) -> Optional[PlayerGameStats]:
         """Получение статистики игрока в конкретной игре"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
-                select(PlayerGameStats).filter(
+                select(PlayerGameStats).join(Game, self.game_onclause()).filter(
                     PlayerGameStats.player_id == player_id,
-                    PlayerGameStats.game_id == game_id
+                    Game.id == game_id
                 )
             )
             return result.scalar_one_or_none()
 
     async def get_player_season_stats(self, player_id: int, season_id: int) -> List[PlayerGameStats]:
         """Получение статистики игрока за сезон"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
+            bounds = await self.get_season_bounds(session, season_id)
+            if bounds is None:
+                return []
             result = await session.execute(
-                select(PlayerGameStats).join(Game).filter(
+                select(PlayerGameStats).join(Game, PlayerGameStats.game_id == Game.id).filter(
                     PlayerGameStats.player_id == player_id,
-                    Game.season_id == season_id
+                    Game.season_id == season_id,
+                    *self.in_bounds(bounds)
                 )
             )
             return result.scalars().all()
 
     async def get_team_game_stats(self, team_id: int, game_id: int) -> List[PlayerGameStats]:
         """Получение статистики всех игроков команды в игре"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
-                select(PlayerGameStats).filter(
+                select(PlayerGameStats).join(Game, self.game_onclause()).filter(
                     PlayerGameStats.team_id == team_id,
-                    PlayerGameStats.game_id == game_id
+                    Game.id == game_id
                 )
             )
             return result.scalars().all()
 
     async def get_top_scorers(self, season_id: int, limit: int = 10) -> List[dict]:
         """Получение лучших бомбардиров сезона"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
+            bounds = await self.get_season_bounds(session, season_id)
+            if bounds is None:
+                return []
             result = await session.execute(
                 select(
                     PlayerGameStats.player_id,
@@ -77,8 +86,18 @@ class PlayerGameStatsRepository(AsyncBaseRepository[PlayerGameStats]):
                     Team.name.label('team_name'),
                     func.sum(PlayerGameStats.points).label('total_points'),
                     func.count(PlayerGameStats.game_id).label('games_played')
-                ).join(Player).join(Team).join(Game).filter(
-                    Game.season_id == season_id
+                ).select_from(PlayerGameStats).join(
+                    Player, PlayerGameStats.player_id == Player.id
+                ).join(
+                    Team, PlayerGameStats.team_id == Team.id
+                ).join(
+                    # У games два внешних ключа на teams - условие соединения явно
+                    # (секции отсекает фильтр по границам сезона; равенство дат здесь
+                    # только портит оценку числа строк)
+                    Game, PlayerGameStats.game_id == Game.id
+                ).filter(
+                    Game.season_id == season_id,
+                    *self.in_bounds(bounds)
                 ).group_by(
                     PlayerGameStats.player_id,
                     Player.name,
@@ -1,7 +1,34 @@
-from typing import List, Optional
-from sqlalchemy import select, func
-from storage.database import Team, TeamSeasonStats, db_manager
-from storage.repositories.async_base import AsyncBaseRepository
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Float, and_, cast, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from storage.database import Game, Team, TeamGameStats, TeamSeasonStats, TeamSeasonStatsGame, db_manager
+from storage.repositories.async_base import MAX_QUERY_PARAMS, AsyncBaseRepository, GamePartitionedRepository
+
+# Счетчики сезонной статистики - складываются при приращениях
+SEASON_COUNTER_COLUMNS = (
+    "games_played", "games_played_home", "games_played_away",
+    "wins_total", "wins_home", "wins_away",
+    "losses_total", "losses_home", "losses_away",
+    "points_for_total", "points_against_total",
+)
+# Учтенная версия игры (team_season_stats_games)
+COUNTED_GAME_COLUMNS = ("season_id", "league_id", "home_team_id", "away_team_id", "home_score", "away_score")
+# Производные колонки: (числитель, знаменатель) из счетчиков
+SEASON_DERIVED_COLUMNS = {
+    "win_percentage_total": ("wins_total", "games_played"),
+    "win_percentage_home": ("wins_home", "games_played_home"),
+    "win_percentage_away": ("wins_away", "games_played_away"),
+    "points_for_avg": ("points_for_total", "games_played"),
+    "points_against_avg": ("points_against_total", "games_played"),
+}
+
+
+def season_ratio(numerator, denominator) -> float:
+    return numerator / denominator if denominator else 0.0
+
+
+def _sql_ratio(numerator, denominator):
+    return func.coalesce(cast(numerator, Float) / func.nullif(denominator, 0), 0.0)
 
 class TeamRepository(AsyncBaseRepository[Team]):
     def __init__(self):
@@ -13,7 +40,7 @@ class TeamRepository(AsyncBaseRepository[Team]):
 
     async def get_teams_by_country(self, country: str) -> List[Team]:
         """Получение команд по стране"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Team).filter(Team.country == country)
             )
@@ -21,7 +48,7 @@ class TeamRepository(AsyncBaseRepository[Team]):
 
     async def get_teams_by_league(self, league_id: int, season: str) -> List[Team]:
         """Получение команд лиги (через статистику сезона)"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Team).join(TeamSeasonStats).filter(
                     TeamSeasonStats.league_id == league_id
@@ -31,7 +58,7 @@ class TeamRepository(AsyncBaseRepository[Team]):
 
     async def search_teams(self, search_term: str) -> List[Team]:
         """Поиск команд по названию"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(Team).filter(Team.name.ilike(f"%{search_term}%"))
             )
@@ -43,7 +70,7 @@ class TeamSeasonStatsRepository(AsyncBaseRepository[TeamSeasonStats]):
 
     async def get_team_season_stats(self, team_id: int, season_id: int) -> Optional[TeamSeasonStats]:
         """Получение статистики команды за сезон"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(TeamSeasonStats).filter(
                     TeamSeasonStats.team_id == team_id,
@@ -54,11 +81,215 @@ class TeamSeasonStatsRepository(AsyncBaseRepository[TeamSeasonStats]):
 
     async def get_league_standings(self, league_id: int, season_id: int) -> List[TeamSeasonStats]:
         """Получение таблицы лиги за сезон"""
-        async with db_manager.get_async_session() as session:
+        async with db_manager.get_read_session() as session:
             result = await session.execute(
                 select(TeamSeasonStats).filter(
                     TeamSeasonStats.league_id == league_id,
                     TeamSeasonStats.season_id == season_id
                 ).order_by(TeamSeasonStats.win_percentage_total.desc())
             )
-            return result.scalars().all()
\ No newline at end of file
+            return result.scalars().all()
+
+    def _scope(self, columns, league_id: Optional[int], season_id: Optional[int]) -> list:
+        filters = []
+        if league_id is not None:
+            filters.append(columns.league_id == league_id)
+        if season_id is not None:
+            filters.append(columns.season_id == season_id)
+        return filters
+
+    def _finished(self, finished_statuses: Sequence[str]):
+        """Игры, учитываемые в сезонной статистике: завершенные и со счетом"""
+        return and_(
+            Game.status.in_(list(finished_statuses)),
+            Game.home_score_total.isnot(None),
+            Game.away_score_total.isnot(None)
+        )
+
+    def recompute_query(self, finished_statuses: Sequence[str], league_id: Optional[int] = None,
+                        season_id: Optional[int] = None):
+        """Сезонная статистика команд заново из завершенных игр (по строке на команду и сезон)"""
+        finished = and_(self._finished(finished_statuses), *self._scope(Game, league_id, season_id))
+        # Каждая игра - две строки: с точки зрения хозяев и гостей
+        results = union_all(
+            select(Game.season_id, Game.league_id, Game.home_team_id.label("team_id"), literal(True).label("home"),
+                   Game.home_score_total.label("points_for"), Game.away_score_total.label("points_against")).filter(finished),
+            select(Game.season_id, Game.league_id, Game.away_team_id.label("team_id"), literal(False).label("home"),
+                   Game.away_score_total.label("points_for"), Game.home_score_total.label("points_against")).filter(finished),
+        ).subquery()
+        win = results.c.points_for > results.c.points_against
+        loss = results.c.points_for < results.c.points_against
+        home, away = results.c.home.is_(True), results.c.home.is_(False)
+        totals = select(
+            results.c.team_id, results.c.season_id, results.c.league_id,
+            func.count().label("games_played"),
+            func.count().filter(home).label("games_played_home"),
+            func.count().filter(away).label("games_played_away"),
+            func.count().filter(win).label("wins_total"),
+            func.count().filter(and_(win, home)).label("wins_home"),
+            func.count().filter(and_(win, away)).label("wins_away"),
+            func.count().filter(loss).label("losses_total"),
+            func.count().filter(and_(loss, home)).label("losses_home"),
+            func.count().filter(and_(loss, away)).label("losses_away"),
+            cast(func.sum(results.c.points_for), TeamSeasonStats.points_for_total.type).label("points_for_total"),
+            cast(func.sum(results.c.points_against), TeamSeasonStats.points_against_total.type).label("points_against_total"),
+        ).group_by(results.c.team_id, results.c.season_id, results.c.league_id).subquery()
+
+        return select(
+            totals.c.team_id, totals.c.season_id, totals.c.league_id,
+            *(totals.c[column] for column in SEASON_COUNTER_COLUMNS),
+            *(_sql_ratio(totals.c[numerator], totals.c[denominator]).label(column)
+              for column, (numerator, denominator) in SEASON_DERIVED_COLUMNS.items())
+        )
+
+    async def recompute(self, finished_statuses: Sequence[str], league_id: Optional[int] = None,
+                        season_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(self.recompute_query(finished_statuses, league_id, season_id))
+            return [row._asdict() for row in result.all()]
+
+    async def get_scope_rows(self, league_id: Optional[int] = None, season_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Сохраненные строки лиги/сезона (все при None) как словари колонок"""
+        table = TeamSeasonStats.__table__
+        columns = ["team_id", "season_id", "league_id", *SEASON_COUNTER_COLUMNS, *SEASON_DERIVED_COLUMNS]
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(*(table.c[column] for column in columns)).filter(*self._scope(table.c, league_id, season_id))
+            )
+            return [row._asdict() for row in result.all()]
+
+    async def apply_deltas(self, rows: List[Dict[str, Any]]) -> int:
+        """Приращения счетчиков по (team_id, season_id): INSERT ... ON CONFLICT DO UPDATE SET x = x + delta
+
+        Производные колонки пересчитываются из новых значений счетчиков в том же операторе.
+        """
+        if not rows:
+            return 0
+
+        table = TeamSeasonStats.__table__
+        # Единый порядок ключей - без взаимных блокировок параллельных приращений
+        rows = sorted(rows, key=lambda row: (row["team_id"], row["season_id"]))
+        values = [
+            {
+                **row,
+                **{column: season_ratio(row[numerator], row[denominator])
+                   for column, (numerator, denominator) in SEASON_DERIVED_COLUMNS.items()},
+            }
+            for row in rows
+        ]
+        batch_size = max(1, MAX_QUERY_PARAMS // len(values[0]))
+
+        affected = 0
+        async with db_manager.get_async_session() as session:
+            for start in range(0, len(values), batch_size):
+                stmt = pg_insert(TeamSeasonStats).values(values[start:start + batch_size])
+                set_ = {column: table.c[column] + stmt.excluded[column] for column in SEASON_COUNTER_COLUMNS}
+                set_.update({
+                    column: _sql_ratio(table.c[numerator] + stmt.excluded[numerator],
+                                       table.c[denominator] + stmt.excluded[denominator])
+                    for column, (numerator, denominator) in SEASON_DERIVED_COLUMNS.items()
+                })
+                set_["league_id"] = stmt.excluded.league_id
+                set_["updated_at"] = func.now()
+                stmt = stmt.on_conflict_do_update(index_elements=["team_id", "season_id"], set_=set_)
+                result = await session.execute(stmt)
+                affected += result.rowcount
+            await session.commit()
+        return affected
+
+    async def claim_games(
+        self,
+        game_ids: Sequence[int],
+        finished_statuses: Sequence[str]
+    ) -> List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+        """Замена учтенных версий игр текущими; возвращает (учтенная, текущая) по изменившимся играм
+
+        None - игра не учитывается (не завершена). Строки игр блокируются до конца
+        транзакции: параллельная запись той же игры прочитает уже новую учтенную
+        версию, и вклад не посчитается дважды.
+        """
+        if not game_ids:
+            return []
+        game_ids = sorted(set(game_ids))
+        counted_table = TeamSeasonStatsGame.__table__
+
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(
+                    Game.id, Game.season_id, Game.league_id, Game.home_team_id, Game.away_team_id,
+                    Game.home_score_total.label("home_score"), Game.away_score_total.label("away_score"),
+                    self._finished(finished_statuses).label("finished")
+                ).filter(Game.id.in_(game_ids)).order_by(Game.id).with_for_update()
+            )
+            current = {
+                row.id: {column: getattr(row, column) for column in COUNTED_GAME_COLUMNS} if row.finished else None
+                for row in result.all()
+            }
+            result = await session.execute(
+                select(counted_table).filter(counted_table.c.game_id.in_(game_ids))
+            )
+            counted = {row.game_id: {column: getattr(row, column) for column in COUNTED_GAME_COLUMNS} for row in result.all()}
+
+            changes = [
+                (game_id, counted.get(game_id), current.get(game_id))
+                for game_id in game_ids
+                if counted.get(game_id) != current.get(game_id)
+            ]
+            upserts = [{"game_id": game_id, **new} for game_id, _, new in changes if new is not None]
+            if upserts:
+                stmt = pg_insert(TeamSeasonStatsGame).values(upserts)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["game_id"], set_={column: stmt.excluded[column] for column in COUNTED_GAME_COLUMNS}
+                )
+                await session.execute(stmt)
+            removed = [game_id for game_id, _, new in changes if new is None]
+            if removed:
+                await session.execute(delete(TeamSeasonStatsGame).filter(TeamSeasonStatsGame.game_id.in_(removed)))
+            await session.commit()
+        return [(previous, new) for _, previous, new in changes]
+
+    async def rebuild(self, finished_statuses: Sequence[str], league_id: Optional[int] = None,
+                      season_id: Optional[int] = None) -> Dict[str, int]:
+        """Полная замена строк лиги/сезона (все при None) и учтенных версий их игр пересчетом из games"""
+        table = TeamSeasonStats.__table__
+        recompute = self.recompute_query(finished_statuses, league_id, season_id)
+        scope_games = select(Game.id).filter(*self._scope(Game, league_id, season_id))
+        counted_scope = self._scope(TeamSeasonStatsGame, league_id, season_id)
+
+        async with db_manager.get_async_session() as session:
+            await session.execute(delete(TeamSeasonStats).filter(*self._scope(table.c, league_id, season_id)))
+            result = await session.execute(
+                insert(TeamSeasonStats).from_select([column.name for column in recompute.selected_columns], recompute)
+            )
+            rows = result.rowcount
+
+            # Учтенные версии: строки сезона и строки его игр, учтенных ранее в другом сезоне
+            await session.execute(delete(TeamSeasonStatsGame).filter(
+                *([or_(and_(*counted_scope), TeamSeasonStatsGame.game_id.in_(scope_games))] if counted_scope else [])
+            ))
+            result = await session.execute(
+                insert(TeamSeasonStatsGame).from_select(
+                    ["game_id", *COUNTED_GAME_COLUMNS],
+                    select(
+                        Game.id, Game.season_id, Game.league_id, Game.home_team_id, Game.away_team_id,
+                        Game.home_score_total, Game.away_score_total
+                    ).filter(self._finished(finished_statuses), *self._scope(Game, league_id, season_id))
+                )
+            )
+            games = result.rowcount
+            await session.commit()
+        return {"rows": rows, "games": games}
+
+class TeamGameStatsRepository(GamePartitionedRepository[TeamGameStats]):
+    upsert_index_elements = ("game_id", "team_id", "game_date")
+
+    def __init__(self):
+        super().__init__(TeamGameStats)
+
+    async def get_game_stats(self, game_id: int) -> List[TeamGameStats]:
+        """Статистика обеих команд в игре"""
+        async with db_manager.get_read_session() as session:
+            result = await session.execute(
+                select(TeamGameStats).join(Game, self.game_onclause()).filter(Game.id == game_id)
+            )
+            return result.scalars().all()
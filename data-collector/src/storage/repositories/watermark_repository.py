@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from storage.database import CollectionWatermark, db_manager
+from storage.repositories.async_base import AsyncBaseRepository
+
+class WatermarkRepository(AsyncBaseRepository[CollectionWatermark]):
+    upsert_index_elements = ("league_id", "season", "resource")
+
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETE = "complete"
+    FAILED = "failed"
+
+    def __init__(self):
+        super().__init__(CollectionWatermark)
+
+    async def get_watermark(self, league_id: int, season: str, resource: str) -> Optional[CollectionWatermark]:
+        """Водяной знак ресурса (лига, сезон, ресурс)"""
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(
+                select(CollectionWatermark).filter(
+                    CollectionWatermark.league_id == league_id,
+                    CollectionWatermark.season == season,
+                    CollectionWatermark.resource == resource
+                )
+            )
+            return result.scalar_one_or_none()
+
+    async def get_all_watermarks(self) -> List[CollectionWatermark]:
+        """Все водяные знаки (для отчета о прогрессе)"""
+        async with db_manager.get_read_session() as session:
+            result = await session.execute(
+                select(CollectionWatermark).order_by(
+                    CollectionWatermark.league_id,
+                    CollectionWatermark.season,
+                    CollectionWatermark.resource
+                )
+            )
+            return result.scalars().all()
+
+    async def _upsert(self, league_id: int, season: str, resource: str, values: Dict[str, Any], on_update: Dict[str, Any]) -> CollectionWatermark:
+        stmt = pg_insert(CollectionWatermark).values(
+            league_id=league_id, season=season, resource=resource, **values
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(self.upsert_index_elements),
+            set_={**on_update, "updated_at": datetime.utcnow()}
+        ).returning(CollectionWatermark)
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(stmt)
+            watermark = result.scalar_one()
+            await session.commit()
+            return watermark
+
+    async def mark_started(self, league_id: int, season: str, resource: str) -> CollectionWatermark:
+        """Начало (или возобновление) обработки ресурса; водяной знак сохраняется"""
+        now = datetime.utcnow()
+        return await self._upsert(
+            league_id, season, resource,
+            values={"status": self.IN_PROGRESS, "attempts": 1, "started_at": now},
+            on_update={
+                "status": self.IN_PROGRESS,
+                "attempts": CollectionWatermark.attempts + 1,
+                "started_at": now,
+                "completed_at": None,
+                "last_error": None
+            }
+        )
+
+    async def advance(
+        self,
+        league_id: int,
+        season: str,
+        resource: str,
+        watermark: Optional[datetime],
+        last_item_id: Optional[int],
+        items: int,
+        items_expected: Optional[int] = None
+    ) -> CollectionWatermark:
+        """Сдвиг водяного знака после сохранения очередной пачки"""
+        values = {"watermark": watermark, "last_item_id": last_item_id}
+        if items_expected is not None:
+            values["items_expected"] = items_expected
+        return await self._upsert(
+            league_id, season, resource,
+            values={**values, "status": self.IN_PROGRESS, "items_collected": items},
+            on_update={**values, "items_collected": CollectionWatermark.items_collected + items}
+        )
+
+    async def mark_complete(self, league_id: int, season: str, resource: str) -> CollectionWatermark:
+        """Ресурс полностью собран - повторные прогоны его пропускают"""
+        now = datetime.utcnow()
+        return await self._upsert(
+            league_id, season, resource,
+            values={"status": self.COMPLETE, "completed_at": now},
+            on_update={"status": self.COMPLETE, "completed_at": now, "last_error": None}
+        )
+
+    async def mark_failed(self, league_id: int, season: str, resource: str, error: str) -> CollectionWatermark:
+        """Ошибка обработки; водяной знак остается на последней сохраненной пачке"""
+        return await self._upsert(
+            league_id, season, resource,
+            values={"status": self.FAILED, "last_error": error},
+            on_update={"status": self.FAILED, "last_error": error}
+        )
+
+    async def reset(self, league_id: Optional[int] = None, resource: Optional[str] = None) -> int:
+        """Сброс водяных знаков для полного повторного сбора"""
+        query = delete(CollectionWatermark)
+        if league_id is not None:
+            query = query.where(CollectionWatermark.league_id == league_id)
+        if resource is not None:
+            query = query.where(CollectionWatermark.resource == resource)
+        async with db_manager.get_async_session() as session:
+            result = await session.execute(query)
+            await session.commit()
+            return result.rowcount
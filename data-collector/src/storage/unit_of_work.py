@@ -0,0 +1,87 @@
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
+
+# Текущий unit of work задачи (наследуется дочерними задачами asyncio.gather/create_task)
+current_unit_of_work: ContextVar[Optional["UnitOfWork"]] = ContextVar("current_unit_of_work", default=None)
+
+
+def _is_open(session: AsyncSession, savepoint: AsyncSessionTransaction) -> bool:
+    """Точка сохранения еще не закрыта (активна или ждет отката после ошибки flush)"""
+    return session.sync_session.get_nested_transaction() is savepoint.sync_transaction
+
+
+class UnitOfWorkSession:
+    """Общая сессия внутри одного вызова репозитория
+
+    commit() только сбрасывает изменения в БД (фиксация - в конце unit of work),
+    rollback() откатывает точку сохранения этого вызова, close() ничего не делает.
+    """
+
+    def __init__(self, session: AsyncSession, savepoint: AsyncSessionTransaction):
+        self._session = session
+        self._savepoint = savepoint
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    async def commit(self):
+        await self._session.flush()
+
+    async def rollback(self):
+        if _is_open(self._session, self._savepoint):
+            await self._savepoint.rollback()
+
+    async def close(self):
+        pass
+
+
+class UnitOfWork:
+    """Одна сессия и одна транзакция на группу вызовов репозиториев
+
+    Вызовы выполняются по очереди (AsyncSession нельзя использовать параллельно),
+    каждый - в своей точке сохранения: ошибка одного вызова откатывает только его,
+    как и при отдельной сессии на вызов.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.lock = asyncio.Lock()
+        self.calls = 0
+        self._owner: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def scope(self):
+        """Контекст одного вызова репозитория (вместо новой сессии)"""
+        task = asyncio.current_task()
+        if self._owner is task:
+            # Вызов репозитория изнутри другого вызова той же задачи - блокировка уже наша
+            async with self._savepoint() as session:
+                yield session
+            return
+
+        async with self.lock:
+            self._owner = task
+            try:
+                async with self._savepoint() as session:
+                    yield session
+            finally:
+                self._owner = None
+
+    @asynccontextmanager
+    async def _savepoint(self):
+        self.calls += 1
+        savepoint = await self.session.begin_nested()
+        try:
+            yield UnitOfWorkSession(self.session, savepoint)
+        except BaseException:
+            if _is_open(self.session, savepoint):
+                await savepoint.rollback()
+            raise
+        if savepoint.is_active:
+            await savepoint.commit()
+        elif _is_open(self.session, savepoint):
+            # Ошибка flush внутри вызова, перехваченная репозиторием
+            await savepoint.rollback()